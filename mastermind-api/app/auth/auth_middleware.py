@@ -1,48 +1,124 @@
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlmodel import Session
-from app.auth.auth_utils import verify_token
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.auth.auth_utils import decode_token
+from app.auth.principal_cache import Principal, principal_cache
+from app.database import async_crud
 from app.database.crud import get_user_by_username, get_player_by_user_id
-from app.models import User
-from app.database.connection import get_session
+from app.models import User, Player
+from app.database.connection import get_session, get_async_session
 
 security = HTTPBearer()
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), session: Session = Depends(get_session)) -> User:
-    """
-        Obtains the current user based on the JWT token
-    """
-
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Credentials could not be validated",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try: 
-        token = credentials.credentials
-        username = verify_token(token)
-
-        if username is None:
-            raise credentials_exception
-        
-    except Exception:
-        raise credentials_exception
-    
-    user = get_user_by_username(session, username=username)
+
+def _decode_credentials(credentials: HTTPAuthorizationCredentials) -> dict:
+    payload = decode_token(credentials.credentials)
+    if payload is None or payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+def _principal_without_database(payload: dict) -> Optional[Principal]:
+    """
+        Principal from the principal cache or from the token claims,
+        None when the database has to be queried
+    """
+    username = payload["sub"]
+    principal = principal_cache.get(username)
+    if principal is not None:
+        return principal
+
+    user_id = payload.get("user_id")
+    if user_id is not None and "player_id" in payload and principal_cache.is_trusted(user_id, payload.get("iat")):
+        principal = Principal(user_id=user_id, username=username, player_id=payload["player_id"])
+        principal_cache.put(principal, payload["exp"])
+        return principal
+
+    return None
+
+def _principal_from_database(payload: dict, user: Optional[User], player: Optional[Player]) -> Principal:
+    if user is None:
+        raise _credentials_exception()
+    principal = Principal(user_id=user.id, username=user.username, player_id=player.id if player else None)
+    principal_cache.put(principal, payload["exp"])
+    return principal
+
+def get_current_principal(credentials: HTTPAuthorizationCredentials = Depends(security), session: Session = Depends(get_session)) -> Principal:
+    """
+        Obtains the identity of the current user based on the JWT token.
+        It comes from the principal cache or from the token claims; the database
+        is only queried for old tokens without claims or after the user changed
+    """
+    payload = _decode_credentials(credentials)
+    principal = _principal_without_database(payload)
+    if principal is not None:
+        return principal
+
+    user = get_user_by_username(session, username=payload["sub"])
+    player = get_player_by_user_id(session, user.id) if user else None
+    return _principal_from_database(payload, user, player)
+
+async def get_current_principal_async(credentials: HTTPAuthorizationCredentials = Depends(security), session: AsyncSession = Depends(get_async_session)) -> Principal:
+    """
+        Async version of get_current_principal, for the routes using an AsyncSession
+    """
+    return await principal_from_payload(_decode_credentials(credentials), session)
+
+def decode_channel_token(token: str) -> dict:
+    """
+        Decodes the token a WebSocket client sends in its first frame,
+        raising the same 401 error as the HTTP routes when it is not valid
+    """
+    return _decode_credentials(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+
+async def principal_from_payload(payload: dict, session: AsyncSession) -> Principal:
+    """
+        Principal of a decoded token, from the cache, the claims or the database
+    """
+    principal = _principal_without_database(payload)
+    if principal is not None:
+        return principal
+
+    user = await async_crud.get_user_by_username(session, username=payload["sub"])
+    player = await async_crud.get_player_by_user_id(session, user.id) if user else None
+    return _principal_from_database(payload, user, player)
+
+def get_current_user(principal: Principal = Depends(get_current_principal), session: Session = Depends(get_session)) -> User:
+    """
+        Obtains the current user based on the JWT token
+    """
+    user = session.get(User, principal.user_id)
     if user is None:
-        raise credentials_exception
-    
+        raise _credentials_exception()
+
     return user
 
-def get_current_player(current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+async def get_current_user_async(principal: Principal = Depends(get_current_principal_async), session: AsyncSession = Depends(get_async_session)) -> User:
+    """
+        Async version of get_current_user
+    """
+    user = await session.get(User, principal.user_id)
+    if user is None:
+        raise _credentials_exception()
+
+    return user
+
+def get_current_player(principal: Principal = Depends(get_current_principal), session: Session = Depends(get_session)) -> Player:
     """
         Gets the player profile of the current user
     """
-    
-    player = get_player_by_user_id(session, current_user.id)
+
+    player = session.get(Player, principal.player_id) if principal.player_id is not None else None
     if not player:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Player profile not found"
         )
-    return player
\ No newline at end of file
+    return player
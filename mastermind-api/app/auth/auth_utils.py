@@ -1,9 +1,13 @@
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import os
+import asyncio
+import threading
 from dotenv import load_dotenv
+from app.database.connection import settings
 
 load_dotenv(dotenv_path='secrets.env')
 
@@ -13,7 +17,11 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+# bcrypt releases the GIL, so a thread pool spreads hashing over all the cores
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_hash_executor_lock = threading.Lock()
 
 
 def hash_password(password: str) ->str:
@@ -28,18 +36,60 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     return pwd_context.verify(plain_password,hashed_password)
 
+def get_hash_executor() -> ThreadPoolExecutor:
+    """
+        Returns the executor dedicated to password hashing
+    """
+    global _hash_executor
+    if _hash_executor is None:
+        with _hash_executor_lock:
+            if _hash_executor is None:
+                _hash_executor = ThreadPoolExecutor(
+                    max_workers=settings.password_hash_workers or os.cpu_count(),
+                    thread_name_prefix="password-hash"
+                )
+    return _hash_executor
+
+def shutdown_hash_executor():
+    """
+        Stops the password hashing executor
+    """
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False)
+        _hash_executor = None
+
+async def hash_password_async(password: str) -> str:
+    """
+        Hashes a password in the hashing executor, without blocking the event loop
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_hash_executor(), hash_password, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+        Verifies a password in the hashing executor.
+        Returns (valid, new_hash): new_hash is set when the stored hash uses an
+        outdated cost factor and must be replaced
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_hash_executor(), pwd_context.verify_and_update, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta]=None):
     """
-        Create a token JWT
+        Create a token JWT.
+        Besides sub, data can carry the user_id and player_id claims,
+        which let the middleware authenticate without database lookups
     """
     to_encode = data.copy()
+    now = datetime.now(timezone.utc)
 
     if expires_delta:
-        expire = datetime.now(timezone.utc)+ expires_delta
+        expire = now + expires_delta
     else: 
-        expire = datetime.now(timezone.utc)+ timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": now.timestamp()})
     encoded_jwt = jwt.encode(to_encode,SECRET_KEY, algorithm= ALGORITHM)
 
     return encoded_jwt
@@ -0,0 +1,119 @@
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from sqlalchemy import event
+from app.database.connection import settings
+from app.auth.auth_utils import ACCESS_TOKEN_EXPIRE_MINUTES
+from app.models import User, Player
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+        Identity of an authenticated request: what the routes need to know
+        about the caller without loading the User and Player rows
+    """
+    user_id: int
+    username: str
+    player_id: Optional[int]
+
+
+class PrincipalCache:
+    """
+        In-process LRU cache of principals keyed by token subject (the username).
+        An entry expires with the token that stored it. Invalidating a user drops
+        its entry and makes the claims of tokens issued before that moment untrusted,
+        so the next request of that user is resolved from the database again.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[Principal, float]]" = OrderedDict()
+        self._invalidated_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, subject: str) -> Optional[Principal]:
+        """
+            Returns the cached principal of a token subject, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None or entry[1] <= time.time():
+                self._entries.pop(subject, None)
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(subject)
+            return entry[0]
+
+    def put(self, principal: Principal, expires_at: float) -> None:
+        """
+            Stores a principal until expires_at (the exp claim of its token)
+        """
+        with self._lock:
+            self._entries[principal.username] = (principal, expires_at)
+            self._entries.move_to_end(principal.username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def is_trusted(self, user_id: int, issued_at: Optional[float]) -> bool:
+        """
+            Whether the claims of a token issued at issued_at can still be used for this user
+        """
+        with self._lock:
+            invalidated_at = self._invalidated_at.get(user_id)
+        if invalidated_at is None:
+            return True
+        return issued_at is not None and issued_at > invalidated_at
+
+    def invalidate_user(self, user_id: int) -> None:
+        """
+            Drops the cached principal of a user and distrusts the claims of its current tokens
+        """
+        now = time.time()
+        with self._lock:
+            for subject, (principal, _) in list(self._entries.items()):
+                if principal.user_id == user_id:
+                    del self._entries[subject]
+
+            self._invalidated_at[user_id] = now
+            # Tokens issued before the token lifetime are expired anyway
+            oldest = now - ACCESS_TOKEN_EXPIRE_MINUTES * 60
+            for stale_user_id in [uid for uid, at in self._invalidated_at.items() if at < oldest]:
+                del self._invalidated_at[stale_user_id]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._invalidated_at.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+principal_cache = PrincipalCache(settings.principal_cache_size)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, user: User) -> None:
+    principal_cache.invalidate_user(user.id)
+
+
+@event.listens_for(Player, "after_delete")
+def _invalidate_deleted_player(mapper, connection, player: Player) -> None:
+    principal_cache.invalidate_user(player.user_id)
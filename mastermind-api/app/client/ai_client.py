@@ -1,24 +1,130 @@
 import os
+import time
+import asyncio
+import logging
+import threading
 import google.generativeai as genai
 from dotenv import load_dotenv
+from app.database.connection import settings
+from app.client.resilience import CircuitBreaker, SingleFlight
+from app.services.metrics import upstream_call
 
 load_dotenv(dotenv_path='secrets.env')
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 genai.configure(api_key=GEMINI_API_KEY)
 
-def generate_from_ai(prompt: str) -> str | None:
+MODEL_NAME = "gemini-1.5-flash"
+
+logger = logging.getLogger(__name__)
+
+_model = None
+_model_lock = threading.Lock()
+_limiter = None
+
+breaker = CircuitBreaker(
+    failure_threshold=settings.ai_breaker_failure_threshold,
+    latency_threshold=settings.ai_breaker_latency_threshold,
+    reset_timeout=settings.ai_breaker_reset_timeout
+)
+single_flight = SingleFlight()
+
+
+def get_model() -> genai.GenerativeModel:
+    """
+        Returns the long-lived Gemini model shared by every call
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = genai.GenerativeModel(MODEL_NAME)
+    return _model
+
+
+def _get_limiter() -> asyncio.Semaphore:
+    """
+        Semaphore that limits the number of concurrent Gemini calls
+    """
+    global _limiter
+    if _limiter is None:
+        _limiter = asyncio.Semaphore(settings.ai_max_concurrency)
+    return _limiter
+
+
+async def generate_from_ai_async(prompt: str) -> str | None:
     """
         Handles communication with the Gemini API.
+        Concurrent identical prompts share one call, and no call is made while the
+        circuit breaker is open. One ai_timeout deadline covers both the wait for a free
+        slot and the call itself; None is returned once it passes
     """
+    return await single_flight.do_async(prompt, lambda: _generate_async(prompt))
+
 
+async def _generate_async(prompt: str) -> str | None:
+    limiter = _get_limiter()
+    deadline = asyncio.get_running_loop().time() + settings.ai_timeout
+    try:
+        async with asyncio.timeout_at(deadline):
+            await limiter.acquire()
+    except TimeoutError:
+        # No request reached Gemini: not a failure of the upstream service
+        logger.warning(f"No free Gemini slot within {settings.ai_timeout}s")
+        return None
+
+    try:
+        return await _call_gemini(prompt, deadline)
+    finally:
+        limiter.release()
+
+
+async def _call_gemini(prompt: str, deadline: float) -> str | None:
+    if not breaker.allow_request():
+        return None
+
+    start = time.monotonic()
+    with upstream_call("gemini") as call:
+        try:
+            async with asyncio.timeout_at(deadline):
+                # The request gets what is left of the deadline after the wait for a slot
+                remaining = max(deadline - asyncio.get_running_loop().time(), 0.0)
+                response = await get_model().generate_content_async(prompt, request_options={"timeout": remaining})
+
+        except asyncio.CancelledError:
+            call["outcome"] = "cancelled"
+            breaker.release_probe()
+            raise
+        except TimeoutError:
+            call["outcome"] = "timeout"
+            breaker.record_failure()
+            logger.warning(f"Gemini API did not answer within the {settings.ai_timeout}s deadline")
+            return None
+        except Exception as e:
+            call["outcome"] = "error"
+            breaker.record_failure()
+            logger.warning(f"Error using Gemini API: {e}")
+            return None
+
+    breaker.record_success(time.monotonic() - start)
+    return _response_text(response)
+
+
+def _response_text(response) -> str | None:
     try:
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        response = model.generate_content(prompt)
         if response and response.text:
             return response.text.strip()
-        return None
-    
     except Exception as e:
-        print(f"Error using Gemini API: {e}")
-        return None
\ No newline at end of file
+        # response.text raises when the answer was blocked or has no text
+        logger.warning(f"Gemini API returned no text: {e}")
+    return None
+
+
+def get_ai_client_metrics() -> dict:
+    """
+        State of the circuit breaker and of the request coalescing
+    """
+    return {
+        "circuit_breaker": breaker.snapshot(),
+        "coalescing": single_flight.snapshot()
+    }
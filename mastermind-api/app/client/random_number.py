@@ -1,38 +1,108 @@
 import requests
 import random
+import secrets
 from typing import List, Tuple
 import  logging
+from app.database.connection import settings
+from app.services.metrics import upstream_call
 
 # Config logging for debugging
 logger = logging.getLogger(__name__)
 
+# Highest digit and number of attempts of each difficulty level
+DIFFICULTY_CONFIG = {
+    1: (5, 12),
+    2: (7, 10),
+    3: (9, 8),
+}
+
+def get_difficulty_config(difficulty_level: int) -> Tuple[int, int]:
+    """
+        Returns the highest digit and the number of attempts of a difficulty level
+    """
+    return DIFFICULTY_CONFIG.get(difficulty_level, DIFFICULTY_CONFIG[3])
+
+def fetch_secret_numbers(difficulty_level: int, count: int) -> List[List[str]]:
+    """
+        Gets count 4 digit secret numbers from random.org in a single request.
+        Raises requests.RequestException or ValueError if the call fails
+    """
+    max_digit, _ = get_difficulty_config(difficulty_level)
+
+    with upstream_call("random_org") as call:
+        try:
+            response = requests.get(
+                f'{settings.random_org_url}?num={4*count}&min=0&max={max_digit}&col=4&base=10&format=plain&rnd=new',
+                timeout=settings.random_org_timeout
+            )
+        except requests.Timeout:
+            call["outcome"] = "timeout"
+            raise
+        response.raise_for_status()
+
+    # One secret number per line, digits separated by tabs
+    numbers = [line.split() for line in response.text.splitlines() if line.strip()]
+    if len(numbers) != count or any(len(number) != 4 or not all(d.isdigit() for d in number) for number in numbers):
+        raise ValueError("Unexpected response from random.org")
+
+    return numbers
+
 def get_secret_number(difficulty_level: int) -> Tuple[List[str], int]:
     """
         Gets a 4 digit secret number from random.org API
         based on the difficulty level.
-        If random.org API fails, uses local random generation 
+        If random.org API fails, uses local random generation
     """
-
-    if difficulty_level == 1: 
-        max_digit = 5
-        attempts = 12
-    elif difficulty_level == 2:
-        max_digit = 7
-        attempts = 10
-    else:
-        max_digit = 9
-        attempts = 8
+    max_digit, attempts = get_difficulty_config(difficulty_level)
 
     try:
-        response = requests.get(f'https://www.random.org/integers/?num=4&min=0&max={max_digit}&col=4&base=10&format=plain&rnd=new')
-        response.raise_for_status()
-
-        # Process response
-        number= ''.join(response.text.split())
+        number = fetch_secret_numbers(difficulty_level, 1)[0]
 
         logger.info(f"Generated secret number from random.org for difficulty {difficulty_level}")
-        return list(number), attempts
+        return number, attempts
     except (requests.RequestException, ValueError) as e:
         logger.warning(f"Failed to get number from random.org: {e}. Using local fallback...")
-        # Fallback: generate random number locally 
-        return [str(random.randint(0,max_digit)) for _ in range(4)], attempts
\ No newline at end of file
+        # Fallback: generate random number locally
+        return [str(random.randint(0,max_digit)) for _ in range(4)], attempts
+
+
+class RandomOrgSource:
+    """
+        Secret numbers from random.org (or a server with the same plain-text API)
+    """
+
+    def fetch_secret_numbers(self, difficulty_level: int, count: int) -> List[List[str]]:
+        return fetch_secret_numbers(difficulty_level, count)
+
+class LocalSource:
+    """
+        Secret numbers from the local CSPRNG (secrets module)
+    """
+
+    def fetch_secret_numbers(self, difficulty_level: int, count: int) -> List[List[str]]:
+        max_digit, _ = get_difficulty_config(difficulty_level)
+        return [[str(secrets.randbelow(max_digit + 1)) for _ in range(4)] for _ in range(count)]
+
+class SeededSource:
+    """
+        Deterministic secret numbers from a seed, for replays and benchmarks
+    """
+
+    def __init__(self, seed: int):
+        self._random = random.Random(seed)
+
+    def fetch_secret_numbers(self, difficulty_level: int, count: int) -> List[List[str]]:
+        max_digit, _ = get_difficulty_config(difficulty_level)
+        return [[str(self._random.randint(0, max_digit)) for _ in range(4)] for _ in range(count)]
+
+def create_entropy_source(name: str):
+    """
+        Creates the secret number source with the given name: random_org, local or seeded
+    """
+    if name == "random_org":
+        return RandomOrgSource()
+    if name == "local":
+        return LocalSource()
+    if name == "seeded":
+        return SeededSource(settings.secret_seed)
+    raise ValueError(f"Unknown secret source '{name}'. Use random_org, local or seeded")
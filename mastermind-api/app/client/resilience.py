@@ -0,0 +1,154 @@
+import time
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict
+
+
+class CircuitBreaker:
+    """
+        Circuit breaker for an upstream service.
+        closed: calls go through. After failure_threshold consecutive failures
+        (slow calls count as failures) it opens and calls are rejected.
+        After reset_timeout seconds it becomes half-open and lets one probe through:
+        a successful probe closes it, a failed one opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, latency_threshold: float, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+        self.rejected_calls = 0
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """
+            Returns whether a call may go to the upstream service now
+        """
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.probe_in_flight = False
+
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+
+            self.rejected_calls += 1
+            return False
+
+    def record_success(self, latency: float) -> None:
+        """
+            Records a successful call. Calls slower than latency_threshold count as failures
+        """
+        if latency > self.latency_threshold:
+            self.record_failure()
+            return
+
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """
+            Records a call that ended without a result (it was cancelled). If it was the
+            half-open probe, the next call becomes the probe instead of every call being
+            rejected from then on
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.probe_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "rejected_calls": self.rejected_calls,
+                "times_opened": self.times_opened
+            }
+
+
+class _LeaderCancelled(Exception):
+    """
+        Set on the shared future when the leader of a call was cancelled
+    """
+
+
+class SingleFlight:
+    """
+        Coalesces concurrent calls with the same key, for coroutines running on the
+        same event loop: the first caller (leader) runs the call and the others wait
+        for and share its result. If the leader is cancelled, the waiting callers are
+        not: one of them runs the call again as the new leader.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do_async(self, key: str, function: Callable[[], Awaitable[Any]]) -> Any:
+        """
+            Runs function once for all the coroutines calling with the same key
+        """
+        waited = False
+        while (future := self._inflight.get(key)) is not None:
+            if not waited:
+                self.coalesced += 1
+                waited = True
+            try:
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                # The key is released by now: retry, the first one to get here leads
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.leaders += 1
+        try:
+            result = await function()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight)
+        }
@@ -0,0 +1,159 @@
+import os
+import json
+import secrets
+import logging
+import threading
+import requests
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+from app.database.connection import settings
+from app.client.random_number import DIFFICULTY_CONFIG, create_entropy_source, get_difficulty_config
+
+logger = logging.getLogger(__name__)
+
+
+class SecretPool:
+    """
+        Pool of secret numbers of one difficulty level fetched in bulk from the
+        configured source (random.org by default).
+        When it drops below the low-water mark it is refilled in a background thread.
+    """
+
+    def __init__(self, difficulty_level: int, numbers: List[str] = ()):
+        self.difficulty_level = difficulty_level
+        self.numbers: Deque[str] = deque(numbers)
+        self._lock = threading.Lock()
+        self._refilling = False
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def draw(self) -> str:
+        """
+            Takes a secret number from the pool. Never waits for the source:
+            if the pool is empty a number is generated locally
+        """
+        with self._lock:
+            number = self.numbers.popleft() if self.numbers else None
+
+        self.refill_if_low()
+
+        if number is None:
+            logger.warning(f"Secret pool of difficulty {self.difficulty_level} is empty. Using local fallback...")
+            max_digit, _ = get_difficulty_config(self.difficulty_level)
+            number = "".join(str(secrets.randbelow(max_digit + 1)) for _ in range(4))
+
+        return number
+
+    def refill_if_low(self) -> None:
+        """
+            Starts a background refill if the pool is below the low-water mark
+            and no refill is already running
+        """
+        with self._lock:
+            if self._refilling or len(self.numbers) >= settings.secret_pool_low_water:
+                return
+            self._refilling = True
+
+        threading.Thread(target=self.refill, daemon=True).start()
+
+    def refill(self) -> None:
+        """
+            Fetches a batch of secret numbers from the source and adds them to the pool
+        """
+        try:
+            numbers = get_entropy_source().fetch_secret_numbers(self.difficulty_level, settings.secret_pool_batch_size)
+            with self._lock:
+                self.numbers.extend("".join(number) for number in numbers)
+            logger.info(f"Secret pool of difficulty {self.difficulty_level} refilled with {len(numbers)} numbers")
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Failed to refill secret pool from {settings.secret_source}: {e}")
+        finally:
+            with self._lock:
+                self._refilling = False
+
+    def drain(self) -> List[str]:
+        """
+            Takes every unused secret number out of the pool
+        """
+        with self._lock:
+            numbers = list(self.numbers)
+            self.numbers.clear()
+            return numbers
+
+    def snapshot(self) -> List[str]:
+        """
+            Returns a copy of the unused secret numbers
+        """
+        with self._lock:
+            return list(self.numbers)
+
+
+_pools: Dict[int, SecretPool] = {level: SecretPool(level) for level in DIFFICULTY_CONFIG}
+_save_lock = threading.Lock()
+_source = None
+
+
+def get_entropy_source():
+    """
+        Returns the secret number source selected in the settings
+    """
+    global _source
+    if _source is None:
+        _source = create_entropy_source(settings.secret_source)
+    return _source
+
+
+def draw_secret_number(difficulty_level: int) -> Tuple[List[str], int]:
+    """
+        Gets a 4 digit secret number from the pool of the difficulty level.
+        Same result as get_secret_number, without waiting for the source
+    """
+    _, attempts = get_difficulty_config(difficulty_level)
+    # Not `_pools.get(level) or _pools[3]`: an empty pool is falsy, and its level must
+    # still generate the digits (the local fallback of the right difficulty)
+    pool = _pools.get(difficulty_level, _pools[3])
+    return list(pool.draw()), attempts
+
+
+def load_secret_pools() -> None:
+    """
+        Restores the unused secret numbers saved by a previous run and
+        starts refilling the pools that are below the low-water mark.
+        The saved file is claimed by renaming it, so when several workers start
+        only one of them gets the saved numbers and no secret is handed out twice.
+    """
+    claimed_path = f"{settings.secret_pool_file}.{os.getpid()}.claimed"
+    try:
+        os.replace(settings.secret_pool_file, claimed_path)
+        with open(claimed_path) as file:
+            saved = json.load(file)
+        os.remove(claimed_path)
+    except (OSError, ValueError):
+        saved = {}
+
+    for level in DIFFICULTY_CONFIG:
+        _pools[level] = SecretPool(level, saved.get(str(level), []))
+
+    for pool in _pools.values():
+        pool.refill_if_low()
+
+
+def save_secret_pools() -> None:
+    """
+        Saves the unused secret numbers so they survive a restart. Called at shutdown only:
+        the numbers are taken out of the pools as they are written, so a number in the
+        file is never also handed out by this process (a crash just loses the pool).
+        With several workers each one overwrites the file at shutdown: numbers can be
+        lost, but not reused
+    """
+    data = {str(level): pool.drain() for level, pool in _pools.items()}
+    tmp_path = f"{settings.secret_pool_file}.{os.getpid()}.tmp"
+
+    with _save_lock:
+        try:
+            with open(tmp_path, "w") as file:
+                json.dump(data, file)
+            os.replace(tmp_path, settings.secret_pool_file)
+        except OSError as e:
+            logger.warning(f"Could not save secret pools: {e}")
@@ -0,0 +1,149 @@
+"""
+    Async versions of the functions in crud.py, for the routes running on the event loop.
+    They take an AsyncSession; the sync functions in crud.py stay available for
+    scripts and tests, and for the services run through AsyncSession.run_sync.
+"""
+from typing import List, Optional
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from app.auth.auth_utils import hash_password_async, verify_and_update_password_async
+from app.models import User, Player, GameSession, GameAttempt
+
+
+async def create_user(session: AsyncSession, username: str, email: str, password: str) -> User:
+    """
+        Create user and player automatically, hashing the password in the hashing executor
+    """
+    hashed_password = await hash_password_async(password)
+
+    user = User(
+        username = username.lower().strip(),
+        email = email.lower().strip(),
+        hashed_password= hashed_password
+    )
+    session.add(user)
+    await session.flush()
+
+    session.add(Player(user_id =user.id))
+    await session.commit()
+    await session.refresh(user)
+
+    return user
+
+
+async def get_user_by_username(session: AsyncSession, username: str) -> Optional[User]:
+    """
+        Search for a user by username.
+    """
+    normalized_username = username.lower().strip()
+    return (await session.exec(select(User).where(User.username == normalized_username))).first()
+
+
+async def get_player_by_user_id(session: AsyncSession, user_id: int) -> Optional[Player]:
+    """
+        Gets player profile by user id
+    """
+    return (await session.exec(select(Player).where(Player.user_id == user_id))).first()
+
+
+async def get_user_by_email(session: AsyncSession, email: str) -> Optional[User]:
+    """
+        Gets user by email
+    """
+    normalized_email = email.lower().strip()
+    return (await session.exec(select(User).where(User.email == normalized_email))).first()
+
+
+async def authenticate_user(session: AsyncSession, username: str, password: str) -> Optional[User]:
+    """
+        Authenticates a user by verifying username and password in the hashing executor.
+        If the stored hash uses an outdated cost factor it is transparently replaced
+    """
+    user = await get_user_by_username(session, username)
+    if not user:
+        return None
+
+    valid, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+    if not valid:
+        return None
+
+    if new_hash:
+        user.hashed_password = new_hash
+        session.add(user)
+        await session.commit()
+        await session.refresh(user)
+
+    return user
+
+
+async def create_game_session(session: AsyncSession, player_id: int, secret_number: str, difficulty_level: int, attempts_left: int) -> GameSession:
+    """
+        Creates a new game session in the database
+    """
+    game_session = GameSession(
+        player_id = player_id,
+        secret_number = secret_number,
+        difficulty_level = difficulty_level,
+        attempts_left = attempts_left
+    )
+
+    session.add(game_session)
+    await session.commit()
+    await session.refresh(game_session)
+    return game_session
+
+
+async def get_game_session(session: AsyncSession, game_session_id: int, with_attempts: bool = False) -> Optional[GameSession]:
+    """
+        Loads a game session with its player, and with its attempts if asked,
+        so nothing is lazily loaded afterwards
+    """
+    options = [joinedload(GameSession.player)]
+    if with_attempts:
+        options.append(selectinload(GameSession.attempts))
+    return (await session.exec(
+        select(GameSession).options(*options).where(GameSession.id == game_session_id)
+    )).first()
+
+
+async def get_last_attempt_number(session: AsyncSession, game_session_id: int) -> int:
+    """
+        Gets the number of the last attempt of a game session, 0 if there are none
+    """
+    return (await session.exec(
+        select(func.max(GameAttempt.attempt_number))
+        .where(GameAttempt.game_session_id == game_session_id)
+    )).one() or 0
+
+
+async def get_game_attempts(session: AsyncSession, game_session_id: int, after_attempt_number: int = 0) -> List[GameAttempt]:
+    """
+        Gets the attempts of a game session made after after_attempt_number, in order
+    """
+    return (await session.exec(
+        select(GameAttempt)
+        .where(GameAttempt.game_session_id == game_session_id, GameAttempt.attempt_number > after_attempt_number)
+        .order_by(GameAttempt.attempt_number)
+    )).all()
+
+
+async def update_game_session(session: AsyncSession, game_session: GameSession) -> GameSession:
+    """
+        Update a game session
+    """
+    session.add(game_session)
+    await session.commit()
+    await session.refresh(game_session)
+    return game_session
+
+
+async def get_top_players(session: AsyncSession) -> List[Player]:
+    """
+        Gets the 3 best players by score
+    """
+    return (await session.exec(
+        select(Player)
+        .options(selectinload(Player.user))
+        .order_by(Player.score.desc()).limit(3)
+    )).all()
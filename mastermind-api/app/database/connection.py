@@ -1,11 +1,82 @@
 from sqlmodel import create_engine, Session, SQLModel
 from pydantic_settings import BaseSettings
+from typing import Any, Dict, Optional
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database.migrations import run_migrations
+from app.database.sqlite_profile import configure_sqlite_production
 
 class Settings(BaseSettings):
     """
-     Database configuration
+     Application configuration
     """
     database_url: str ="sqlite:///./mastermind.db"
+    # development logs every statement; production disables echo and, on SQLite,
+    # enables WAL, the pragmas below and the serialized writer
+    database_profile: str = "development"
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kib: int = 64 * 1024
+    sqlite_busy_timeout_ms: int = 5000
+
+    # Connection pool and statement timeout of server databases (PostgreSQL);
+    # SQLite keeps SQLAlchemy's defaults. Every API node opens up to
+    # pool_size + max_overflow connections per engine
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_pre_ping: bool = True
+    db_pool_recycle: int = 1800
+    db_statement_timeout_ms: int = 30000
+    # Read-only replica used by the leaderboard and history reads (default: the primary)
+    database_replica_url: Optional[str] = None
+
+    # Password hashing: bcrypt cost factor and hashing threads (0 = one per core)
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 0
+    # Authenticated principals kept in memory to skip the user/player lookups
+    principal_cache_size: int = 10000
+
+    # Directory where the precomputed feedback tables are stored
+    feedback_table_dir: str = "./feedback_tables"
+    # Build or load the feedback tables at startup
+    load_feedback_tables: bool = True
+    # Directory where the precomputed opening books are stored
+    opening_book_dir: str = "./opening_books"
+
+    # Secret number source (random_org, local or seeded) and pool
+    secret_source: str = "random_org"
+    secret_seed: int = 0
+    random_org_url: str = "https://www.random.org/integers/"
+    random_org_timeout: float = 5.0
+    secret_pool_file: str = "./secret_pool.json"
+    secret_pool_batch_size: int = 200
+    secret_pool_low_water: int = 50
+
+    # AI hints: deadline of a Gemini call in seconds (including the wait for a free slot)
+    # and maximum concurrent calls
+    ai_timeout: float = 4.0
+    ai_max_concurrency: int = 8
+    # Circuit breaker: opens after this many consecutive failures (calls slower than
+    # the latency threshold count as failures) and probes again after the reset timeout
+    ai_breaker_failure_threshold: int = 5
+    ai_breaker_latency_threshold: float = 3.0
+    ai_breaker_reset_timeout: float = 30.0
+
+    # Hint cache: riddles kept per set of unguessed digits, lifetime in seconds,
+    # persistence in the hint_riddle table and background pre-warming
+    hint_cache_riddles_per_key: int = 5
+    hint_cache_ttl: int = 7 * 24 * 3600
+    hint_cache_max_keys: int = 1024
+    hint_cache_persist: bool = True
+    hint_prewarm_enabled: bool = True
+    hint_prewarm_interval: float = 30.0
+    hint_prewarm_batch: int = 4
+
+    # Seconds between leaderboard reloads from the database. Each worker applies only its
+    # own score changes to its leaderboard, the reload brings in those of the other
+    # workers and API nodes. 0 disables it, only safe with a single worker
+    leaderboard_refresh_interval: float = 30.0
 
     class Config:
         env_file = ".env"
@@ -13,17 +84,114 @@ class Settings(BaseSettings):
 
 settings = Settings()
 
-engine= create_engine(settings.database_url, echo=True, connect_args={"check_same_thread": False})
+def engine_options(database_url: str, production: bool) -> Dict[str, Any]:
+    """
+     Keyword arguments of create_engine/create_async_engine for the backend and driver of a URL
+    """
+    url = make_url(database_url)
+    options: Dict[str, Any] = {"echo": not production}
+
+    if url.get_backend_name() == "sqlite":
+        if url.get_driver_name() != "aiosqlite":
+            options["connect_args"] = {"check_same_thread": False}
+        return options
+
+    options.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.db_pool_recycle
+    )
+    if url.get_backend_name() == "postgresql" and settings.db_statement_timeout_ms > 0:
+        timeout = str(int(settings.db_statement_timeout_ms))
+        if url.get_driver_name() == "asyncpg":
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+def create_database_engine(database_url: Optional[str] = None, profile: Optional[str] = None) -> Engine:
+    """
+     Creates the engine of a database with the settings of a profile (development or production)
+    """
+    database_url = database_url or settings.database_url
+    production = (profile or settings.database_profile) == "production"
+
+    engine = create_engine(database_url, **engine_options(database_url, production))
+    if production and database_url.startswith("sqlite"):
+        configure_sqlite_production(
+            engine,
+            mmap_size=settings.sqlite_mmap_size,
+            cache_size_kib=settings.sqlite_cache_size_kib,
+            busy_timeout_ms=settings.sqlite_busy_timeout_ms
+        )
+    return engine
+
+def async_database_url(database_url: str) -> str:
+    """
+     URL of the same database with an async driver: aiosqlite for SQLite, asyncpg for PostgreSQL
+    """
+    scheme, _, rest = database_url.partition("://")
+    backend = scheme.split("+")[0]
+    drivers = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+    if backend not in drivers:
+        raise ValueError(f"No async driver for {scheme} databases")
+    return f"{drivers[backend]}://{rest}"
+
+def create_async_database_engine(database_url: Optional[str] = None, profile: Optional[str] = None) -> AsyncEngine:
+    """
+     Async version of create_database_engine.
+     On SQLite the production pragmas are set and the writes go through a serialized
+     writer whose lock is awaited, so waiting for it does not block the event loop.
+    """
+    database_url = database_url or settings.database_url
+    production = (profile or settings.database_profile) == "production"
+
+    async_url = async_database_url(database_url)
+    engine = create_async_engine(async_url, **engine_options(async_url, production))
+    if production and database_url.startswith("sqlite"):
+        configure_sqlite_production(
+            engine.sync_engine,
+            mmap_size=settings.sqlite_mmap_size,
+            cache_size_kib=settings.sqlite_cache_size_kib,
+            busy_timeout_ms=settings.sqlite_busy_timeout_ms
+        )
+    return engine
+
+engine = create_database_engine()
+async_engine = create_async_database_engine()
+# Reads that tolerate replication lag go to the replica when there is one
+read_engine = create_database_engine(settings.database_replica_url) if settings.database_replica_url else engine
+async_read_engine = create_async_database_engine(settings.database_replica_url) if settings.database_replica_url else async_engine
 
 def create_db_and_tables():
     """
      Create the database tables if they do not exist
+     and apply the pending schema migrations
     """
     SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
 
 def get_session():
     """
      Dependency function to obtain a database session.
     """
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def get_async_session():
+    """
+     Dependency function to obtain an async database session.
+     Objects are not expired on commit, so reading them afterwards needs no I/O
+    """
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+async def get_async_read_session():
+    """
+     Dependency function to obtain an async session of the read replica,
+     the primary when no replica is configured. Only for reads
+    """
+    async with AsyncSession(async_read_engine, expire_on_commit=False) as session:
+        yield session
@@ -1,6 +1,6 @@
 from typing import List, Optional
 from app.auth.auth_utils import hash_password,verify_password
-from sqlmodel import Session, select
+from sqlmodel import Session, select, func
 from app.models import User, Player, GameSession, GameAttempt
 from sqlalchemy.orm import selectinload
 
@@ -91,6 +91,7 @@ def create_game_attempt(session: Session, game_session_id: int, guessed_number:
     """
     game_attempt = GameAttempt(
         game_session_id = game_session_id,
+        attempt_number = get_last_attempt_number(session, game_session_id) + 1,
         guessed_number = guessed_number,
         correct_numbers = correct_numbers,
         correct_positions = correct_positions
@@ -102,6 +103,25 @@ def create_game_attempt(session: Session, game_session_id: int, guessed_number:
 
     return game_attempt
 
+def get_last_attempt_number(session: Session, game_session_id: int) -> int:
+    """
+        Gets the number of the last attempt of a game session, 0 if there are none
+    """
+    return session.exec(
+        select(func.max(GameAttempt.attempt_number))
+        .where(GameAttempt.game_session_id == game_session_id)
+    ).one() or 0
+
+def get_game_attempts(session: Session, game_session_id: int, after_attempt_number: int = 0) -> List[GameAttempt]:
+    """
+        Gets the attempts of a game session made after after_attempt_number, in order
+    """
+    return session.exec(
+        select(GameAttempt)
+        .where(GameAttempt.game_session_id == game_session_id, GameAttempt.attempt_number > after_attempt_number)
+        .order_by(GameAttempt.attempt_number)
+    ).all()
+
 def update_game_session(session: Session, game_session: GameSession):
     """
         Update a game session
@@ -0,0 +1,109 @@
+"""
+    Lightweight schema migrations.
+    SQLModel.metadata.create_all only creates missing tables, so changes to existing
+    tables (new columns, new indexes) are applied here. The version of the schema is
+    kept in the schema_version table and each migration runs once, in order.
+    Migrations are idempotent: a database created by create_all already has the
+    new columns and indexes, and two workers starting at once do not conflict.
+"""
+import logging
+from typing import Callable, List, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+logger = logging.getLogger(__name__)
+
+
+def _add_column(connection: Connection, table: str, column: str, definition: str) -> bool:
+    """
+        Adds a column if the table does not have it yet. Returns whether it was added
+    """
+    if column in {c["name"] for c in inspect(connection).get_columns(table)}:
+        return False
+    try:
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+        return True
+    except (OperationalError, ProgrammingError):
+        # Added by another worker in the meantime
+        return False
+
+
+def _create_index(connection: Connection, name: str, table: str, columns: str, unique: bool = False) -> None:
+    """
+        Creates an index if it does not exist. On PostgreSQL it is built
+        concurrently, so the table stays writable while it is built
+    """
+    statement = f"CREATE {'UNIQUE ' if unique else ''}INDEX {{concurrently}}IF NOT EXISTS {name} ON {table} ({columns})"
+    if connection.dialect.name == "postgresql":
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+        connection.commit()
+        autocommit = connection.execution_options(isolation_level="AUTOCOMMIT")
+        # Building an index on a large table may outlast the statement timeout
+        autocommit.execute(text("SET statement_timeout = 0"))
+        try:
+            autocommit.execute(text(statement.format(concurrently="CONCURRENTLY ")))
+        finally:
+            autocommit.execute(text("RESET statement_timeout"))
+    else:
+        connection.execute(text(statement.format(concurrently="")))
+
+
+def _attempt_numbers(connection: Connection) -> None:
+    """
+        game_attempt.attempt_number, numbered by id inside each game session
+    """
+    if _add_column(connection, "game_attempt", "attempt_number", "INTEGER NOT NULL DEFAULT 1"):
+        connection.execute(text(
+            "UPDATE game_attempt SET attempt_number = ("
+            " SELECT COUNT(*) FROM game_attempt AS previous"
+            " WHERE previous.game_session_id = game_attempt.game_session_id AND previous.id <= game_attempt.id)"
+        ))
+    _create_index(connection, "ix_game_attempt_session_number", "game_attempt", "game_session_id, attempt_number", unique=True)
+
+
+def _hot_query_indexes(connection: Connection) -> None:
+    """
+        Indexes of the leaderboard and of the game sessions of a player
+    """
+    _create_index(connection, "ix_player_score", "player", "score")
+    _create_index(connection, "ix_game_session_player_active", "game_session", "player_id, is_active")
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "attempt numbers", _attempt_numbers),
+    (2, "hot query indexes", _hot_query_indexes),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(engine: Engine) -> int:
+    with engine.connect() as connection:
+        if not inspect(connection).has_table("schema_version"):
+            return 0
+        return connection.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+
+
+def run_migrations(engine: Engine) -> int:
+    """
+        Applies the migrations newer than the schema version of the database.
+        Returns the schema version after migrating
+    """
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY)"))
+
+    current = get_schema_version(engine)
+    for version, description, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+
+        logger.info(f"Applying migration {version}: {description}")
+        with engine.connect() as connection:
+            migrate(connection)
+            if not connection.execute(text("SELECT 1 FROM schema_version WHERE version = :version"), {"version": version}).first():
+                connection.execute(text("INSERT INTO schema_version (version) VALUES (:version)"), {"version": version})
+            connection.commit()
+        current = version
+
+    return current
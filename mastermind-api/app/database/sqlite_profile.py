@@ -0,0 +1,135 @@
+"""
+    Production profile of the SQLite engine.
+    WAL lets readers run while a transaction writes, and the pragmas trade a little
+    durability (synchronous=NORMAL keeps the database consistent, the last commits can
+    be lost on power failure) for fewer fsyncs and more caching.
+    SQLite allows a single writer: instead of letting concurrent transactions fail with
+    "database is locked", the writes of this process go through a serialized writer
+    (a thread lock for sync engines, an asyncio lock for async ones).
+"""
+import asyncio
+import logging
+import threading
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.util import await_only
+
+logger = logging.getLogger(__name__)
+
+_WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class SerializedWriter:
+    """
+        Lock held by a connection from its first write statement until its
+        transaction ends, so only one transaction of the process writes at a time.
+        pysqlite only opens the transaction before the first write, so reads
+        never hold a snapshot that would go stale while waiting for the lock.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.timeouts = 0
+
+    def attach(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "commit", self._release)
+        event.listen(engine, "rollback", self._release)
+        # Safety net for connections returned to the pool in the middle of a transaction
+        event.listen(engine, "checkin", lambda dbapi_connection, record: self._release(record))
+
+    def _before_execute(self, connection, cursor, statement, parameters, context, executemany) -> None:
+        if connection.info.get("holds_writer") or not statement.lstrip().upper().startswith(_WRITE_STATEMENTS):
+            return
+
+        lock = self._acquire()
+        if lock is None:
+            # Let SQLite's own busy timeout deal with it rather than waiting forever
+            self.timeouts += 1
+            logger.warning("Timed out waiting for the serialized writer")
+            return
+        # The lock that was taken is kept, so the same one is released
+        connection.info["holds_writer"] = lock
+
+    def _acquire(self):
+        """
+            Takes the lock, returns it or None if it could not be taken in time
+        """
+        if not self._lock.acquire(blocking=False):
+            self.waits += 1
+            if not self._lock.acquire(timeout=self.timeout):
+                return None
+        return self._lock
+
+    def _release(self, connection) -> None:
+        lock = connection.info.pop("holds_writer", None)
+        if lock is not None:
+            lock.release()
+
+
+class AsyncSerializedWriter(SerializedWriter):
+    """
+        Serialized writer of an async engine. The engine runs its statements in a
+        greenlet of the event loop, so the lock is an asyncio.Lock awaited from there:
+        a transaction waiting to write suspends its coroutine instead of blocking the loop.
+        There is one lock per event loop (tests run several loops in one process)
+    """
+
+    def __init__(self, timeout: float):
+        super().__init__(timeout)
+        self._lock = None
+        self._loop = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._lock = loop, asyncio.Lock()
+        return self._lock
+
+    def _acquire(self):
+        lock = self._get_lock()
+        if lock.locked():
+            self.waits += 1
+        try:
+            await_only(self._acquire_within_timeout(lock))
+        except TimeoutError:
+            return None
+        return lock
+
+    async def _acquire_within_timeout(self, lock: asyncio.Lock) -> None:
+        async with asyncio.timeout(self.timeout):
+            await lock.acquire()
+
+
+def configure_sqlite_production(engine: Engine, mmap_size: int, cache_size_kib: int, busy_timeout_ms: int, serialize_writes: bool = True) -> Optional[SerializedWriter]:
+    """
+        Sets the production pragmas on every new connection of the engine
+        and attaches a serialized writer to it (unless serialize_writes is False).
+        For an async engine, pass its sync_engine: the writer uses an asyncio lock
+    """
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        # WAL is stored in the database file: switching needs a lock, so it is only
+        # done once instead of by every new connection
+        # (fetched separately: the aiosqlite adapter's execute does not return the cursor)
+        cursor.execute("PRAGMA journal_mode")
+        if cursor.fetchone()[0].lower() != "wal":
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        # A negative cache_size is in KiB instead of pages
+        cursor.execute(f"PRAGMA cache_size=-{int(cache_size_kib)}")
+        cursor.close()
+
+    if not serialize_writes:
+        return None
+
+    writer_class = AsyncSerializedWriter if engine.dialect.is_async else SerializedWriter
+    writer = writer_class(timeout=busy_timeout_ms / 1000)
+    writer.attach(engine)
+    return writer
@@ -1,18 +1,45 @@
+import asyncio
+import logging
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from app.database.connection import create_db_and_tables
+from app.database.connection import create_db_and_tables, async_engine, settings
+from app.auth.auth_utils import shutdown_hash_executor
+from app.services.feedback import load_feedback_tables
+from app.services.recommender import build_opening_books
+from app.client.secret_pool import load_secret_pools, save_secret_pools
+from app.services.hint_cache import hint_cache
+from app.services.hints_service import run_hint_prewarmer
+from app.services.leaderboard import load_leaderboard, run_leaderboard_refresher
 
 from app.routes.game_router import router as game_router
 from app.routes.auth_routes import router as auth_router
+from app.routes.metrics_router import router as metrics_router, prometheus_router
+from app.services.metrics import MetricsMiddleware
 
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
     print("Database and tables created successfully")
+    if settings.load_feedback_tables:
+        load_feedback_tables()
+        build_opening_books(only_missing=True)
+        logger.info("Feedback tables and opening books loaded")
+    load_secret_pools()
+    hint_cache.load()
+    load_leaderboard()
+    prewarmer = asyncio.create_task(run_hint_prewarmer()) if settings.hint_prewarm_enabled else None
+    refresher = asyncio.create_task(run_leaderboard_refresher()) if settings.leaderboard_refresh_interval > 0 else None
     yield
+    for task in (prewarmer, refresher):
+        if task:
+            task.cancel()
+    save_secret_pools()
+    shutdown_hash_executor()
+    await async_engine.dispose()
 
 
 
@@ -30,10 +57,14 @@ app.add_middleware(
     allow_headers=["*"],
 
 )
+# Latency, SQL statements and DB time of every request, scraped at /metrics
+app.add_middleware(MetricsMiddleware)
 
 # Routers
 app.include_router(auth_router,prefix="/api/v1")
 app.include_router(game_router, prefix="/api/v1")
+app.include_router(metrics_router, prefix="/api/v1")
+app.include_router(prometheus_router)
 
 
 @app.get("/")
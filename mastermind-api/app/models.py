@@ -1,5 +1,6 @@
 from datetime import datetime, timezone
 from typing import Optional, List
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel, Relationship
 
 
@@ -30,7 +31,8 @@ class Player(SQLModel, table= True):
     user_id: int = Field(foreign_key="users.id", unique= True)
 
 
-    score: int = Field(default=0)
+    # Indexed for the leaderboard (ORDER BY score DESC)
+    score: int = Field(default=0, index=True)
     last_attempt_score: Optional[int] = Field(default=None)
 
     #Relationships
@@ -49,6 +51,10 @@ class GameSession(SQLModel, table= True):
      Represents a Mastermind game
     """
     __tablename__= "game_session"
+    # Game sessions of a player, and the active ones among them
+    __table_args__ = (
+        Index("ix_game_session_player_active", "player_id", "is_active"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
     secret_number: str
@@ -62,16 +68,25 @@ class GameSession(SQLModel, table= True):
     # Many to one relationship with Player
     player: Optional[Player] = Relationship(back_populates="game_sessions") 
     
-    # One to many relationship with GameAttempt
-    attempts: List["GameAttempt"] = Relationship(back_populates="game_session")
+    # One to many relationship with GameAttempt, in the order they were made
+    attempts: List["GameAttempt"] = Relationship(
+        back_populates="game_session",
+        sa_relationship_kwargs={"order_by": "GameAttempt.attempt_number"}
+    )
 
 class GameAttempt(SQLModel, table= True):
     """
      Model for a player's attempts in a game session.
     """
     __tablename__="game_attempt"
+    # History reads and the next attempt number are range scans on this index
+    __table_args__ = (
+        Index("ix_game_attempt_session_number", "game_session_id", "attempt_number", unique=True),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
+    # Position of the attempt in its game session, starting at 1
+    attempt_number: int = Field(default=1)
     guessed_number: str
     correct_numbers: int
     correct_positions: int
@@ -80,4 +95,54 @@ class GameAttempt(SQLModel, table= True):
     game_session_id: Optional[int] = Field(default=None,foreign_key="game_session.id")
     
     # Many to one relationship with GameSession
-    game_session: Optional["GameSession"] = Relationship(back_populates="attempts")
\ No newline at end of file
+    game_session: Optional["GameSession"] = Relationship(back_populates="attempts")
+
+class HintRiddle(SQLModel, table= True):
+    """
+     Model for cached AI riddles.
+     Each riddle answers one of the digits of its unguessed digits set
+    """
+    __tablename__="hint_riddle"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    digits: str = Field(index=True)
+    riddle: str
+    created_at: datetime = Field(default_factory= lambda:datetime.now(timezone.utc))
+
+class ScoreEvent(SQLModel, table= True):
+    """
+     Model for the score ledger.
+     One row per scored attempt, with when it was made and its difficulty
+    """
+    __tablename__="score_event"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    player_id: int = Field(foreign_key="player.id", index=True)
+    game_session_id: int = Field(foreign_key="game_session.id")
+    difficulty_level: int
+    score: int
+    created_at: datetime = Field(default_factory= lambda:datetime.now(timezone.utc), index=True)
+
+class ScoreBucket(SQLModel, table= True):
+    """
+     Model for the score of a player in a time window, aggregated from the ledger.
+     period is day, week or all and bucket_start the first day of the window;
+     difficulty_level 0 aggregates every difficulty
+    """
+    __tablename__="score_bucket"
+
+    period: str = Field(primary_key=True)
+    bucket_start: str = Field(primary_key=True)
+    difficulty_level: int = Field(primary_key=True)
+    player_id: int = Field(foreign_key="player.id", primary_key=True)
+    score: int = Field(default=0)
+
+# Ranking of a bucket: ORDER BY score DESC, player_id read straight from the index
+Index(
+    "ix_score_bucket_ranking",
+    ScoreBucket.period,
+    ScoreBucket.bucket_start,
+    ScoreBucket.difficulty_level,
+    ScoreBucket.score.desc(),
+    ScoreBucket.player_id
+)
@@ -1,34 +1,34 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.auth.auth_utils import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
-from app.auth.auth_middleware import get_current_user
-from app.database.crud import create_user, authenticate_user, get_user_by_username, get_user_by_email, get_player_by_user_id
+from app.auth.auth_middleware import get_current_user_async
+from app.database.async_crud import create_user, authenticate_user, get_user_by_username, get_user_by_email, get_player_by_user_id
 from app.schemas import UserCreate, UserLogin, Token, UserResponse,UserRegisterResponse
-from app.database.connection import get_session
+from app.database.connection import get_async_session
 
 router = APIRouter(prefix="/auth",tags=["Authentication"])
 
 @router.post("/register",response_model= UserRegisterResponse)
-async def register_user( user_data: UserCreate, session:Session=Depends(get_session)):
+async def register_user( user_data: UserCreate, session: AsyncSession = Depends(get_async_session)):
     """
         Register a new user
     """
 
-    if get_user_by_username(session, user_data.username):
+    if await get_user_by_username(session, user_data.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username is alredy registered"
         )
     
-    if get_user_by_email(session, user_data.email):
+    if await get_user_by_email(session, user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email is alredy registered"
         )
     
     try:
-        user = create_user(
+        user = await create_user(
             session= session,
             username = user_data.username,
             email= user_data.email,
@@ -43,11 +43,11 @@ async def register_user( user_data: UserCreate, session:Session=Depends(get_sess
     
 
 @router.post("/login", response_model= Token)
-async def login(login_data: UserLogin, session: Session = Depends(get_session)):
+async def login(login_data: UserLogin, session: AsyncSession = Depends(get_async_session)):
     """
         Authenticates a user and returns a JWT token
     """
-    user = authenticate_user(session,login_data.username, login_data.password)
+    user = await authenticate_user(session,login_data.username, login_data.password)
 
     if not user:
         raise HTTPException(
@@ -56,10 +56,11 @@ async def login(login_data: UserLogin, session: Session = Depends(get_session)):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Create token
+    # Create token. The ids in the claims save the lookups on every request
+    player = await get_player_by_user_id(session, user.id)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, 
+        data={"sub": user.username, "user_id": user.id, "player_id": player.id if player else None}, 
         expires_delta=access_token_expires
     )
     
@@ -69,11 +70,11 @@ async def login(login_data: UserLogin, session: Session = Depends(get_session)):
     }
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user = Depends(get_current_user), session: Session = Depends(get_session)):
+async def get_current_user_info(current_user = Depends(get_current_user_async), session: AsyncSession = Depends(get_async_session)):
     """
         Gets current user information
     """
-    player = get_player_by_user_id(session, current_user.id)
+    player = await get_player_by_user_id(session, current_user.id)
     
     return {
         "id": current_user.id,
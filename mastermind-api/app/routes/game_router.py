@@ -1,24 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from typing import List, Optional
+import json
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
-from app.database.connection import get_session
-from app.services.game import evaluate_player_number
-from app.services.score import update_player_score
-from app.services.hints_service import generate_hint
-from app.database.crud import(
-    get_player_by_user_id,
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database.connection import get_async_session, get_async_read_session
+from app.services.hints_service import generate_hint_async
+from app.services.solver import get_candidate_set
+from app.services.leaderboard import leaderboard, ranking_cache, ranking_etag
+from app.services.score_ledger import bucket_starts, get_top_players_in_window
+from app.services.guess_service import GuessConflictError, submit_guess, submit_guesses, attempt_to_dict
+from app.services.game_channel import ChannelError, open_channel
+from app.services.recommender import recommend_next_guess, DEFAULT_TIME_BUDGET_MS
+from app.database.async_crud import(
     create_game_session,
-    create_game_attempt,
-    update_game_session,
-    get_top_players
+    get_game_session,
+    get_game_attempts
 )
-from app.models import GameSession, User
-from app.client.random_number import get_secret_number
-from app.auth.auth_middleware import get_current_user
+from app.models import GameSession
+from app.client.secret_pool import draw_secret_number
+from app.client.random_number import DIFFICULTY_CONFIG
+from app.auth.auth_middleware import get_current_principal_async, decode_channel_token, principal_from_payload
+from app.auth.principal_cache import Principal
 
 router = APIRouter(prefix="/game", tags=["Game"])
 
 @router.post("/start_game/")
-def start_game(difficulty_level: int, current_user: User = Depends(get_current_user), session: Session=Depends(get_session)):
+async def start_game(difficulty_level: int, principal: Principal = Depends(get_current_principal_async), session: AsyncSession = Depends(get_async_session)):
     """
         Endpoint to start a new game
     """
@@ -26,18 +35,16 @@ def start_game(difficulty_level: int, current_user: User = Depends(get_current_u
     if difficulty_level not in [1,2,3]:
         raise HTTPException(status_code = 400, detail="Invalid difficulty level. Use 1, 2 or 3.")
     
-    player = get_player_by_user_id(session,current_user.id)
-
-    if not player:
+    if principal.player_id is None:
         raise HTTPException(status_code= 404, detail ="Player profine not found")
 
-    secret_number_list, attempts_left = get_secret_number(difficulty_level)
+    secret_number_list, attempts_left = draw_secret_number(difficulty_level)
     secret_number_str = "".join(secret_number_list)
     print(f"SECRET_NUMBER: {secret_number_str}")
     
-    game_session = create_game_session(
+    game_session = await create_game_session(
         session,
-        player_id=player.id,
+        player_id=principal.player_id,
         secret_number= secret_number_str,
         difficulty_level= difficulty_level,
         attempts_left=attempts_left
@@ -49,23 +56,31 @@ def start_game(difficulty_level: int, current_user: User = Depends(get_current_u
         "attempts_left": game_session.attempts_left
     }
 
+# A batch never needs more guesses than the attempts of the easiest level
+MAX_BATCH_GUESSES = max(attempts for _, attempts in DIFFICULTY_CONFIG.values())
+
+
 @router.post("/guess/")
-def make_a_guess(
+async def make_a_guess(
     session_id: int = Body(...), 
     guessed_number: str = Body(..., max_length=4, min_length=4), 
-    current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    last_attempt_number: Optional[int] = Body(None, ge=0),
+    principal: Principal = Depends(get_current_principal_async),
+    session: AsyncSession = Depends(get_async_session)
 ):
     """
-        Endpoint to register an attempt to guess the number
+        Endpoint to register an attempt to guess the number.
+        If last_attempt_number is sent, the history only holds the attempts after it.
+        The guess is scored and stored by the sync guess service, run on the
+        connection of the async session
     """
 
-    game_session = session.get(GameSession, session_id)
+    game_session = await get_game_session(session, session_id)
     
     if not game_session:
         raise HTTPException(status_code=404, detail="Game session not found")
     
-    if game_session.player.user_id != current_user.id:
+    if game_session.player_id != principal.player_id:
         raise HTTPException(status_code=403, detail= "Access denied to this game session")
     
     if not game_session.is_active:
@@ -74,71 +89,88 @@ def make_a_guess(
     if not guessed_number.isdigit():
         raise HTTPException(status_code=400, detail="The guessed number must be of 4 numeric digits ")
     
-    guessed_number_list = list(guessed_number)
-    secret_number_list = list(game_session.secret_number)
+    try:
+        outcome = await session.run_sync(submit_guess, game_session, guessed_number, last_attempt_number)
+    except GuessConflictError:
+        raise HTTPException(status_code=409, detail="Another attempt of this game session was registered at the same time, try again")
 
-    correct_numbers, correct_positions = evaluate_player_number( guessed_number_list, secret_number_list)
+    if outcome["result"] == "LOSE":
+        return {"message": "Game Over", "result": "LOSE", "total_score": outcome["total_score"]}
 
-    player = game_session.player
+    if outcome["result"] == "WIN":
+        return {"message": "Congratulations, you won", "result": "WIN", "total_score": outcome["total_score"]}
 
-    score_this_attempt = update_player_score(
-        player,
-        game_session,
-        correct_numbers,
-        correct_positions
-    )
+    return {
+        "message":"Attempt registered.",
+        "attempt_number": outcome["attempt_number"],
+        "score_this_attempt": outcome["score_this_attempt"],
+        "total_score": outcome["total_score"],
+        "result":{
+            "correct_numbers": outcome["correct_numbers"],
+            "correct_positions": outcome["correct_positions"]
+        },
+        "attempts_left": outcome["attempts_left"],
+        "history": outcome["history"]
+    }
 
-    session.add(player)
-    session.commit()
-    session.refresh(player)
+@router.post("/guess_batch/")
+async def make_guesses(
+    session_id: int = Body(...),
+    guessed_numbers: List[str] = Body(..., min_length=1, max_length=MAX_BATCH_GUESSES),
+    last_attempt_number: Optional[int] = Body(None, ge=0),
+    principal: Principal = Depends(get_current_principal_async),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+        Endpoint to register several attempts of a game session at once, in order.
+        They are scored as the same guesses sent one by one to /guess/; the guesses after
+        the one that ends the game are not registered (ignored_guesses).
+        All the attempts are stored in one transaction
+    """
 
-    create_game_attempt(
-        session,
-        game_session_id= game_session.id,
-        guessed_number= guessed_number,
-        correct_numbers= correct_numbers,
-        correct_positions= correct_positions
-    )
+    if any(len(guessed_number) != 4 or not guessed_number.isdigit() for guessed_number in guessed_numbers):
+        raise HTTPException(status_code=400, detail="The guessed numbers must be of 4 numeric digits ")
 
-    game_session.attempts_left -= 1
-    update_game_session(session, game_session)
+    game_session = await get_game_session(session, session_id)
 
-    session.refresh(game_session)
+    if not game_session:
+        raise HTTPException(status_code=404, detail="Game session not found")
 
-    history = [
-        {"guessed_number": attempt.guessed_number,
-         "correct_numbers": attempt.correct_numbers,
-         "correct_positions": attempt.correct_positions 
-        }
-        for attempt in game_session.attempts
-    ]
+    if game_session.player_id != principal.player_id:
+        raise HTTPException(status_code=403, detail= "Access denied to this game session")
 
-    if game_session.attempts_left == 0:
-        game_session.is_active = False
-        update_game_session(session, game_session)
-        return {"message": "Game Over", "result": "LOSE", "total_score": player.score}
+    if not game_session.is_active:
+        raise HTTPException(status_code=400, detail="Game session already ended")
 
-    if correct_positions == 4:
-        game_session.is_active = False
-        update_game_session(session, game_session)
-        return {"message": "Congratulations, you won", "result": "WIN", "total_score": player.score}
+    try:
+        outcome = await session.run_sync(submit_guesses, game_session, guessed_numbers, last_attempt_number)
+    except GuessConflictError:
+        raise HTTPException(status_code=409, detail="Another attempt of this game session was registered at the same time, try again")
 
+    messages = {"LOSE": "Game Over", "WIN": "Congratulations, you won", None: "Attempts registered."}
     return {
-        "message":"Attempt registered.",
-        "score_this_attempt": score_this_attempt,
-        "total_score": player.score,
-        "result":{
-            "correct_numbers": correct_numbers,
-            "correct_positions": correct_positions
-        },
-        "attempts_left": game_session.attempts_left,
-        "history": history
+        "message": messages[outcome["result"]],
+        "result": outcome["result"],
+        "attempts": [
+            {
+                "attempt_number": attempt["attempt_number"],
+                "guessed_number": attempt["guessed_number"],
+                "score_this_attempt": attempt["score_this_attempt"],
+                "correct_numbers": attempt["correct_numbers"],
+                "correct_positions": attempt["correct_positions"]
+            }
+            for attempt in outcome["attempts"]
+        ],
+        "ignored_guesses": outcome["ignored_guesses"],
+        "total_score": outcome["total_score"],
+        "attempts_left": outcome["attempts_left"],
+        "history": outcome["history"]
     }
 
-@router.post("/get_ai_hint/")
-def get_hint(session_id: int = Body(...), current_user:User = Depends(get_current_user), session: Session = Depends(get_session)):
+def _load_hint_context(session: Session, session_id: int, principal: Principal):
     """
-        Endpoint to obtain an AI or backup hint
+        Loads and validates what a hint needs from the database.
+        Returns the last guessed number, the secret number and the remaining candidates
     """
     game_session = session.exec(
         select(GameSession).where(GameSession.id == session_id)
@@ -147,7 +179,7 @@ def get_hint(session_id: int = Body(...), current_user:User = Depends(get_curren
     if not game_session:
         raise HTTPException(status_code=404, detail = "Game session not found")
 
-    if game_session.player.user_id != current_user.id:
+    if game_session.player_id != principal.player_id:
         raise HTTPException(status_code=403, detail="Access denied to this game session ")
     
     if not game_session.is_active:
@@ -159,35 +191,231 @@ def get_hint(session_id: int = Body(...), current_user:User = Depends(get_curren
     secret_number_list = list(game_session.secret_number)
     last_attempt = game_session.attempts[-1]
 
-    hint_text = generate_hint(
-        last_attempt.guessed_number,
+    return last_attempt.guessed_number, secret_number_list, get_candidate_set(game_session).count()
+
+
+@router.post("/get_ai_hint/")
+async def get_hint(session_id: int = Body(...), principal: Principal = Depends(get_current_principal_async), session: AsyncSession = Depends(get_async_session)):
+    """
+        Endpoint to obtain an AI or backup hint.
+        The database work runs on the connection of the async session; the AI
+        call is awaited without holding a worker thread or a database connection.
+    """
+    guessed_number, secret_number_list, remaining_candidates = await session.run_sync(
+        _load_hint_context, session_id, principal
+    )
+    # Ends the read transaction: the connection goes back to the pool during the AI call
+    await session.commit()
+
+    hint_text = await generate_hint_async(
+        guessed_number,
         secret_number= secret_number_list
     )
 
-    return {"hint": hint_text}
+    return {
+        "hint": hint_text,
+        "remaining_candidates": remaining_candidates
+    }
+
+
+async def _receive_frame(websocket: WebSocket) -> dict:
+    try:
+        frame = await websocket.receive_json()
+    except (ValueError, KeyError):
+        frame = None
+    if not isinstance(frame, dict):
+        raise ChannelError(400, "Frames must be JSON objects")
+    return frame
+
+
+@router.websocket("/ws/")
+async def game_channel(websocket: WebSocket, session: AsyncSession = Depends(get_async_session)):
+    """
+        WebSocket game channel, for interactive clients.
+        The first frame authenticates once and binds the channel to a game session:
+        {"token": "<access token>", "session_id": 1}, answered with a "bound" frame
+        holding the session state and its history. Every {"guessed_number": "1234"}
+        frame is then answered with a "feedback" frame, until the game ends or the
+        token expires. Errors are sent as "error" frames with the HTTP status code
+    """
+    await websocket.accept()
+    try:
+        frame = await _receive_frame(websocket)
+        try:
+            payload = decode_channel_token(frame.get("token") or "")
+            principal = await principal_from_payload(payload, session)
+        except HTTPException as error:
+            raise ChannelError(error.status_code, error.detail)
+        channel, history = await session.run_sync(open_channel, frame.get("session_id"), principal.player_id, payload["exp"])
+    except ChannelError as error:
+        await websocket.send_json(error.frame())
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    except WebSocketDisconnect:
+        return
+
+    try:
+        await websocket.send_json({"type": "bound", **channel.state(), "history": history})
+        while True:
+            # No transaction (nor pooled connection) is held while the client is idle;
+            # the channel objects stay loaded, the session does not expire them on commit
+            await session.commit()
+            try:
+                frame = await _receive_frame(websocket)
+                if channel.expired():
+                    await websocket.send_json(ChannelError(401, "Credentials could not be validated").frame())
+                    await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+                    return
+                feedback = await session.run_sync(channel.guess, frame.get("guessed_number"))
+            except ChannelError as error:
+                await websocket.send_json(error.frame())
+                if not channel.game_session.is_active:
+                    await websocket.close()
+                    return
+                continue
+
+            await websocket.send_json(feedback)
+            if feedback["result"]:
+                await websocket.close()
+                return
+    except WebSocketDisconnect:
+        pass
+    finally:
+        channel.close()
+
+
+@router.post("/history/")
+async def get_history(
+    session_id: int = Body(...),
+    last_attempt_number: int = Body(0, ge=0),
+    principal: Principal = Depends(get_current_principal_async),
+    session: AsyncSession = Depends(get_async_read_session)
+):
+    """
+        Endpoint to obtain the attempts of a game session made after last_attempt_number,
+        the whole history by default. Read from the replica when there is one
+    """
+    game_session = await session.get(GameSession, session_id)
+
+    if not game_session:
+        raise HTTPException(status_code=404, detail="Game session not found")
+
+    if game_session.player_id != principal.player_id:
+        raise HTTPException(status_code=403, detail="Access denied to this game session")
+
+    attempts = await get_game_attempts(session, session_id, last_attempt_number)
+    return {
+        "session_id": game_session.id,
+        "history": [attempt_to_dict(attempt) for attempt in attempts]
+    }
+
+
+@router.post("/remaining_candidates/")
+async def get_remaining_candidates(session_id: int = Body(...), principal: Principal = Depends(get_current_principal_async), session: AsyncSession = Depends(get_async_session)):
+    """
+        Endpoint to obtain how many secret numbers are still consistent with the attempts
+    """
+    game_session = await get_game_session(session, session_id, with_attempts=True)
+
+    if not game_session:
+        raise HTTPException(status_code=404, detail="Game session not found")
+
+    if game_session.player_id != principal.player_id:
+        raise HTTPException(status_code=403, detail="Access denied to this game session")
+
+    return {
+        "session_id": game_session.id,
+        "remaining_candidates": (await run_in_threadpool(get_candidate_set, game_session)).count()
+    }
+
+
+@router.post("/best_guess/")
+async def get_best_guess(
+    session_id: int = Body(...),
+    strategy: str = Body("minimax"),
+    time_budget_ms: int = Body(DEFAULT_TIME_BUDGET_MS, gt=0),
+    principal: Principal = Depends(get_current_principal_async),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+        Endpoint to obtain the recommended next guess (minimax or entropy strategy).
+        The search runs in the threadpool so it does not block the event loop
+    """
+    game_session = await get_game_session(session, session_id, with_attempts=True)
+
+    if not game_session:
+        raise HTTPException(status_code=404, detail="Game session not found")
+
+    if game_session.player_id != principal.player_id:
+        raise HTTPException(status_code=403, detail="Access denied to this game session")
+
+    if not game_session.is_active:
+        raise HTTPException(status_code=400, detail="Game session already ended")
+
+    try:
+        return await run_in_threadpool(recommend_next_guess, game_session, strategy, time_budget_ms)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/top_players/")
-def get_top_three_players(session: Session = Depends(get_session)):
+async def get_top_players_ranking(
+    request: Request,
+    limit: int = Query(3, ge=1, le=100),
+    window: str = Query("all", pattern="^(day|week|all)$"),
+    difficulty: Optional[int] = Query(None, ge=1, le=3),
+    session: AsyncSession = Depends(get_async_read_session)
+):
     """
-        Endpoint to obtain the 3 best players
+        Endpoint to obtain the best players (3 by default) of all time, of the
+        current day or week (UTC), and of one difficulty or all of them.
+        The all-time ranking is served from the in-memory leaderboard, the
+        others from the score buckets (of the read replica when there is one).
+        Responses carry an ETag that changes with the leaderboard version: a
+        request with a matching If-None-Match gets a 304 without touching the
+        database, and the serialized body is reused until the version changes.
     """
-    players = get_top_players(session)
-    
-    # Serialización manual para incluir user data
-    players_data = []
-    for player in players:
-        player_dict = {
-            "id": player.id,
-            "user_id": player.user_id,
-            "score": player.score,
-            "last_attempt_score": player.last_attempt_score,
-            "user": {
-                "id": player.user.id,
-                "username": player.user.username,
-                "email": player.user.email
-            } if player.user else None
-        }
-        players_data.append(player_dict)
-    
-    return {"top_players": players_data}
\ No newline at end of file
+    etag = ranking_etag(bucket_starts(datetime.now(timezone.utc))[window], difficulty)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    key = (limit, window, difficulty)
+    body = ranking_cache.get(key, etag)
+    if body is None:
+        if window == "all" and difficulty is None:
+            players = leaderboard.top(limit)
+        else:
+            players = await session.run_sync(get_top_players_in_window, window, difficulty, limit)
+        body = json.dumps({"top_players": players}, separators=(",", ":")).encode()
+        ranking_cache.put(key, etag, body)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+        Whether an If-None-Match header matches the ETag (weak comparison)
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+@router.get("/my_rank/")
+async def get_my_rank(radius: int = Query(2, ge=0, le=50), principal: Principal = Depends(get_current_principal_async)):
+    """
+        Endpoint to obtain the rank of the current player and the players ranked around it
+    """
+    entry = leaderboard.player(principal.player_id) if principal.player_id is not None else None
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Player profile not found")
+
+    return {
+        "rank": entry["rank"],
+        "score": entry["score"],
+        "total_players": len(leaderboard),
+        "around": leaderboard.around(principal.player_id, radius)
+    }
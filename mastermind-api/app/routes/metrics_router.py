@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Response
+from app.client.ai_client import get_ai_client_metrics
+from app.services.hint_cache import hint_cache
+from app.services.metrics import CONTENT_TYPE, render_metrics
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+# Served at /metrics, outside /api/v1, where Prometheus scrapes by default
+prometheus_router = APIRouter(tags=["Metrics"])
+
+@router.get("/ai")
+def get_ai_metrics():
+    """
+        Endpoint to obtain the state of the AI hint path:
+        circuit breaker, request coalescing and hint cache
+    """
+    return {
+        **get_ai_client_metrics(),
+        "hint_cache": hint_cache.stats()
+    }
+
+@prometheus_router.get("/metrics", include_in_schema=False)
+def get_prometheus_metrics():
+    """
+        Endpoint to scrape the request, SQL and upstream metrics in the Prometheus text format
+    """
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
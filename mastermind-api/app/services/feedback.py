@@ -0,0 +1,219 @@
+import os
+import logging
+import threading
+import numpy as np
+from functools import lru_cache
+from typing import Dict, Optional
+from app.database.connection import settings
+
+# Every code has 4 digits. Each difficulty uses a different alphabet size (base)
+CODE_LENGTH = 4
+DIFFICULTY_BASES = {1: 6, 2: 8, 3: 10}
+
+# Number of pair comparisons computed at once while building a table
+_CHUNK_CELLS = 2**22
+
+logger = logging.getLogger(__name__)
+
+_tables: Dict[int, np.ndarray] = {}
+_tables_lock = threading.Lock()
+
+
+def base_for_difficulty(difficulty_level: int) -> int:
+    """
+        Returns the alphabet size (number of possible digits) of a difficulty level
+    """
+    return DIFFICULTY_BASES.get(difficulty_level, 10)
+
+
+def code_to_index(code: str, base: int) -> int:
+    """
+        Encodes a 4 digit code as its integer index in the given base.
+    """
+    return int(code, base)
+
+
+def index_to_code(index: int, base: int) -> str:
+    """
+        Decodes an integer index back into its 4 digit code
+    """
+    digits = []
+    for _ in range(CODE_LENGTH):
+        index, digit = divmod(index, base)
+        digits.append(str(digit))
+    return "".join(reversed(digits))
+
+
+def pack_feedback(correct_numbers: int, correct_positions: int) -> int:
+    """
+        Packs a feedback pair into a single byte
+    """
+    return (correct_numbers << 4) | correct_positions
+
+
+def unpack_feedback(packed: int) -> tuple[int, int]:
+    """
+        Unpacks a feedback byte into (correct_numbers, correct_positions)
+    """
+    packed = int(packed)
+    return packed >> 4, packed & 0x0F
+
+
+@lru_cache(maxsize=None)
+def all_codes(base: int) -> np.ndarray:
+    """
+        Returns the digit matrix (base^4 x 4) of every code, ordered by index.
+        The matrix is cached, so it must not be modified
+    """
+    indexes = np.arange(base**CODE_LENGTH)
+    columns = [(indexes // base**power) % base for power in range(CODE_LENGTH - 1, -1, -1)]
+    codes = np.stack(columns, axis=1).astype(np.uint8)
+    codes.flags.writeable = False
+    return codes
+
+
+def digit_histograms(codes: np.ndarray, base: int) -> np.ndarray:
+    """
+        Counts how many times each digit appears in every code of a digit matrix.
+        Returns a (len(codes) x base) matrix, stored digit-major for fast column access
+    """
+    columns = np.ascontiguousarray(codes.T)
+    counts = np.empty((base, len(codes)), dtype=np.uint8)
+    for digit in range(base):
+        np.sum(columns == digit, axis=0, dtype=np.uint8, out=counts[digit])
+    return counts.T
+
+
+def _feedback_matrix(guesses: np.ndarray, secrets: np.ndarray, base: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+        Computes the packed feedback of every guess against every secret.
+        Returns a (len(guesses) x len(secrets)) uint8 matrix, written into out if given.
+    """
+    secret_histograms = digit_histograms(secrets, base)
+    guess_histograms = digit_histograms(guesses, base)
+    result = out if out is not None else np.empty((len(guesses), len(secrets)), dtype=np.uint8)
+
+    step = max(1, _CHUNK_CELLS // (len(secrets) * base))
+    for start in range(0, len(guesses), step):
+        chunk = guesses[start:start + step]
+
+        positions = np.zeros((len(chunk), len(secrets)), dtype=np.uint8)
+        for position in range(CODE_LENGTH):
+            positions += chunk[:, position, None] == secrets[None, :, position]
+
+        # A digit matches as many times as it appears in the code that has it fewer times
+        numbers = np.minimum(
+            guess_histograms[start:start + step, None, :],
+            secret_histograms[None, :, :]
+        ).sum(axis=-1, dtype=np.uint8)
+
+        result[start:start + step] = (numbers << 4) | positions
+
+    return result
+
+
+def _table_path(base: int) -> str:
+    return os.path.join(settings.feedback_table_dir, f"feedback_base{base}.npy")
+
+
+def _build_table_file(base: int, path: str) -> None:
+    """
+        Builds the table into a temporary file and moves it into place atomically,
+        so concurrent workers never read a half written table
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    codes = all_codes(base)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+
+    table = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint8, shape=(len(codes), len(codes)))
+    _feedback_matrix(codes, codes, base, out=table)
+    table.flush()
+    del table
+
+    os.replace(tmp_path, path)
+
+
+def _open_table(base: int, path: str) -> Optional[np.ndarray]:
+    """
+        Memory-maps an existing table file. Returns None if it is missing or invalid
+    """
+    size = base**CODE_LENGTH
+    try:
+        table = np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+    if table.shape != (size, size) or table.dtype != np.uint8:
+        logger.warning(f"Ignoring invalid feedback table at {path}")
+        return None
+
+    # Plain ndarray view over the mapped pages, indexing it is cheaper than a memmap
+    return table.view(np.ndarray)
+
+
+def get_feedback_table(base: int) -> np.ndarray:
+    """
+        Returns the feedback table of a base, indexed as table[guess_index, secret_index].
+        The table is memory-mapped from disk, building the file first if needed,
+        so all the workers of a server share the same pages.
+    """
+    table = _tables.get(base)
+    if table is not None:
+        return table
+
+    with _tables_lock:
+        if base in _tables:
+            return _tables[base]
+
+        path = _table_path(base)
+        table = _open_table(base, path)
+        if table is None:
+            logger.info(f"Building feedback table for base {base} at {path}")
+            _build_table_file(base, path)
+            table = _open_table(base, path)
+
+        _tables[base] = table
+        return table
+
+
+def load_feedback_tables() -> None:
+    """
+        Loads (building them once if needed) the tables of every difficulty level.
+        Intended to run at startup
+    """
+    for base in sorted(set(DIFFICULTY_BASES.values())):
+        get_feedback_table(base)
+
+
+def loaded_feedback_table(base: int) -> Optional[np.ndarray]:
+    """
+        Returns the table of a base only if it is already loaded
+    """
+    return _tables.get(base)
+
+
+def feedback_row(base: int, guess: str) -> np.ndarray:
+    """
+        Returns the packed feedback of a guess against every code of a base.
+        Uses the loaded table when possible, otherwise computes the row directly
+    """
+    highest_digit = int(max(guess))
+    table = _tables.get(base)
+    if table is not None and highest_digit < base:
+        return table[code_to_index(guess, base)]
+
+    guess_codes = np.array([[int(digit) for digit in guess]], dtype=np.uint8)
+    return _feedback_matrix(guess_codes, all_codes(base), max(base, highest_digit + 1))[0]
+
+
+def feedback_block(base: int, guess_indexes: np.ndarray, secret_indexes: np.ndarray) -> np.ndarray:
+    """
+        Returns the packed feedback of several guesses against several secrets,
+        all given as code indexes of the same base
+    """
+    table = _tables.get(base)
+    if table is not None:
+        return table[np.ix_(guess_indexes, secret_indexes)]
+
+    codes = all_codes(base)
+    return _feedback_matrix(codes[guess_indexes], codes[secret_indexes], base)
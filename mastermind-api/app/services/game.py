@@ -1,9 +1,36 @@
+import numpy as np
 from collections import defaultdict
+from app.services.feedback import CODE_LENGTH, DIFFICULTY_BASES, digit_histograms, loaded_feedback_table, unpack_feedback
+
+# Smallest difficulty base able to represent a code, by its highest digit
+_BASE_BY_HIGHEST_DIGIT = {
+    str(digit): min(base for base in DIFFICULTY_BASES.values() if digit < base)
+    for digit in range(10)
+}
 
 def evaluate_player_number(player_number, secret_number):
     """
        Evaluates the player_number against the secret_number and
-       retunns the count of correct numbers an correct positions 
+       retunns the count of correct numbers an correct positions.
+       Uses the precomputed feedback table when it is loaded.
+    """
+    guess = "".join(player_number)
+    secret = "".join(secret_number)
+
+    digits = guess + secret
+
+    if len(digits) == 2*CODE_LENGTH and len(guess) == CODE_LENGTH and digits.isascii() and digits.isdigit():
+        base = _BASE_BY_HIGHEST_DIGIT[max(digits)]
+        table = loaded_feedback_table(base)
+        if table is not None:
+            return unpack_feedback(table.item(int(guess, base), int(secret, base)))
+
+    return _evaluate_player_number_scalar(player_number, secret_number)
+
+def _evaluate_player_number_scalar(player_number, secret_number):
+    """
+       Reference implementation of evaluate_player_number, used when
+       no feedback table is available for the numbers
     """
     correct_numbers_count = 0
     correct_positions_count = 0
@@ -25,7 +52,7 @@ def evaluate_player_number(player_number, secret_number):
             correct_numbers_count +=1
             digit_secret_count[player_number[i]] -= 1
             matched_positions[i] = True
-    
+
     #  Count correct digits in wrong positions (not yet matched)
     for i in range(len(player_number)):
         if not matched_positions[i]:
@@ -34,4 +61,29 @@ def evaluate_player_number(player_number, secret_number):
                 correct_numbers_count +=1
                 digit_secret_count[digit] -= 1
 
-    return correct_numbers_count, correct_positions_count
\ No newline at end of file
+    return correct_numbers_count, correct_positions_count
+
+def evaluate_batch(guesses, secrets):
+    """
+       Vectorized version of evaluate_player_number for many pairs at once.
+       guesses and secrets are digit matrices (n x 4) that are compared row by row,
+       a single row is broadcast against all the rows of the other matrix.
+       Returns two arrays: correct numbers and correct positions of every pair.
+    """
+    guesses, secrets = np.broadcast_arrays(
+        np.atleast_2d(np.asarray(guesses, dtype=np.uint8)),
+        np.atleast_2d(np.asarray(secrets, dtype=np.uint8))
+    )
+
+    if guesses.shape[-1] != CODE_LENGTH:
+        raise ValueError(f"Codes must have {CODE_LENGTH} digits")
+
+    correct_positions = (guesses == secrets).sum(axis=-1, dtype=np.uint8)
+
+    # Digits shared by both codes: per digit minimum of the two histograms
+    base = int(max(guesses.max(initial=0), secrets.max(initial=0))) + 1
+    guess_histograms = digit_histograms(guesses.reshape(-1, CODE_LENGTH), base)
+    secret_histograms = digit_histograms(secrets.reshape(-1, CODE_LENGTH), base)
+    correct_numbers = np.minimum(guess_histograms.T, secret_histograms.T).sum(axis=0, dtype=np.uint8)
+
+    return correct_numbers.reshape(correct_positions.shape), correct_positions
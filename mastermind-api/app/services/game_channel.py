@@ -0,0 +1,129 @@
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from sqlmodel import Session
+from app.models import GameSession
+from app.database.crud import get_game_attempts, get_last_attempt_number
+from app.services.guess_service import GuessConflictError, load_game_session, play_and_write_attempts, attempt_to_dict
+
+logger = logging.getLogger(__name__)
+
+# Game sessions with an open channel in this process: one channel per game session
+_bound_sessions = set()
+
+
+class ChannelError(Exception):
+    """
+        Error sent to the client of a game channel in an error frame.
+        status_code and detail are the ones the HTTP routes use for the same error
+    """
+
+    def __init__(self, status_code: int, detail: str, state: Optional[Dict[str, Any]] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.state = state
+
+    def frame(self) -> Dict[str, Any]:
+        frame = {"type": "error", "status": self.status_code, "detail": self.detail}
+        if self.state is not None:
+            frame["state"] = self.state
+        return frame
+
+
+class GameChannel:
+    """
+        State of a WebSocket game channel bound to one game session.
+        The game session stays in memory for the whole connection and every guess is
+        written through to the database, so a guess costs no token check, no session
+        load and no attempt number query. Only the score columns of the player are read
+        again, by the claim of the session, since other games of the same player may
+        change them meanwhile.
+        A guess registered outside the channel is detected by the claim of the session
+        row, and the channel reloads the session
+    """
+
+    def __init__(self, game_session: GameSession, last_attempt_number: int, expires_at: float):
+        self.game_session = game_session
+        self.session_id = game_session.id
+        self.next_attempt_number = last_attempt_number + 1
+        self.expires_at = expires_at
+
+    def expired(self) -> bool:
+        """
+            True once the token used to open the channel has expired
+        """
+        return time.time() >= self.expires_at
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.game_session.id,
+            "difficulty_level": self.game_session.difficulty_level,
+            "attempts_left": self.game_session.attempts_left,
+            "last_attempt_number": self.next_attempt_number - 1,
+            "is_active": self.game_session.is_active
+        }
+
+    def guess(self, session: Session, guessed_number: Any) -> Dict[str, Any]:
+        """
+            Scores a guess and writes it through. Returns the feedback frame
+        """
+        if not isinstance(guessed_number, str) or len(guessed_number) != 4 or not guessed_number.isdigit():
+            raise ChannelError(400, "The guessed number must be of 4 numeric digits ")
+        if not self.game_session.is_active:
+            raise ChannelError(400, "Game session already ended")
+
+        try:
+            step = play_and_write_attempts(session, self.game_session, [guessed_number], self.next_attempt_number)[0]
+        except GuessConflictError:
+            # Another client registered an attempt of this session since the last guess
+            logger.info("Game session %s changed outside its channel, reloading it", self.session_id)
+            self._reload(session)
+            raise ChannelError(409, "The game session changed elsewhere, the guess was not registered", self.state())
+
+        self.next_attempt_number += 1
+        return {
+            "type": "feedback",
+            "result": step["result"],
+            "attempt_number": step["attempt_number"],
+            "score_this_attempt": step["score_this_attempt"],
+            "total_score": step["total_score"],
+            "correct_numbers": step["correct_numbers"],
+            "correct_positions": step["correct_positions"],
+            "attempts_left": step["attempts_left"]
+        }
+
+    def _reload(self, session: Session) -> None:
+        session.refresh(self.game_session)
+        session.refresh(self.game_session.player)
+        self.next_attempt_number = get_last_attempt_number(session, self.game_session.id) + 1
+
+    def close(self) -> None:
+        """
+            Releases the game session, another channel can be opened for it
+        """
+        _bound_sessions.discard(self.session_id)
+
+
+def open_channel(session: Session, session_id: Any, player_id: Optional[int], expires_at: float) -> Tuple[GameChannel, List[Dict[str, Any]]]:
+    """
+        Binds a channel to a game session of the player, with the same checks as the
+        HTTP routes. Returns the channel and the history of the game so far
+    """
+    if not isinstance(session_id, int):
+        raise ChannelError(400, "session_id must be an integer")
+
+    game_session = load_game_session(session, session_id)
+    if not game_session:
+        raise ChannelError(404, "Game session not found")
+    if game_session.player_id != player_id:
+        raise ChannelError(403, "Access denied to this game session")
+    if not game_session.is_active:
+        raise ChannelError(400, "Game session already ended")
+    if session_id in _bound_sessions:
+        raise ChannelError(409, "The game session already has an open channel")
+
+    history = get_game_attempts(session, session_id)
+    _bound_sessions.add(session_id)
+    channel = GameChannel(game_session, history[-1].attempt_number if history else 0, expires_at)
+    return channel, [attempt_to_dict(attempt) for attempt in history]
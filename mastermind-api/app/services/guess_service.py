@@ -0,0 +1,226 @@
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from app.models import GameSession, GameAttempt
+from app.services.game import evaluate_player_number
+from app.services.score import update_player_score
+from app.services.solver import forget_session
+from app.services.score_ledger import record_score_events
+from app.database.crud import get_last_attempt_number, get_game_attempts
+
+
+class GuessConflictError(Exception):
+    """
+        Raised when another request registered an attempt of the game session first.
+        Nothing of the guess is written; the client can reload the session and retry
+    """
+
+
+def load_game_session(session: Session, session_id: int) -> Optional[GameSession]:
+    """
+        Loads a game session together with its player in a single query
+    """
+    return session.exec(
+        select(GameSession)
+        .options(joinedload(GameSession.player))
+        .where(GameSession.id == session_id)
+    ).first()
+
+
+def attempt_to_dict(attempt: GameAttempt) -> Dict[str, Any]:
+    """
+        History entry of an attempt
+    """
+    return {
+        "attempt_number": attempt.attempt_number,
+        "guessed_number": attempt.guessed_number,
+        "correct_numbers": attempt.correct_numbers,
+        "correct_positions": attempt.correct_positions
+    }
+
+
+def _play_attempts(game_session: GameSession, guessed_numbers: List[str], first_attempt_number: int) -> List[Dict[str, Any]]:
+    """
+        Evaluates guesses in order against the game session, updating it and its
+        player in memory, and stops at the guess that ends the game. The claim of
+        the session has already counted the first attempt in attempts_left.
+        Returns one outcome per evaluated guess
+    """
+    player = game_session.player
+    outcomes = []
+    for attempt_number, guessed_number in enumerate(guessed_numbers, start=first_attempt_number):
+        correct_numbers, correct_positions = evaluate_player_number(list(guessed_number), list(game_session.secret_number))
+        score_this_attempt = update_player_score(
+            player,
+            game_session,
+            correct_numbers,
+            correct_positions
+        )
+        if attempt_number > first_attempt_number:
+            game_session.attempts_left -= 1
+
+        result = None
+        if game_session.attempts_left == 0:
+            result = "LOSE"
+        elif correct_positions == 4:
+            result = "WIN"
+        if result:
+            game_session.is_active = False
+
+        outcomes.append({
+            "result": result,
+            "attempt_number": attempt_number,
+            "guessed_number": guessed_number,
+            "score_this_attempt": score_this_attempt,
+            "correct_numbers": correct_numbers,
+            "correct_positions": correct_positions,
+            "attempts_left": game_session.attempts_left,
+            "total_score": player.score
+        })
+        if result:
+            break
+
+    return outcomes
+
+
+def _claim_game_session(session: Session, game_session: GameSession) -> None:
+    """
+        First write of the transaction of a guess: takes the first attempt with a
+        conditional decrement of attempts_left, which only matches while the row still
+        has the attempts_left it was loaded with. It takes the row (on SQLite, the
+        database) write lock until the commit, so concurrent guesses of a session are
+        registered one at a time and a guess made on a stale copy of the session fails
+        instead of losing an update. The session row is only written again when the
+        game ends or a batch takes more attempts
+    """
+    claimed = session.execute(
+        update(GameSession)
+        .where(
+            GameSession.id == game_session.id,
+            GameSession.attempts_left == game_session.attempts_left,
+            GameSession.attempts_left > 0,
+            GameSession.is_active == True
+        )
+        .values(attempts_left=GameSession.attempts_left - 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if claimed != 1:
+        raise GuessConflictError(f"Game session {game_session.id} changed since it was loaded")
+    # Already written: the flush only updates the row if the value changes again
+    set_committed_value(game_session, "attempts_left", game_session.attempts_left - 1)
+
+    # The player was loaded before the claim and guesses of its other games may have
+    # changed its score since: read it again, locked until the commit
+    session.refresh(game_session.player, ["score", "last_attempt_score"], with_for_update=True)
+
+
+@contextmanager
+def _guess_transaction(session: Session, game_session: GameSession):
+    """
+        Unit of work of the attempts of a game session: claims the session, runs the
+        block and commits. Nothing is written if anything fails; a concurrent attempt
+        (the claim fails or the attempt number is taken) raises GuessConflictError
+    """
+    game_session_id = game_session.id
+    try:
+        _claim_game_session(session, game_session)
+        yield
+        session.commit()
+    except IntegrityError as error:
+        session.rollback()
+        raise GuessConflictError(f"An attempt of game session {game_session_id} was registered concurrently") from error
+    except Exception:
+        session.rollback()
+        raise
+
+
+def play_and_write_attempts(session: Session, game_session: GameSession, guessed_numbers: List[str], first_attempt_number: int) -> List[Dict[str, Any]]:
+    """
+        Scores guesses against the game session and commits them together with the
+        session and score changes: one bulk insert of the attempts and one score bucket
+        upsert. Nothing is read first, the caller gives the attempt number.
+        Returns one outcome per evaluated guess
+    """
+    game_session_id = game_session.id
+    with _guess_transaction(session, game_session):
+        steps = _play_attempts(game_session, guessed_numbers, first_attempt_number)
+        session.add(game_session)
+        session.execute(insert(GameAttempt), [
+            {
+                "game_session_id": game_session.id,
+                "attempt_number": step["attempt_number"],
+                "guessed_number": step["guessed_number"],
+                "correct_numbers": step["correct_numbers"],
+                "correct_positions": step["correct_positions"]
+            }
+            for step in steps
+        ])
+        record_score_events(session, game_session.player.id, game_session, [step["score_this_attempt"] for step in steps])
+
+    if steps[-1]["result"]:
+        forget_session(game_session_id)
+
+    return steps
+
+
+def _history_entry(step: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: step[key] for key in ("attempt_number", "guessed_number", "correct_numbers", "correct_positions")}
+
+
+def submit_guess(session: Session, game_session: GameSession, guessed_number: str, last_attempt_number: Optional[int] = None) -> Dict[str, Any]:
+    """
+        Registers an attempt as a single unit of work: the score update, the new
+        attempt, the score ledger and the session state change are committed together.
+        Nothing is written if the commit fails, and GuessConflictError is raised when
+        another attempt of the session was registered concurrently.
+        The history holds the attempts after last_attempt_number (the last one the
+        client already has), or every attempt when it is None.
+    """
+    attempt_number = get_last_attempt_number(session, game_session.id) + 1
+    after = last_attempt_number if last_attempt_number is not None else 0
+    # A client that is up to date only needs the new attempt, no query is made.
+    # Turned into dicts before the commit, which may expire the attempts
+    previous_attempts = [attempt_to_dict(attempt) for attempt in get_game_attempts(session, game_session.id, after)] if after < attempt_number - 1 else []
+
+    step = play_and_write_attempts(session, game_session, [guessed_number], attempt_number)[0]
+
+    return {
+        "result": step["result"],
+        "attempt_number": attempt_number,
+        "score_this_attempt": step["score_this_attempt"],
+        "total_score": step["total_score"],
+        "correct_numbers": step["correct_numbers"],
+        "correct_positions": step["correct_positions"],
+        "attempts_left": step["attempts_left"],
+        "history": previous_attempts + ([_history_entry(step)] if attempt_number > after else [])
+    }
+
+
+def submit_guesses(session: Session, game_session: GameSession, guessed_numbers: List[str], last_attempt_number: Optional[int] = None) -> Dict[str, Any]:
+    """
+        Registers several guesses of a game session in order, as a single unit of work.
+        They are scored one after the other exactly as separate calls to submit_guess
+        would (including the penalty against the previous attempt); guesses after the one
+        that ends the game are ignored. The attempts are written with one bulk insert and
+        everything is committed together, or nothing is written.
+    """
+    attempt_number = get_last_attempt_number(session, game_session.id) + 1
+    after = last_attempt_number if last_attempt_number is not None else 0
+    previous_attempts = [attempt_to_dict(attempt) for attempt in get_game_attempts(session, game_session.id, after)] if after < attempt_number - 1 else []
+
+    steps = play_and_write_attempts(session, game_session, guessed_numbers, attempt_number)
+
+    return {
+        "result": steps[-1]["result"],
+        "attempts": steps,
+        "ignored_guesses": len(guessed_numbers) - len(steps),
+        "total_score": steps[-1]["total_score"],
+        "attempts_left": steps[-1]["attempts_left"],
+        "history": previous_attempts + [
+            _history_entry(step) for step in steps if step["attempt_number"] > after
+        ]
+    }
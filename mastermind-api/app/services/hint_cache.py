@@ -0,0 +1,145 @@
+import time
+import random
+import logging
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlmodel import Session, select
+from app.database.connection import engine, settings
+from app.models import HintRiddle
+
+logger = logging.getLogger(__name__)
+
+
+def hint_key(unguessed_digits: Iterable[str]) -> str:
+    """
+        Cache key of a set of unguessed digits: the sorted digits, e.g. "057"
+    """
+    return "".join(sorted(set(unguessed_digits)))
+
+
+class HintCache:
+    """
+        In-memory LRU cache of AI riddles keyed by the set of unguessed digits.
+        Each key keeps up to hint_cache_riddles_per_key riddles, every riddle
+        expires hint_cache_ttl seconds after it was generated.
+        Riddles can also be persisted in the hint_riddle table to survive restarts.
+    """
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, List[Tuple[str, float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.requests: Counter = Counter()
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh_riddles(self, key: str) -> List[Tuple[str, float]]:
+        """
+            Returns the riddles of a key that have not expired, dropping the others.
+            Must be called with the lock held
+        """
+        oldest = time.time() - settings.hint_cache_ttl
+        riddles = [entry for entry in self._entries.get(key, []) if entry[1] > oldest]
+        if riddles:
+            self._entries[key] = riddles
+        else:
+            self._entries.pop(key, None)
+        return riddles
+
+    def get(self, key: str) -> Optional[str]:
+        """
+            Returns a random cached riddle of the key, or None on a miss
+        """
+        with self._lock:
+            self.requests[key] += 1
+            riddles = self._fresh_riddles(key)
+            if not riddles:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return random.choice(riddles)[0]
+
+    def riddle_count(self, key: str) -> int:
+        with self._lock:
+            return len(self._fresh_riddles(key))
+
+    def add(self, key: str, riddle: str, created_at: Optional[float] = None, persist: bool = True) -> None:
+        """
+            Stores a riddle for a key, keeping at most hint_cache_riddles_per_key
+        """
+        created_at = created_at or time.time()
+        with self._lock:
+            riddles = self._fresh_riddles(key)
+            if riddle in (text for text, _ in riddles) or len(riddles) >= settings.hint_cache_riddles_per_key:
+                return
+
+            self._entries[key] = riddles + [(riddle, created_at)]
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.hint_cache_max_keys:
+                self._entries.popitem(last=False)
+
+        if persist and settings.hint_cache_persist:
+            self._persist(key, riddle, created_at)
+
+    def _persist(self, key: str, riddle: str, created_at: float) -> None:
+        try:
+            with Session(engine) as session:
+                session.add(HintRiddle(
+                    digits=key,
+                    riddle=riddle,
+                    created_at=datetime.fromtimestamp(created_at, timezone.utc)
+                ))
+                session.commit()
+        except Exception as e:
+            logger.warning(f"Could not persist hint riddle: {e}")
+
+    def load(self) -> None:
+        """
+            Loads the riddles of the hint_riddle table that have not expired
+        """
+        if not settings.hint_cache_persist:
+            return
+
+        oldest = datetime.now(timezone.utc) - timedelta(seconds=settings.hint_cache_ttl)
+        with Session(engine) as session:
+            rows = session.exec(select(HintRiddle).where(HintRiddle.created_at > oldest)).all()
+
+        for row in rows:
+            created_at = row.created_at.replace(tzinfo=row.created_at.tzinfo or timezone.utc)
+            self.add(row.digits, row.riddle, created_at.timestamp(), persist=False)
+        logger.info(f"Loaded {len(rows)} cached hint riddles")
+
+    def keys_to_warm(self, limit: int) -> List[str]:
+        """
+            Most requested keys that do not have all their riddles yet.
+            Before any request, single digit sets are warmed
+        """
+        with self._lock:
+            candidates = [key for key, _ in self.requests.most_common()] or [str(digit) for digit in range(10)]
+            return [
+                key for key in candidates
+                if len(self._fresh_riddles(key)) < settings.hint_cache_riddles_per_key
+            ][:limit]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "keys": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.requests.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+hint_cache = HintCache()
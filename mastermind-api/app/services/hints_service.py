@@ -1,7 +1,10 @@
 import random
+import asyncio
 import logging
-from app.client.ai_client import generate_from_ai
-from typing import List
+from app.client.ai_client import generate_from_ai_async
+from app.database.connection import settings
+from app.services.hint_cache import hint_cache, hint_key
+from typing import List, Optional
 
 # Dictionay with static hints to be used in case the call to gemini api fails
 RINDDLE_HINTS = {
@@ -16,6 +19,8 @@ RINDDLE_HINTS = {
     '9': "The number of the jersey worn by Michael Jordan. What number is it?" 
 }
 
+NO_HINT_MESSAGE = "Don't give up, you're doing great!"
+
 logger = logging.getLogger(__name__)
 
 def get_unguessed_digits(guessed_number: str, secret_number: List[str]) -> List[str]:
@@ -35,15 +40,12 @@ def get_unguessed_digits(guessed_number: str, secret_number: List[str]) -> List[
 
     return unguessed
 
-def generate_hint(guessed_number: str, secret_number: List[str]) ->str:
+def build_hint_prompt(unguessed_digits: List[str]) -> str:
     """
-    Generates a hint. It can be a custom AI riddle or a fallback riddle.
+        Builds the prompt asking the AI for a riddle about one of the unguessed digits.
     """
-    unguessed_digits = get_unguessed_digits(guessed_number,secret_number)
-
-    if unguessed_digits:
-        unguessed_str = ", ".join(unguessed_digits)
-        prompt = f"""You are a clue generator for a Mastermind game. The secret number contains the following 
+    unguessed_str = ", ".join(unguessed_digits)
+    return f"""You are a clue generator for a Mastermind game. The secret number contains the following 
         digits that the player has not yet guessed: {unguessed_str}. 
 
         Your task is to generate a riddle whose answer is EXACTLY ONE of these single digits: {unguessed_str}.
@@ -72,14 +74,58 @@ def generate_hint(guessed_number: str, secret_number: List[str]) ->str:
                 
         """
 
-        ai_riddle = generate_from_ai(prompt)
+def _choose_hint(ai_riddle: Optional[str], unguessed_digits: List[str]) -> str:
+    """
+        Returns the AI riddle, or a fallback riddle if the AI failed
+    """
+    if ai_riddle:
+        logger.info("AI hint generated successfully")
+        return ai_riddle
+    else:
+        logger.warning("AI failed, using fallback riddle")
+        riddle_digit = random.choice(unguessed_digits)
+        return RINDDLE_HINTS.get(riddle_digit)
 
+async def generate_hint_async(guessed_number: str, secret_number: List[str]) -> str:
+    """
+    Generates a hint. It can be a custom AI riddle or a fallback riddle,
+    served as soon as the AI call fails or misses its deadline.
+    """
+    unguessed_digits = get_unguessed_digits(guessed_number,secret_number)
+
+    if unguessed_digits:
+        key = hint_key(unguessed_digits)
+        cached_riddle = hint_cache.get(key)
+        if cached_riddle:
+            return cached_riddle
+
+        ai_riddle = await generate_from_ai_async(build_hint_prompt(unguessed_digits))
         if ai_riddle:
-            logger.info("AI hint generated successfully")
-            return ai_riddle
-        else:
-            logger.warning("AI failed, using fallback riddle")
-            riddle_digit = random.choice(unguessed_digits)
-            return RINDDLE_HINTS.get(riddle_digit)
-    
-    return "Don't give up, you're doing great!"
\ No newline at end of file
+            await asyncio.to_thread(hint_cache.add, key, ai_riddle)
+        return _choose_hint(ai_riddle, unguessed_digits)
+
+    return NO_HINT_MESSAGE
+
+async def prewarm_hint_cache() -> int:
+    """
+        Generates riddles for the most requested digit sets that are not full yet.
+        Returns the number of riddles added
+    """
+    added = 0
+    for key in hint_cache.keys_to_warm(settings.hint_prewarm_batch):
+        ai_riddle = await generate_from_ai_async(build_hint_prompt(list(key)))
+        if ai_riddle:
+            await asyncio.to_thread(hint_cache.add, key, ai_riddle)
+            added += 1
+    return added
+
+async def run_hint_prewarmer() -> None:
+    """
+        Background task that keeps pre-warming the hint cache
+    """
+    while True:
+        try:
+            await prewarm_hint_cache()
+        except Exception as e:
+            logger.warning(f"Hint cache pre-warming failed: {e}")
+        await asyncio.sleep(settings.hint_prewarm_interval)
@@ -0,0 +1,262 @@
+import asyncio
+import bisect
+import logging
+import secrets
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session as OrmSession, object_session
+from sqlmodel import Session
+from app.database.connection import read_engine, settings
+from app.models import User, Player
+
+logger = logging.getLogger(__name__)
+
+
+class Leaderboard:
+    """
+        In-memory leaderboard of every player, ordered by score (highest first,
+        ties by player id). The order is kept in a sorted array of (-score, player_id)
+        keys, so ranks and positions are found with bisect in O(log n) and top-N
+        or a window around a player are slices of the array.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[int, int]] = []
+        self._players: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        # Bumped on every change, identifies the state of the rankings
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def update(self, player_id: int, user_id: int, score: int, last_attempt_score: Optional[int], username: str, email: str) -> None:
+        """
+            Adds a player or moves it to the position of its new score
+        """
+        with self._lock:
+            self._remove(player_id)
+            self._players[player_id] = {
+                "id": player_id,
+                "user_id": user_id,
+                "score": score,
+                "last_attempt_score": last_attempt_score,
+                "user": {"id": user_id, "username": username, "email": email}
+            }
+            bisect.insort(self._keys, (-score, player_id))
+            self.version += 1
+
+    def remove(self, player_id: int) -> None:
+        with self._lock:
+            self._remove(player_id)
+            self.version += 1
+
+    def _remove(self, player_id: int) -> None:
+        """
+            Removes a player. Must be called with the lock held
+        """
+        player = self._players.pop(player_id, None)
+        if player is not None:
+            position = bisect.bisect_left(self._keys, (-player["score"], player_id))
+            del self._keys[position]
+
+    def player(self, player_id: int) -> Optional[Dict[str, Any]]:
+        """
+            Leaderboard entry of a player with its rank, or None if it is not on the leaderboard
+        """
+        with self._lock:
+            return self._entry(self._position(player_id)) if player_id in self._players else None
+
+    def rebuild(self, players: List[Dict[str, Any]]) -> None:
+        """
+            Replaces the whole leaderboard, players are dicts with the arguments of update
+        """
+        entries = {
+            player["player_id"]: {
+                "id": player["player_id"],
+                "user_id": player["user_id"],
+                "score": player["score"],
+                "last_attempt_score": player["last_attempt_score"],
+                "user": {"id": player["user_id"], "username": player["username"], "email": player["email"]}
+            }
+            for player in players
+        }
+        keys = sorted((-entry["score"], player_id) for player_id, entry in entries.items())
+        with self._lock:
+            if entries != self._players:
+                self._players = entries
+                self._keys = keys
+                self.version += 1
+
+    def _entry(self, position: int) -> Dict[str, Any]:
+        _, player_id = self._keys[position]
+        player = self._players[player_id]
+        return {**player, "user": dict(player["user"]), "rank": position + 1}
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        """
+            The limit best players
+        """
+        with self._lock:
+            return [self._entry(position) for position in range(min(limit, len(self._keys)))]
+
+    def rank(self, player_id: int) -> Optional[int]:
+        """
+            Position of a player, starting at 1, or None if it is not on the leaderboard
+        """
+        with self._lock:
+            return self._position(player_id) + 1 if player_id in self._players else None
+
+    def _position(self, player_id: int) -> int:
+        return bisect.bisect_left(self._keys, (-self._players[player_id]["score"], player_id))
+
+    def around(self, player_id: int, radius: int) -> List[Dict[str, Any]]:
+        """
+            The player with the radius players ranked above and below it
+        """
+        with self._lock:
+            if player_id not in self._players:
+                return []
+            position = self._position(player_id)
+            return [
+                self._entry(index)
+                for index in range(max(0, position - radius), min(len(self._keys), position + radius + 1))
+            ]
+
+
+class RankingCache:
+    """
+        Serialized ranking responses keyed by query, each one stored with the
+        ETag it was built for. An entry is only returned for the same ETag, so a
+        new leaderboard version makes every entry stale without clearing them.
+    """
+
+    def __init__(self):
+        self._bodies: Dict[Tuple, Tuple[str, bytes]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple, etag: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._bodies.get(key)
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple, etag: str, body: bytes) -> None:
+        with self._lock:
+            self._bodies[key] = (etag, body)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bodies.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+leaderboard = Leaderboard()
+ranking_cache = RankingCache()
+# Part of every ETag, so the versions of a previous run or of another worker never match
+_instance_tag = secrets.token_hex(4)
+
+
+def ranking_etag(*parts: Any) -> str:
+    """
+        ETag of a ranking: this instance, the leaderboard version and the
+        parts that select the ranking (such as the current day of a window)
+    """
+    return '"' + "-".join(str(part) for part in (_instance_tag, leaderboard.version, *parts)) + '"'
+
+
+def load_leaderboard() -> None:
+    """
+        Rebuilds the leaderboard from the player table, read from the replica when there is one
+    """
+    with Session(read_engine) as session:
+        rows = session.exec(
+            select(Player.id, Player.user_id, Player.score, Player.last_attempt_score, User.username, User.email)
+            .join(User, User.id == Player.user_id)
+        ).all()
+
+    leaderboard.rebuild([
+        {
+            "player_id": row.id,
+            "user_id": row.user_id,
+            "score": row.score,
+            "last_attempt_score": row.last_attempt_score,
+            "username": row.username,
+            "email": row.email
+        }
+        for row in rows
+    ])
+    logger.info(f"Leaderboard loaded with {len(rows)} players")
+
+
+async def run_leaderboard_refresher() -> None:
+    """
+        Background task that reloads the leaderboard, so it also shows
+        the score changes committed by other workers
+    """
+    while True:
+        await asyncio.sleep(settings.leaderboard_refresh_interval)
+        try:
+            await asyncio.to_thread(load_leaderboard)
+        except Exception as e:
+            logger.warning(f"Leaderboard refresh failed: {e}")
+
+
+# Score changes are collected while flushing and applied to the leaderboard
+# only once the transaction is committed, so a rollback never shows up in it.
+
+def _pending_changes(session: OrmSession) -> Dict[int, Dict[str, Any]]:
+    return session.info.setdefault("leaderboard_changes", {})
+
+
+@event.listens_for(Player, "after_insert")
+@event.listens_for(Player, "after_update")
+def _collect_player_change(mapper, connection, player: Player) -> None:
+    session = object_session(player)
+    if session is None:
+        return
+
+    current = leaderboard.player(player.id)
+    if current is not None and current["user_id"] == player.user_id:
+        username, email = current["user"]["username"], current["user"]["email"]
+    else:
+        username, email = connection.execute(
+            select(User.username, User.email).where(User.id == player.user_id)
+        ).one()
+
+    _pending_changes(session)[player.id] = {
+        "player_id": player.id,
+        "user_id": player.user_id,
+        "score": player.score,
+        "last_attempt_score": player.last_attempt_score,
+        "username": username,
+        "email": email
+    }
+
+
+@event.listens_for(Player, "after_delete")
+def _collect_player_delete(mapper, connection, player: Player) -> None:
+    session = object_session(player)
+    if session is not None:
+        _pending_changes(session)[player.id] = None
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _apply_changes(session: OrmSession) -> None:
+    for player_id, change in session.info.pop("leaderboard_changes", {}).items():
+        if change is None:
+            leaderboard.remove(player_id)
+        else:
+            leaderboard.update(**change)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_changes(session: OrmSession) -> None:
+    session.info.pop("leaderboard_changes", None)
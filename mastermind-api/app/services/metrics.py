@@ -0,0 +1,240 @@
+"""
+    Request, database and upstream instrumentation, exposed in the Prometheus text format.
+    The middleware times every request and, through SQLAlchemy events on every engine,
+    counts the SQL statements and the database time spent on its behalf.
+    The upstream calls (random.org, Gemini) are timed where they are made.
+"""
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Prometheus' default buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    labels = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """
+        Monotonic counter with labels
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.label_names), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_number(value)}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """
+        Histogram with labels and fixed buckets. Buckets are stored non-cumulative
+        and accumulated when rendered
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.label_names)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(tuple(str(labels[name]) for name in self.label_names))
+        return sum(series[0]) if series else 0
+
+    def sum(self, **labels: str) -> float:
+        series = self._series.get(tuple(str(labels[name]) for name in self.label_names))
+        return series[1][0] if series else 0.0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(counts), total[0]) for key, (counts, total) in self._series.items())
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_number(bound)
+                lines.append(f"{self.name}_bucket{_format_labels((*self.label_names, 'le'), (*key, le))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_number(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+request_latency = Histogram(
+    "http_request_duration_seconds", "Latency of the HTTP requests by route", ("method", "route", "status")
+)
+request_statements = Histogram(
+    "http_request_sql_statements", "SQL statements executed per HTTP request", ("method", "route"), STATEMENT_BUCKETS
+)
+request_db_time = Histogram(
+    "http_request_db_duration_seconds", "Time spent in SQL statements per HTTP request", ("method", "route")
+)
+sql_statements = Counter(
+    "sql_statements_total", "SQL statements executed, inside or outside requests", ("operation",)
+)
+upstream_latency = Histogram(
+    "upstream_request_duration_seconds", "Latency of the calls to upstream services", ("service", "outcome")
+)
+
+REGISTRY = (request_latency, request_statements, request_db_time, sql_statements, upstream_latency)
+
+
+def render_metrics() -> str:
+    """
+        Every metric in the Prometheus text exposition format
+    """
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+def reset_metrics() -> None:
+    for metric in REGISTRY:
+        metric.clear()
+
+
+class _RequestStats:
+    __slots__ = ("statements", "db_time")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+
+
+# Stats of the request being handled. The object is shared, not copied, by the
+# threadpool and by AsyncSession.run_sync, so statements made there are counted too
+_request_stats: ContextVar[Optional[_RequestStats]] = ContextVar("request_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    connection.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    starts = connection.info.get("metrics_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    sql_statements.inc(operation=statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER")
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_time += elapsed
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("metrics_query_start") if exception_context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+class MetricsMiddleware:
+    """
+        ASGI middleware that records the latency, the SQL statements and the database
+        time of every HTTP request, labelled by route template (not by raw path)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = _RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            method = scope["method"]
+            request_latency.observe(elapsed, method=method, route=route, status=status)
+            request_statements.observe(stats.statements, method=method, route=route)
+            request_db_time.observe(stats.db_time, method=method, route=route)
+
+
+@contextmanager
+def upstream_call(service: str) -> Iterator[Dict[str, str]]:
+    """
+        Records the latency of an upstream call made inside the block.
+        The outcome is success, error or timeout when the block raises, or
+        whatever the block sets in the yielded dict (for errors it handles itself)
+    """
+    call = {"outcome": "success"}
+    start = time.perf_counter()
+    try:
+        yield call
+    except Exception as e:
+        if call["outcome"] == "success":
+            call["outcome"] = "timeout" if isinstance(e, TimeoutError) else "error"
+        raise
+    finally:
+        upstream_latency.observe(time.perf_counter() - start, service=service, outcome=call["outcome"])
@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import logging
+import threading
+import numpy as np
+from typing import Dict, Optional, Tuple
+from app.database.connection import settings
+from app.models import GameSession
+from app.services.feedback import DIFFICULTY_BASES, base_for_difficulty, feedback_block, index_to_code, pack_feedback
+from app.services.solver import get_candidate_set
+
+STRATEGIES = ("minimax", "entropy")
+DEFAULT_TIME_BUDGET_MS = 200
+MAX_TIME_BUDGET_MS = 2000
+
+# Packed feedback values are all below this number
+FEEDBACK_VALUES = pack_feedback(4, 4) + 1
+
+# Number of (guess, candidate) pairs scored at once
+_CHUNK_CELLS = 2**21
+
+logger = logging.getLogger(__name__)
+
+_books: Dict[Tuple[int, str], Optional[dict]] = {}
+_books_lock = threading.Lock()
+
+
+def partition_counts(base: int, guess_indexes: np.ndarray, candidate_indexes: np.ndarray) -> np.ndarray:
+    """
+        Returns, for every guess, the size of each group the candidates are split into
+        by the feedback of that guess. Shape: (len(guess_indexes) x FEEDBACK_VALUES)
+    """
+    feedback = feedback_block(base, guess_indexes, candidate_indexes).astype(np.intp)
+    feedback += np.arange(len(guess_indexes))[:, None] * FEEDBACK_VALUES
+
+    counts = np.bincount(feedback.ravel(), minlength=len(guess_indexes) * FEEDBACK_VALUES)
+    return counts.reshape(len(guess_indexes), FEEDBACK_VALUES)
+
+
+def score_partitions(counts: np.ndarray, strategy: str) -> np.ndarray:
+    """
+        Scores the partitions of every guess, lower is better.
+        minimax: size of the largest group (worst case remaining candidates)
+        entropy: negative information gained by the guess
+    """
+    if strategy == "minimax":
+        return counts.max(axis=1).astype(float)
+
+    probabilities = counts / counts.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        information = np.where(probabilities > 0, probabilities * np.log2(probabilities), 0.0)
+    return information.sum(axis=1)
+
+
+def search_best_guess(base: int, candidate_indexes: np.ndarray, strategy: str, deadline: Optional[float] = None) -> Tuple[int, bool]:
+    """
+        Searches the guess that best splits the candidates.
+        Candidates are scored first so they win ties (they can end the game),
+        then the rest of the codes. The search stops at the deadline (perf_counter time).
+        Returns the best guess index found and whether every guess was scored.
+    """
+    if len(candidate_indexes) <= 2:
+        return int(candidate_indexes[0]), True
+
+    is_candidate = np.zeros(base**4, dtype=bool)
+    is_candidate[candidate_indexes] = True
+    others = np.random.default_rng(0).permutation(np.flatnonzero(~is_candidate))
+    guess_pool = np.concatenate([candidate_indexes, others])
+
+    step = max(1, _CHUNK_CELLS // len(candidate_indexes))
+    best_guess, best_score = int(candidate_indexes[0]), np.inf
+
+    for start in range(0, len(guess_pool), step):
+        if deadline is not None and start > 0 and time.perf_counter() >= deadline:
+            return best_guess, False
+
+        guesses = guess_pool[start:start + step]
+        scores = score_partitions(partition_counts(base, guesses, candidate_indexes), strategy)
+        position = int(np.argmin(scores))
+
+        if scores[position] < best_score:
+            best_guess, best_score = int(guesses[position]), scores[position]
+
+    return best_guess, True
+
+
+#=======================================
+# Opening books
+#=======================================
+
+def _book_path(difficulty_level: int, strategy: str) -> str:
+    return os.path.join(settings.opening_book_dir, f"opening_book_d{difficulty_level}_{strategy}.json")
+
+
+def build_opening_book(difficulty_level: int, strategy: str) -> dict:
+    """
+        Computes the first two levels of the decision tree: the best first guess
+        and the best second guess for every feedback of the first one
+    """
+    base = base_for_difficulty(difficulty_level)
+    codes = np.arange(base**4)
+
+    first_guess, _ = search_best_guess(base, codes, strategy)
+    first_feedback = feedback_block(base, np.array([first_guess]), codes)[0]
+
+    replies = {}
+    for packed in np.unique(first_feedback):
+        group = codes[first_feedback == packed]
+        second_guess, _ = search_best_guess(base, group, strategy)
+        replies[str(int(packed))] = index_to_code(second_guess, base)
+
+    return {
+        "difficulty_level": difficulty_level,
+        "strategy": strategy,
+        "first_guess": index_to_code(first_guess, base),
+        "replies": replies
+    }
+
+
+def save_opening_book(book: dict) -> None:
+    """
+        Writes an opening book to disk atomically
+    """
+    path = _book_path(book["difficulty_level"], book["strategy"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(book, file)
+    os.replace(tmp_path, path)
+
+    with _books_lock:
+        _books[(book["difficulty_level"], book["strategy"])] = book
+
+
+def get_opening_book(difficulty_level: int, strategy: str) -> Optional[dict]:
+    """
+        Returns the opening book of a difficulty and strategy, or None if it was not built
+    """
+    key = (difficulty_level, strategy)
+    if key in _books:
+        return _books[key]
+
+    try:
+        with open(_book_path(difficulty_level, strategy)) as file:
+            book = json.load(file)
+    except (OSError, ValueError):
+        book = None
+
+    with _books_lock:
+        _books[key] = book
+    return book
+
+
+def build_opening_books(only_missing: bool = False) -> None:
+    """
+        Builds and saves the opening books of every difficulty and strategy
+    """
+    for difficulty_level in DIFFICULTY_BASES:
+        for strategy in STRATEGIES:
+            if only_missing and get_opening_book(difficulty_level, strategy) is not None:
+                continue
+            start = time.perf_counter()
+            save_opening_book(build_opening_book(difficulty_level, strategy))
+            logger.info(f"Opening book d{difficulty_level}/{strategy} built in {time.perf_counter() - start:.1f}s")
+
+
+#=======================================
+# Recommendation
+#=======================================
+
+def recommend_next_guess(game_session: GameSession, strategy: str = "minimax", time_budget_ms: int = DEFAULT_TIME_BUDGET_MS) -> dict:
+    """
+        Recommends the next guess of a game session.
+        Uses the opening book for the first two guesses and a time bounded search afterwards.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'. Use one of: {', '.join(STRATEGIES)}")
+
+    deadline = time.perf_counter() + min(max(time_budget_ms, 1), MAX_TIME_BUDGET_MS) / 1000
+    attempts = sorted(game_session.attempts, key=lambda attempt: attempt.id)
+    candidates = get_candidate_set(game_session)
+    remaining = candidates.count()
+
+    book = get_opening_book(game_session.difficulty_level, strategy)
+    book_guess = None
+    if book and not attempts:
+        book_guess = book["first_guess"]
+    elif book and len(attempts) == 1 and attempts[0].guessed_number == book["first_guess"]:
+        packed = pack_feedback(attempts[0].correct_numbers, attempts[0].correct_positions)
+        book_guess = book["replies"].get(str(packed))
+
+    if book_guess is not None:
+        return {"guess": book_guess, "source": "opening_book", "complete": True, "remaining_candidates": remaining}
+
+    if remaining == 0:
+        return {"guess": None, "source": "search", "complete": True, "remaining_candidates": 0}
+
+    guess, complete = search_best_guess(candidates.base, candidates.indexes(), strategy, deadline)
+    return {
+        "guess": index_to_code(guess, candidates.base),
+        "source": "search",
+        "complete": complete,
+        "remaining_candidates": remaining
+    }
+
+
+if __name__ == "__main__":
+    from app.services.feedback import load_feedback_tables
+
+    logging.basicConfig(level=logging.INFO)
+    load_feedback_tables()
+    build_opening_books()
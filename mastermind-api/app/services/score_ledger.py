@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+from app.models import User, Player, GameSession, ScoreEvent, ScoreBucket
+
+WINDOWS = ("day", "week", "all")
+# difficulty_level of the buckets that aggregate every difficulty
+ALL_DIFFICULTIES = 0
+
+_UPSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def bucket_starts(moment: datetime) -> Dict[str, str]:
+    """
+        First day (UTC) of the day and week windows containing moment.
+        Weeks start on Monday; the all window has a single bucket
+    """
+    day = moment.astimezone(timezone.utc).date()
+    return {
+        "day": day.isoformat(),
+        "week": (day - timedelta(days=day.weekday())).isoformat(),
+        "all": ""
+    }
+
+
+def record_score_event(session: Session, player_id: int, game_session: GameSession, score: int, created_at: Optional[datetime] = None) -> None:
+    """
+        Adds a scored attempt to the ledger and to the buckets of its windows, with
+        a single upsert. Nothing is committed: it is part of the caller's transaction.
+        The all-time total of every difficulty is Player.score, so it has no bucket
+    """
+    record_score_events(session, player_id, game_session, [score], created_at)
+
+
+def record_score_events(session: Session, player_id: int, game_session: GameSession, scores: List[int], created_at: Optional[datetime] = None) -> None:
+    """
+        Version of record_score_event for several attempts of the same game made at once:
+        one ledger row per attempt and a single upsert of their total
+    """
+    created_at = created_at or datetime.now(timezone.utc)
+    session.add_all([
+        ScoreEvent(
+            player_id= player_id,
+            game_session_id= game_session.id,
+            difficulty_level= game_session.difficulty_level,
+            score= score,
+            created_at= created_at
+        )
+        for score in scores
+    ])
+
+    rows = [
+        {
+            "period": period,
+            "bucket_start": bucket_start,
+            "difficulty_level": difficulty_level,
+            "player_id": player_id,
+            "score": sum(scores)
+        }
+        for period, bucket_start in bucket_starts(created_at).items()
+        for difficulty_level in (ALL_DIFFICULTIES, game_session.difficulty_level)
+        if not (period == "all" and difficulty_level == ALL_DIFFICULTIES)
+    ]
+
+    dialect = session.get_bind().dialect.name
+    if dialect not in _UPSERTS:
+        raise ValueError(f"Score buckets are not supported on {dialect}")
+
+    statement = _UPSERTS[dialect](ScoreBucket).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=["period", "bucket_start", "difficulty_level", "player_id"],
+        set_={"score": ScoreBucket.score + statement.excluded.score}
+    )
+    session.execute(statement)
+
+
+def get_top_players_in_window(session: Session, window: str, difficulty_level: Optional[int], limit: int, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+        Best players of the current day or week, or of all time on one difficulty.
+        Reads a single bucket through its ranking index, so the cost does not
+        depend on the size of the ledger
+    """
+    if window not in WINDOWS:
+        raise ValueError(f"Unknown window '{window}'. Use {', '.join(WINDOWS)}")
+    if window == "all" and difficulty_level is None:
+        raise ValueError("The all-time ranking of every difficulty is the leaderboard")
+
+    bucket_start = bucket_starts(now or datetime.now(timezone.utc))[window]
+    rows = session.exec(
+        select(ScoreBucket.player_id, ScoreBucket.score, Player.user_id, User.username, User.email)
+        .join(Player, Player.id == ScoreBucket.player_id)
+        .join(User, User.id == Player.user_id)
+        .where(
+            ScoreBucket.period == window,
+            ScoreBucket.bucket_start == bucket_start,
+            ScoreBucket.difficulty_level == (difficulty_level or ALL_DIFFICULTIES)
+        )
+        .order_by(ScoreBucket.score.desc(), ScoreBucket.player_id)
+        .limit(limit)
+    ).all()
+
+    return [
+        {
+            "id": row.player_id,
+            "user_id": row.user_id,
+            "score": row.score,
+            "rank": position + 1,
+            "user": {"id": row.user_id, "username": row.username, "email": row.email}
+        }
+        for position, row in enumerate(rows)
+    ]
@@ -0,0 +1,81 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import List
+from app.models import GameSession
+from app.services.feedback import base_for_difficulty, feedback_row, index_to_code, pack_feedback
+
+# Maximum number of game sessions whose candidate sets are kept in memory
+MAX_CACHED_SESSIONS = 1024
+
+_cache: "OrderedDict[int, CandidateSet]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class CandidateSet:
+    """
+        Set of secret codes that are still consistent with the attempts of a game.
+        Stored as a boolean mask over all the codes of the difficulty level.
+    """
+
+    def __init__(self, difficulty_level: int):
+        self.base = base_for_difficulty(difficulty_level)
+        self.mask = np.ones(self.base**4, dtype=bool)
+        self.applied_attempts = 0
+
+    def apply(self, guessed_number: str, correct_numbers: int, correct_positions: int) -> None:
+        """
+            Removes the codes that would not give this feedback for the guess
+        """
+        row = feedback_row(self.base, guessed_number)
+        self.mask &= row == pack_feedback(correct_numbers, correct_positions)
+        self.applied_attempts += 1
+
+    def count(self) -> int:
+        """
+            Number of codes that are still possible
+        """
+        return int(np.count_nonzero(self.mask))
+
+    def indexes(self) -> np.ndarray:
+        """
+            Indexes of the codes that are still possible
+        """
+        return np.flatnonzero(self.mask)
+
+    def codes(self, limit: int = 10) -> List[str]:
+        """
+            Returns up to limit codes that are still possible
+        """
+        return [index_to_code(int(index), self.base) for index in self.indexes()[:limit]]
+
+
+def get_candidate_set(game_session: GameSession) -> CandidateSet:
+    """
+        Returns the candidate set of a game session. Sets are cached per session,
+        so only the attempts made since the last call are applied.
+    """
+    attempts = sorted(game_session.attempts, key=lambda attempt: attempt.id)
+
+    with _cache_lock:
+        candidates = _cache.get(game_session.id)
+        if candidates is None or candidates.applied_attempts > len(attempts):
+            candidates = CandidateSet(game_session.difficulty_level)
+        _cache[game_session.id] = candidates
+        _cache.move_to_end(game_session.id)
+        if len(_cache) > MAX_CACHED_SESSIONS:
+            _cache.popitem(last=False)
+
+        # Apply only the new attempts, the set is updated in place
+        for attempt in attempts[candidates.applied_attempts:]:
+            candidates.apply(attempt.guessed_number, attempt.correct_numbers, attempt.correct_positions)
+
+    return candidates
+
+
+def forget_session(session_id: int) -> None:
+    """
+        Drops the cached candidate set of a game session
+    """
+    with _cache_lock:
+        _cache.pop(session_id, None)
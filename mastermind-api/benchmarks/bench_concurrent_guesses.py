@@ -0,0 +1,130 @@
+"""
+    Benchmark of parallel guess traffic on a SQLite file database.
+    Many players play games at the same time through the async /game/guess/ route,
+    called in process through the ASGI stack, on one AsyncSession per request as with
+    the get_async_session dependency. Compares the default async engine (rollback
+    journal, no writer lock) with the production profile (WAL, pragmas and serialized
+    writer): throughput, latency percentiles and failed guesses.
+
+    Usage (from mastermind-api):  python -m benchmarks.bench_concurrent_guesses [players] [games_per_player]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import tempfile
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.auth import auth_utils
+from app.models import User, Player, GameSession
+from app.database.connection import create_async_database_engine, get_async_session
+
+ATTEMPTS = 8
+
+
+def _create_games(path: str, players: int, games_per_player: int):
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    games = []
+    with Session(engine) as session:
+        for number in range(players):
+            user = User(username=f"bench{number}", email=f"bench{number}@example.com", hashed_password="hash")
+            session.add(user)
+            session.flush()
+            player = Player(user_id=user.id)
+            session.add(player)
+            session.flush()
+            player_games = [
+                GameSession(player_id=player.id, secret_number="9999", difficulty_level=3, attempts_left=ATTEMPTS)
+                for _ in range(games_per_player)
+            ]
+            session.add_all(player_games)
+            session.flush()
+            games.append((user, player.id, [game.id for game in player_games]))
+        session.commit()
+        tokens = [
+            (auth_utils.create_access_token({"sub": user.username, "user_id": user.id, "player_id": player_id}), game_ids)
+            for user, player_id, game_ids in games
+        ]
+    engine.dispose()
+    return tokens
+
+
+def _percentile(values, fraction: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def measure(path: str, async_engine, players: int, games_per_player: int):
+    from app.main import app
+
+    players_games = _create_games(path, players, games_per_player)
+    latencies = []
+    errors = []
+
+    async def _get_async_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    async def play(client: AsyncClient, token: str, game_ids):
+        rng = random.Random(game_ids[0])
+        headers = {"Authorization": f"Bearer {token}"}
+        for game_id in game_ids:
+            for _ in range(ATTEMPTS):
+                guess = "".join(str(rng.randint(0, 8)) for _ in range(4))
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/api/v1/game/guess/", headers=headers, json={"session_id": game_id, "guessed_number": guess})
+                except Exception as e:
+                    errors.append(repr(e))
+                    continue
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+    app.dependency_overrides[get_async_session] = _get_async_session
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(play(client, token, game_ids) for token, game_ids in players_games))
+            elapsed = time.perf_counter() - start
+    finally:
+        app.dependency_overrides.clear()
+        await async_engine.dispose()
+
+    return {
+        "guesses_per_second": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 0.50) * 1e3,
+        "p95_ms": _percentile(latencies, 0.95) * 1e3,
+        "p99_ms": _percentile(latencies, 0.99) * 1e3,
+        "failed": len(errors)
+    }
+
+
+async def run(players: int, games_per_player: int):
+    with tempfile.TemporaryDirectory() as directory:
+        default_path = os.path.join(directory, "default.db")
+        production_path = os.path.join(directory, "production.db")
+        profiles = (
+            ("default", default_path, create_async_engine(f"sqlite+aiosqlite:///{default_path}")),
+            ("production", production_path, create_async_database_engine(f"sqlite:///{production_path}", "production")),
+        )
+        for name, path, async_engine in profiles:
+            result = await measure(path, async_engine, players, games_per_player)
+            print(
+                f"{name:10} {result['guesses_per_second']:7.1f} guesses/s  "
+                f"p50 {result['p50_ms']:6.2f} ms  p95 {result['p95_ms']:7.2f} ms  "
+                f"p99 {result['p99_ms']:7.2f} ms  failed {result['failed']}"
+            )
+
+
+def main(players: int = 16, games_per_player: int = 10):
+    auth_utils.SECRET_KEY = "bench-secret"
+    asyncio.run(run(players, games_per_player))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,107 @@
+"""
+    Benchmark of the SQL work done by one guess.
+    Replays the same games with the previous guess flow (a commit and a refresh
+    after each step) and with submit_guess, counting the SQL statements and
+    commits per guess on an in memory SQLite database. Both flows return the whole
+    history with each guess; with 8 guesses per game they measure about
+    12.25 (previous flow) and 8.00 (submit_guess) statements per guess.
+
+    Usage (from mastermind-api):  python -m benchmarks.bench_guess [games]
+"""
+import sys
+import time
+import random
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+from app.models import User, Player, GameSession
+from app.database.crud import create_game_attempt, update_game_session
+from app.services.game import evaluate_player_number
+from app.services.score import update_player_score
+from app.services.guess_service import load_game_session, submit_guess
+
+ATTEMPTS = 8
+
+
+def legacy_guess(session: Session, session_id: int, guessed_number: str) -> None:
+    """
+        The guess flow of make_a_guess before submit_guess
+    """
+    game_session = session.get(GameSession, session_id)
+    correct_numbers, correct_positions = evaluate_player_number(list(guessed_number), list(game_session.secret_number))
+
+    player = game_session.player
+    update_player_score(player, game_session, correct_numbers, correct_positions)
+    session.add(player)
+    session.commit()
+    session.refresh(player)
+
+    create_game_attempt(session, game_session.id, guessed_number, correct_numbers, correct_positions)
+
+    game_session.attempts_left -= 1
+    update_game_session(session, game_session)
+    session.refresh(game_session)
+    [attempt.guessed_number for attempt in game_session.attempts]
+
+    if game_session.attempts_left == 0 or correct_positions == 4:
+        game_session.is_active = False
+        update_game_session(session, game_session)
+
+
+def unit_of_work_guess(session: Session, session_id: int, guessed_number: str) -> None:
+    submit_guess(session, load_game_session(session, session_id), guessed_number)
+
+
+def measure(guess_function, games: int):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(username="bench", email="bench@example.com", hashed_password="hash")
+        session.add(user)
+        session.commit()
+        player = Player(user_id=user.id)
+        session.add(player)
+        session.commit()
+        player_id = player.id
+
+    # Only the statements run while guessing are counted, not the game creation
+    counts = {"counting": False, "statements": 0, "commits": 0}
+
+    def count(key):
+        if counts["counting"]:
+            counts[key] += 1
+
+    event.listen(engine, "before_cursor_execute", lambda *args: count("statements"))
+    event.listen(engine, "commit", lambda *args: count("commits"))
+
+    rng = random.Random(0)
+    guesses = 0
+    elapsed = 0.0
+    for _ in range(games):
+        with Session(engine) as session:
+            game_session = GameSession(player_id=player_id, secret_number="9999", difficulty_level=3, attempts_left=ATTEMPTS)
+            session.add(game_session)
+            session.commit()
+            session_id = game_session.id
+
+        counts["counting"] = True
+        start = time.perf_counter()
+        for _ in range(ATTEMPTS):
+            # A new session per request, as with the get_session dependency
+            with Session(engine) as session:
+                guess_function(session, session_id, "".join(str(rng.randint(0, 8)) for _ in range(4)))
+            guesses += 1
+        elapsed += time.perf_counter() - start
+        counts["counting"] = False
+
+    return counts["statements"] / guesses, counts["commits"] / guesses, elapsed / guesses
+
+
+def main(games: int = 200):
+    for name, guess_function in (("previous flow", legacy_guess), ("submit_guess", unit_of_work_guess)):
+        statements, commits, latency = measure(guess_function, games)
+        print(f"{name:14} {statements:5.2f} statements/guess  {commits:4.2f} commits/guess  {latency * 1e3:6.3f} ms/guess")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,39 @@
+"""
+    Benchmark of the scoring functions.
+    Compares evaluate_player_number called in a Python loop against
+    evaluate_batch on the same random pairs.
+
+    Usage (from mastermind-api):  python -m benchmarks.bench_scoring [pairs]
+"""
+import sys
+import time
+import numpy as np
+from app.services.game import evaluate_player_number, evaluate_batch
+
+
+def main(pairs: int = 1_000_000):
+    rng = np.random.default_rng(0)
+    guesses = rng.integers(0, 10, size=(pairs, 4), dtype=np.uint8)
+    secrets = rng.integers(0, 10, size=(pairs, 4), dtype=np.uint8)
+
+    guess_lists = [[str(digit) for digit in row] for row in guesses.tolist()]
+    secret_lists = [[str(digit) for digit in row] for row in secrets.tolist()]
+
+    start = time.perf_counter()
+    scalar_results = [evaluate_player_number(guess, secret) for guess, secret in zip(guess_lists, secret_lists)]
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    correct_numbers, correct_positions = evaluate_batch(guesses, secrets)
+    batch_time = time.perf_counter() - start
+
+    assert scalar_results == list(zip(correct_numbers.tolist(), correct_positions.tolist()))
+
+    print(f"pairs:                   {pairs}")
+    print(f"evaluate_player_number:  {scalar_time:.3f} s")
+    print(f"evaluate_batch:          {batch_time:.3f} s")
+    print(f"speedup:                 {scalar_time / batch_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,48 @@
+"""
+    Benchmark of secret number generation under a slow random.org.
+    Starts the local random.org stand-in with induced latency and errors and
+    compares the latency of get_secret_number (direct call) with draw_secret_number (pool).
+
+    Usage (from mastermind-api):  python -m benchmarks.bench_secret_pool [latency] [error_rate]
+"""
+import sys
+import time
+import statistics
+from app.database.connection import settings
+from app.client import secret_pool
+from app.client.random_number import get_secret_number
+from app.client.secret_pool import draw_secret_number, load_secret_pools
+from stubs.random_org import start_random_org_stub
+
+
+def measure(function, calls: int) -> list:
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        function(3)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main(latency: float = 0.3, error_rate: float = 0.1, calls: int = 200):
+    stub = start_random_org_stub(latency=latency, error_rate=error_rate, seed=0)
+    settings.random_org_url = stub.url
+    settings.secret_source = "random_org"
+    settings.secret_pool_file = "bench_secret_pool.json"
+    secret_pool._source = None
+
+    direct = measure(get_secret_number, 20)
+
+    load_secret_pools()
+    time.sleep(latency * 2)
+    pooled = measure(draw_secret_number, calls)
+
+    print(f"random.org latency {latency * 1000:.0f} ms, error rate {error_rate:.0%}")
+    print(f"get_secret_number   p50 {statistics.median(direct):8.2f} ms   max {max(direct):8.2f} ms")
+    print(f"draw_secret_number  p50 {statistics.median(pooled):8.2f} ms   max {max(pooled):8.2f} ms")
+    print(f"random.org requests {stub.requests_served}")
+
+
+if __name__ == "__main__":
+    args = [float(arg) for arg in sys.argv[1:3]]
+    main(*args)
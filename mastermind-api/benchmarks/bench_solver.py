@@ -0,0 +1,38 @@
+"""
+    Benchmark of the candidate solver on difficulty 3 (10,000 codes).
+    Measures the cost of applying one attempt to a CandidateSet, computing
+    the feedback row on the fly and reading it from the loaded table.
+
+    Usage (from mastermind-api):  python -m benchmarks.bench_solver [updates]
+"""
+import sys
+import time
+import random
+from app.services.feedback import get_feedback_table, index_to_code
+from app.services.game import evaluate_player_number
+from app.services.solver import CandidateSet
+
+
+def measure(updates: int) -> float:
+    rng = random.Random(0)
+    total = 0.0
+    for _ in range(updates):
+        secret = index_to_code(rng.randrange(10**4), 10)
+        guess = index_to_code(rng.randrange(10**4), 10)
+        feedback = evaluate_player_number(list(guess), list(secret))
+
+        candidates = CandidateSet(3)
+        start = time.perf_counter()
+        candidates.apply(guess, *feedback)
+        total += time.perf_counter() - start
+    return total / updates
+
+
+def main(updates: int = 2000):
+    print(f"update without table: {measure(updates) * 1e6:.1f} us")
+    get_feedback_table(10)
+    print(f"update with table:    {measure(updates) * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,46 @@
+"""
+    Runs the pytest-benchmark suite (perf_hot_paths.py) against the stored baselines.
+    Every benchmark is compared with the latest baseline in benchmarks/baselines and the
+    run fails when the median of one of them is slower by more than the threshold.
+    Baselines are machine specific (stored per platform and Python version):
+    store one on the machine that runs the comparison before relying on it.
+
+    Usage (from mastermind-api):
+        python -m benchmarks.check_perf [--threshold 25] [--save] [extra pytest arguments]
+"""
+import os
+import sys
+import argparse
+import pytest
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINES_DIR = os.path.join(BENCHMARKS_DIR, "baselines")
+
+
+def _has_baseline() -> bool:
+    return any(name.endswith(".json") for _, _, files in os.walk(BASELINES_DIR) for name in files)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Hot path benchmarks compared with the stored baseline")
+    parser.add_argument("--threshold", type=float, default=25.0, help="allowed slowdown of the median, in percent")
+    parser.add_argument("--save", action="store_true", help="store the results as a new baseline")
+    args, pytest_args = parser.parse_known_args(argv)
+
+    options = [
+        os.path.join(BENCHMARKS_DIR, "perf_hot_paths.py"),
+        "-p", "no:cacheprovider",
+        f"--benchmark-storage=file://{BASELINES_DIR}",
+        "--benchmark-columns=min,median,max,rounds",
+        "--benchmark-sort=fullname",
+    ]
+    if args.save:
+        options.append("--benchmark-save=baseline")
+    if _has_baseline():
+        options += ["--benchmark-compare", f"--benchmark-compare-fail=median:{args.threshold:g}%"]
+
+    return pytest.main(options + pytest_args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,267 @@
+"""
+    End-to-end load test with simulated players.
+    Each player registers, logs in and plays games: start_game, a guess loop driven by a
+    guessing strategy and hint requests. random.org and Gemini are replaced by the local
+    stand-ins in stubs/, on a throwaway SQLite database (production profile).
+    Reports requests/s and p50/p95/p99 latencies per endpoint as JSON, for trend tracking.
+
+    Targets:
+      asgi     the app in this process, called through httpx without sockets (default)
+      uvicorn  the app served by uvicorn in this process, on a local port
+      --url    an API that is already running (its random.org and Gemini are not stubbed)
+
+    Usage (from mastermind-api):
+        python -m benchmarks.load_test --players 50 --games 2 --target uvicorn --output load.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import platform
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import httpx
+
+API = "/api/v1"
+STRATEGIES = ("consistent", "random")
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Recorder:
+    """
+        Latency and outcome of every request, by endpoint
+    """
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.games = {"WIN": 0, "LOSE": 0}
+
+    async def request(self, client: httpx.AsyncClient, method: str, path: str, **kwargs) -> httpx.Response:
+        endpoint = f"{method} {path}"
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except httpx.HTTPError:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+            raise
+        self.latencies.setdefault(endpoint, []).append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        return response
+
+    def report(self, elapsed: float) -> Dict:
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "errors": self.errors.get(endpoint, 0),
+                "requests_per_second": round(len(latencies) / elapsed, 2),
+                "p50_ms": round(_percentile(latencies, 0.50) * 1e3, 2),
+                "p95_ms": round(_percentile(latencies, 0.95) * 1e3, 2),
+                "p99_ms": round(_percentile(latencies, 0.99) * 1e3, 2),
+            }
+        every_latency = [latency for latencies in self.latencies.values() for latency in latencies]
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "total": {
+                "requests": len(every_latency),
+                "errors": sum(self.errors.values()),
+                "requests_per_second": round(len(every_latency) / elapsed, 2),
+                "p50_ms": round(_percentile(every_latency, 0.50) * 1e3, 2) if every_latency else None,
+                "p95_ms": round(_percentile(every_latency, 0.95) * 1e3, 2) if every_latency else None,
+                "p99_ms": round(_percentile(every_latency, 0.99) * 1e3, 2) if every_latency else None,
+            },
+            "games": dict(self.games),
+            "endpoints": endpoints,
+        }
+
+
+class Guesser:
+    """
+        Guessing strategy of a simulated player.
+        consistent: a random guess among the numbers consistent with every feedback so far,
+        kept in the vectorized candidate set of the solver so the filtering costs the event
+        loop of the app under test almost nothing. random: any number of the difficulty
+    """
+
+    def __init__(self, strategy: str, difficulty_level: int, rng: random.Random):
+        # Imported here: the app must not be imported before _configure
+        from app.services.solver import CandidateSet
+        from app.services.feedback import index_to_code
+
+        self.candidates = CandidateSet(difficulty_level)
+        self.index_to_code = index_to_code
+        self.strategy = strategy
+        self.rng = rng
+
+    def next_guess(self) -> str:
+        if self.strategy != "consistent":
+            return self.index_to_code(self.rng.randrange(self.candidates.base**4), self.candidates.base)
+        indexes = self.candidates.indexes()
+        return self.index_to_code(int(indexes[self.rng.randrange(len(indexes))]), self.candidates.base)
+
+    def feedback(self, guess: str, correct_numbers: int, correct_positions: int) -> None:
+        if self.strategy != "consistent":
+            return
+        previous = self.candidates.mask.copy()
+        self.candidates.apply(guess, correct_numbers, correct_positions)
+        if not self.candidates.count():
+            self.candidates.mask = previous
+
+
+async def play(client: httpx.AsyncClient, recorder: Recorder, number: int, args) -> None:
+    """
+        One simulated player: register, login, then play args.games games
+    """
+    rng = random.Random(args.seed * 100003 + number)
+    username = f"load{number}_{rng.randrange(10**9)}"
+    password = "load-test-password"
+
+    await recorder.request(client, "POST", f"{API}/auth/register", json={"username": username, "email": f"{username}@example.com", "password": password})
+    response = await recorder.request(client, "POST", f"{API}/auth/login", json={"username": username, "password": password})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    for _ in range(args.games):
+        response = await recorder.request(client, "POST", f"{API}/game/start_game/", params={"difficulty_level": args.difficulty}, headers=headers)
+        session_id = response.json()["session_id"]
+        guesser = Guesser(args.strategy, args.difficulty, rng)
+
+        for attempt in range(1, 100):
+            guess = guesser.next_guess()
+            response = await recorder.request(client, "POST", f"{API}/game/guess/", json={"session_id": session_id, "guessed_number": guess}, headers=headers)
+            outcome = response.json()
+            if outcome.get("result") in ("WIN", "LOSE"):
+                recorder.games[outcome["result"]] += 1
+                break
+            guesser.feedback(guess, outcome["result"]["correct_numbers"], outcome["result"]["correct_positions"])
+
+            if attempt <= args.hints:
+                await recorder.request(client, "POST", f"{API}/game/get_ai_hint/", json=session_id, headers=headers)
+
+
+async def run(client: httpx.AsyncClient, args) -> Dict:
+    recorder = Recorder()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(play(client, recorder, number, args) for number in range(args.players)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    report = recorder.report(elapsed)
+    failures = [result for result in results if isinstance(result, Exception)]
+    report["failed_players"] = len(failures)
+    report["player_errors"] = sorted({repr(failure) for failure in failures})[:5]
+    return report
+
+
+def _configure(args, directory: str) -> None:
+    """
+        Settings of the API under test. Must run before the app is imported:
+        the engines and the signing key are read at import time
+    """
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(directory, 'load_test.db')}")
+    os.environ.setdefault("DATABASE_PROFILE", "production")
+    os.environ.setdefault("SECRET_KEY", "load-test-secret")
+    os.environ.setdefault("SECRET_POOL_FILE", os.path.join(directory, "secret_pool.json"))
+    os.environ.setdefault("HINT_CACHE_PERSIST", "false")
+    os.environ.setdefault("BCRYPT_ROUNDS", str(args.bcrypt_rounds))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_in_process(args) -> Dict:
+    """
+        Runs the load test against the app of this process, with the stand-ins installed
+    """
+    from stubs.gemini import install_gemini_stub
+    from stubs.random_org import start_random_org_stub
+    from app.database.connection import settings
+
+    random_org = start_random_org_stub(latency=args.random_org_latency, seed=args.seed)
+    settings.secret_source = "random_org"
+    settings.random_org_url = random_org.url
+    gemini = install_gemini_stub(latency=args.gemini_latency, error_rate=args.gemini_error_rate, seed=args.seed)
+
+    from app.main import app
+
+    if args.target == "uvicorn":
+        import uvicorn
+
+        port = _free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+        serving = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.05)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=args.timeout, limits=httpx.Limits(max_connections=args.players)) as client:
+                report = await run(client, args)
+        finally:
+            server.should_exit = True
+            await serving
+    else:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=args.timeout) as client:
+                report = await run(client, args)
+
+    report["stubs"] = {"random_org_requests": random_org.requests_served, "gemini_calls": gemini.calls}
+    random_org.shutdown()
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    parser = argparse.ArgumentParser(description="Load test with simulated players")
+    parser.add_argument("--players", type=int, default=20, help="concurrent simulated players")
+    parser.add_argument("--games", type=int, default=2, help="games played by each player")
+    parser.add_argument("--difficulty", type=int, default=2, choices=(1, 2, 3))
+    parser.add_argument("--strategy", default="consistent", choices=STRATEGIES)
+    parser.add_argument("--hints", type=int, default=1, help="hints asked per game, after the first attempts")
+    parser.add_argument("--target", default="asgi", choices=("asgi", "uvicorn"))
+    parser.add_argument("--url", help="base URL of a running API, instead of the in-process app")
+    parser.add_argument("--random-org-latency", type=float, default=0.2)
+    parser.add_argument("--gemini-latency", type=float, default=0.3)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.05)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="file to write the JSON report to (default: stdout)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.url:
+            async def _remote():
+                async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+                    return await run(client, args)
+            report = asyncio.run(_remote())
+        else:
+            _configure(args, directory)
+            report = asyncio.run(run_in_process(args))
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        **report,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,169 @@
+"""
+    Micro-benchmarks of the hot paths, for pytest-benchmark.
+    The file name does not match test_*.py, so the regular test run never collects it;
+    run it with benchmarks/check_perf.py, which compares every benchmark with the stored
+    baseline and fails when one regresses past the threshold.
+
+    Usage (from mastermind-api):
+        python -m benchmarks.check_perf             # compare with the latest baseline
+        python -m benchmarks.check_perf --save      # store a new baseline
+    Set PERF_MAX_PLAYERS to skip the largest leaderboards (1M players takes ~1 min to build).
+"""
+import os
+import random
+import asyncio
+import sqlite3
+from datetime import datetime
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlmodel import Session, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.auth import auth_utils
+from app.database.connection import create_database_engine, create_async_database_engine, get_async_session, get_async_read_session
+from app.database.crud import get_top_players
+from app.models import User, Player, GameSession
+from app.services.feedback import load_feedback_tables
+from app.services.game import evaluate_player_number
+from app.services.hints_service import get_unguessed_digits
+from app.services.leaderboard import Leaderboard
+from app.services.score import calculate_score_for_attempt, update_player_score
+
+PLAYER_COUNTS = [count for count in (10_000, 100_000, 1_000_000) if count <= int(os.getenv("PERF_MAX_PLAYERS", 1_000_000))]
+
+_rng = random.Random(0)
+PAIRS = [("".join(_rng.choices("0123456789", k=4)), list("".join(_rng.choices("0123456789", k=4)))) for _ in range(1000)]
+
+
+@pytest.fixture(scope="module")
+def feedback_tables():
+    """
+        Fixture that loads the precomputed feedback tables, as the API does at startup
+    """
+    load_feedback_tables()
+
+
+def test_evaluate_player_number(benchmark, feedback_tables):
+    benchmark(lambda: [evaluate_player_number(guess, secret) for guess, secret in PAIRS])
+
+
+def test_get_unguessed_digits(benchmark):
+    benchmark(lambda: [get_unguessed_digits(guess, secret) for guess, secret in PAIRS])
+
+
+def test_calculate_score_for_attempt(benchmark):
+    benchmark(lambda: [calculate_score_for_attempt(level, numbers, positions) for level in (1, 2, 3) for numbers in range(5) for positions in range(numbers + 1)])
+
+
+def test_update_player_score(benchmark):
+    player = Player(user_id=1, score=0)
+    game_session = GameSession(player_id=1, secret_number="1234", difficulty_level=2, attempts_left=10)
+    benchmark(lambda: [update_player_score(player, game_session, numbers, positions) for numbers in range(5) for positions in range(numbers + 1)])
+
+
+def _create_players(path: str, count: int) -> None:
+    engine = create_database_engine(f"sqlite:///{path}", "production")
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+
+    rng = random.Random(count)
+    connection = sqlite3.connect(path)
+    now = datetime.now().isoformat()
+    with connection:
+        connection.executemany(
+            "INSERT INTO users (id, username, email, hashed_password, created_at) VALUES (?, ?, ?, 'hash', ?)",
+            ((number, f"user{number}", f"user{number}@example.com", now) for number in range(1, count + 1))
+        )
+        connection.executemany(
+            "INSERT INTO player (id, user_id, score) VALUES (?, ?, ?)",
+            ((number, number, rng.randrange(1_000_000)) for number in range(1, count + 1))
+        )
+    connection.close()
+
+
+@pytest.fixture(scope="module", params=PLAYER_COUNTS, ids=lambda count: f"{count // 1000}k")
+def players_database(request, tmp_path_factory):
+    """
+        Fixture with a production profile engine on a database of 10k, 100k or 1M players
+    """
+    path = str(tmp_path_factory.mktemp("players") / "players.db")
+    _create_players(path, request.param)
+    engine = create_database_engine(f"sqlite:///{path}", "production")
+    yield engine
+    engine.dispose()
+
+
+def test_get_top_players(benchmark, players_database):
+    with Session(players_database) as session:
+        top = benchmark(lambda: get_top_players(session))
+    assert len(top) == 3
+
+
+def test_leaderboard_top(benchmark, players_database):
+    with players_database.connect() as connection:
+        rows = connection.exec_driver_sql("SELECT player.id, player.user_id, player.score, users.username, users.email FROM player JOIN users ON users.id = player.user_id").all()
+    board = Leaderboard()
+    board.rebuild([
+        {"player_id": row[0], "user_id": row[1], "score": row[2], "last_attempt_score": None, "username": row[3], "email": row[4]}
+        for row in rows
+    ])
+    benchmark(lambda: board.top(3))
+
+
+@pytest.fixture(scope="module")
+def guess_client(tmp_path_factory):
+    """
+        Fixture with an event loop, a client of the app through the ASGI stack on a test
+        database, and a function that creates a new game of the test player
+    """
+    from app.main import app
+
+    path = str(tmp_path_factory.mktemp("guess") / "guess.db")
+    engine = create_database_engine(f"sqlite:///{path}", "production")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(username="ana", email="ana@example.com", hashed_password="hash")
+        session.add(user)
+        session.flush()
+        session.add(Player(user_id=user.id))
+        session.commit()
+
+    def new_game() -> int:
+        with Session(engine) as session:
+            game_session = GameSession(player_id=1, secret_number="1234", difficulty_level=2, attempts_left=10)
+            session.add(game_session)
+            session.commit()
+            return game_session.id
+
+    loop = asyncio.new_event_loop()
+    async_engine = create_async_database_engine(f"sqlite:///{path}", "production")
+
+    async def _get_async_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    secret_key = auth_utils.SECRET_KEY
+    auth_utils.SECRET_KEY = "perf-secret"
+    app.dependency_overrides[get_async_session] = _get_async_session
+    app.dependency_overrides[get_async_read_session] = _get_async_session
+    token = auth_utils.create_access_token({"sub": "ana", "user_id": 1, "player_id": 1})
+    client = AsyncClient(transport=ASGITransport(app=app), base_url="http://perf", headers={"Authorization": f"Bearer {token}"})
+
+    yield loop, client, new_game
+
+    loop.run_until_complete(client.aclose())
+    loop.run_until_complete(async_engine.dispose())
+    loop.close()
+    app.dependency_overrides.clear()
+    auth_utils.SECRET_KEY = secret_key
+    engine.dispose()
+
+
+def test_make_a_guess(benchmark, guess_client):
+    loop, client, new_game = guess_client
+
+    def guess(session_id: int):
+        response = loop.run_until_complete(client.post("/api/v1/game/guess/", json={"session_id": session_id, "guessed_number": "1243"}))
+        assert response.status_code == 200
+
+    # A new game per round (outside the measured time), so every guess is the first one of its game
+    benchmark.pedantic(guess, setup=lambda: ((new_game(),), {}), rounds=200, warmup_rounds=5)
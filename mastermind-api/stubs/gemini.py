@@ -0,0 +1,64 @@
+"""
+    Local stand-in for the Gemini model used by the AI hints.
+    Answers generate_content and generate_content_async like genai.GenerativeModel,
+    with a configurable latency and error rate, to exercise the hint path offline.
+
+    Usage: install_gemini_stub(latency=0.3, error_rate=0.05) in the process running
+    the API, before the first hint is requested.
+"""
+import time
+import random
+import asyncio
+import threading
+
+
+class GeminiStubResponse:
+    """
+        Response with the text attribute read by the AI client
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class GeminiStubModel:
+    """
+        Stand-in for genai.GenerativeModel.
+        latency: seconds added to every call. error_rate: probability of raising an error
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _answer(self, prompt: str) -> GeminiStubResponse:
+        with self._lock:
+            self.calls += 1
+            failed = self.random.random() < self.error_rate
+        if failed:
+            raise RuntimeError("503 The model is overloaded")
+        return GeminiStubResponse(f"How many sides does the shape in riddle {abs(hash(prompt)) % 1000} have?")
+
+    def generate_content(self, prompt: str, request_options: dict = None) -> GeminiStubResponse:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._answer(prompt)
+
+    async def generate_content_async(self, prompt: str, request_options: dict = None) -> GeminiStubResponse:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._answer(prompt)
+
+
+def install_gemini_stub(latency: float = 0.0, error_rate: float = 0.0, seed: int = None) -> GeminiStubModel:
+    """
+        Makes the AI client of this process use the stand-in instead of Gemini
+    """
+    from app.client import ai_client
+
+    model = GeminiStubModel(latency, error_rate, seed)
+    ai_client._model = model
+    return model
@@ -0,0 +1,94 @@
+"""
+    Local stand-in for the random.org plain-text integer endpoint.
+    Answers GET /integers/?num=..&min=..&max=..&col=..&format=plain like random.org,
+    with a configurable latency and error rate, to test the secret pool offline.
+
+    Usage (from mastermind-api):
+        python -m stubs.random_org --port 8001 --latency 0.5 --error-rate 0.1
+    Then start the API with RANDOM_ORG_URL=http://localhost:8001/integers/
+"""
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class RandomOrgStubServer(ThreadingHTTPServer):
+    """
+        HTTP server that mimics random.org.
+        latency: seconds added to every response. error_rate: probability of answering 503
+    """
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.0, error_rate: float = 0.0, seed: int = None):
+        super().__init__(address, RandomOrgStubHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests_served = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/integers/"
+
+
+class RandomOrgStubHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        server = self.server
+        server.requests_served += 1
+        url = urlparse(self.path)
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        if url.path.rstrip("/") != "/integers":
+            return self._reply(404, "Error: not found\n")
+
+        if server.random.random() < server.error_rate:
+            return self._reply(503, "Error: service unavailable\n")
+
+        try:
+            params = {key: int(values[0]) for key, values in parse_qs(url.query).items() if key in ("num", "min", "max", "col")}
+            num, low, high, columns = params["num"], params["min"], params["max"], params.get("col", 1)
+        except (KeyError, ValueError):
+            return self._reply(400, "Error: invalid parameters\n")
+
+        numbers = [str(server.random.randint(low, high)) for _ in range(num)]
+        lines = ["\t".join(numbers[i:i + columns]) for i in range(0, num, columns)]
+        self._reply(200, "\n".join(lines) + "\n")
+
+    def _reply(self, status: int, body: str):
+        data = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain;charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_random_org_stub(port: int = 0, latency: float = 0.0, error_rate: float = 0.0, seed: int = None) -> RandomOrgStubServer:
+    """
+        Starts the stub in a background thread. Port 0 picks a free port (see server.url)
+    """
+    server = RandomOrgStubServer(("127.0.0.1", port), latency, error_rate, seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local random.org stand-in")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of answering 503")
+    args = parser.parse_args()
+
+    stub = RandomOrgStubServer(("127.0.0.1", args.port), args.latency, args.error_rate)
+    print(f"random.org stand-in listening on {stub.url}")
+    stub.serve_forever()
@@ -0,0 +1,27 @@
+import pytest
+from app.database.connection import settings
+from app.services.hint_cache import hint_cache
+from app.services.leaderboard import leaderboard, ranking_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_hint_cache(monkeypatch):
+    """
+        Fixture that starts every test with an empty, in-memory only hint cache
+    """
+    monkeypatch.setattr(settings, "hint_cache_persist", False)
+    hint_cache.clear()
+    yield
+    hint_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def empty_leaderboard():
+    """
+        Fixture that starts every test with an empty leaderboard, as each test uses its own database
+    """
+    leaderboard.rebuild([])
+    ranking_cache.clear()
+    yield
+    leaderboard.rebuild([])
+    ranking_cache.clear()
@@ -0,0 +1,215 @@
+import asyncio
+import pytest
+from unittest.mock import patch, Mock, AsyncMock
+from app.client import ai_client
+from app.client.ai_client import get_model, generate_from_ai_async, get_ai_client_metrics
+from app.client.resilience import CircuitBreaker, SingleFlight
+from app.services.metrics import reset_metrics, upstream_latency
+
+
+@pytest.fixture(autouse=True)
+def fresh_client(monkeypatch):
+    """
+        Fixture that resets the shared model and the concurrency limiter
+    """
+    monkeypatch.setattr(ai_client, "_model", None)
+    monkeypatch.setattr(ai_client, "_limiter", None)
+    monkeypatch.setattr(ai_client, "breaker", CircuitBreaker(failure_threshold=2, latency_threshold=1.0, reset_timeout=60))
+    monkeypatch.setattr(ai_client, "single_flight", SingleFlight())
+
+
+class TestGetModel:
+    """
+        Tests for the get_model function
+    """
+
+    @patch('app.client.ai_client.genai.GenerativeModel')
+    def test_model_is_created_once(self, mock_model_class):
+        """
+            Test the model is reused between calls
+        """
+        assert get_model() is get_model()
+        mock_model_class.assert_called_once_with(ai_client.MODEL_NAME)
+
+
+class TestGenerateFromAiAsync:
+    """
+        Tests for the generate_from_ai_async function
+    """
+
+    @pytest.mark.asyncio
+    @patch('app.client.ai_client.genai.GenerativeModel')
+    async def test_call_has_timeout(self, mock_model_class):
+        """
+            Test the request itself is bounded by what is left of the configured timeout
+        """
+        mock_model_class.return_value.generate_content_async = AsyncMock(return_value=Mock(text=" A riddle "))
+
+        assert await generate_from_ai_async("prompt") == "A riddle"
+        request_options = mock_model_class.return_value.generate_content_async.call_args[1]["request_options"]
+        assert 0 < request_options["timeout"] <= ai_client.settings.ai_timeout
+
+    @pytest.mark.asyncio
+    @patch('app.client.ai_client.genai.GenerativeModel')
+    async def test_successful_call(self, mock_model_class):
+        """
+            Test the async call returns the riddle text
+        """
+        mock_model_class.return_value.generate_content_async = AsyncMock(return_value=Mock(text="A riddle\n"))
+
+        assert await generate_from_ai_async("prompt") == "A riddle"
+
+    @pytest.mark.asyncio
+    @patch('app.client.ai_client.genai.GenerativeModel')
+    async def test_deadline_returns_none(self, mock_model_class, monkeypatch):
+        """
+            Test a call slower than the deadline gives None
+        """
+        async def slow_call(*args, **kwargs):
+            await asyncio.sleep(5)
+
+        mock_model_class.return_value.generate_content_async = slow_call
+        monkeypatch.setattr(ai_client.settings, "ai_timeout", 0.05)
+
+        assert await generate_from_ai_async("prompt") is None
+
+    @pytest.mark.asyncio
+    @patch('app.client.ai_client.genai.GenerativeModel')
+    async def test_concurrency_is_limited(self, mock_model_class, monkeypatch):
+        """
+            Test no more than ai_max_concurrency calls run at the same time
+        """
+        running = 0
+        highest = 0
+
+        async def call(*args, **kwargs):
+            nonlocal running, highest
+            running += 1
+            highest = max(highest, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return Mock(text="A riddle")
+
+        mock_model_class.return_value.generate_content_async = call
+        monkeypatch.setattr(ai_client.settings, "ai_max_concurrency", 2)
+
+        results = await asyncio.gather(*(generate_from_ai_async(f"prompt {i}") for i in range(6)))
+
+        assert results == ["A riddle"] * 6
+        assert highest == 2
+
+
+    @pytest.mark.asyncio
+    @patch('app.client.ai_client.genai.GenerativeModel')
+    async def test_waiting_for_a_slot_is_not_a_gemini_failure(self, mock_model_class, monkeypatch):
+        """
+            Test calls that time out while queued for a slot never reach Gemini and
+            do not count as failures of the breaker or as Gemini timeouts
+        """
+        mock_model_class.return_value.generate_content_async = AsyncMock(return_value=Mock(text="A riddle"))
+        monkeypatch.setattr(ai_client.settings, "ai_max_concurrency", 1)
+        monkeypatch.setattr(ai_client.settings, "ai_timeout", 0.05)
+        reset_metrics()
+
+        # Every slot is taken
+        limiter = ai_client._get_limiter()
+        await limiter.acquire()
+        queued = await asyncio.gather(*(generate_from_ai_async(f"prompt {i}") for i in range(3)))
+        limiter.release()
+
+        assert queued == [None] * 3
+        mock_model_class.return_value.generate_content_async.assert_not_awaited()
+        assert ai_client.breaker.snapshot()["consecutive_failures"] == 0
+        assert ai_client.breaker.state == CircuitBreaker.CLOSED
+        assert await generate_from_ai_async("prompt") == "A riddle"
+        assert upstream_latency.count(service="gemini", outcome="timeout") == 0
+
+
+    @pytest.mark.asyncio
+    @patch('app.client.ai_client.genai.GenerativeModel')
+    async def test_one_deadline_covers_the_wait_and_the_call(self, mock_model_class, monkeypatch):
+        """
+            Test a call that waited for a slot only gets the rest of ai_timeout, so the
+            caller has its answer within one ai_timeout in total
+        """
+        async def slow_call(*args, **kwargs):
+            await asyncio.sleep(5)
+
+        mock_model_class.return_value.generate_content_async = slow_call
+        monkeypatch.setattr(ai_client.settings, "ai_max_concurrency", 1)
+        monkeypatch.setattr(ai_client.settings, "ai_timeout", 0.2)
+
+        limiter = ai_client._get_limiter()
+        await limiter.acquire()
+        asyncio.get_running_loop().call_later(0.15, limiter.release)
+        start = asyncio.get_running_loop().time()
+
+        assert await generate_from_ai_async("prompt") is None
+        assert asyncio.get_running_loop().time() - start < 0.3
+
+
+class TestCircuitBreakerIntegration:
+    """
+        Tests for the circuit breaker around the Gemini calls
+    """
+
+    @pytest.mark.asyncio
+    @patch('app.client.ai_client.genai.GenerativeModel')
+    async def test_open_breaker_skips_upstream(self, mock_model_class):
+        """
+            Test that after repeated failures the API is not called anymore
+        """
+        mock_model_class.return_value.generate_content_async = AsyncMock(side_effect=Exception("Gemini down"))
+
+        for _ in range(5):
+            assert await generate_from_ai_async("prompt") is None
+
+        assert mock_model_class.return_value.generate_content_async.await_count == 2
+        metrics = get_ai_client_metrics()
+        assert metrics["circuit_breaker"]["state"] == "open"
+        assert metrics["circuit_breaker"]["rejected_calls"] == 3
+
+    @pytest.mark.asyncio
+    @patch('app.client.ai_client.genai.GenerativeModel')
+    async def test_concurrent_identical_prompts_are_coalesced(self, mock_model_class):
+        """
+            Test concurrent calls with the same prompt share one upstream call
+        """
+        async def call(*args, **kwargs):
+            await asyncio.sleep(0.02)
+            return Mock(text="A riddle")
+
+        mock_model = mock_model_class.return_value
+        mock_model.generate_content_async = AsyncMock(side_effect=call)
+
+        results = await asyncio.gather(*(generate_from_ai_async("same prompt") for _ in range(5)))
+
+        assert results == ["A riddle"] * 5
+        assert mock_model.generate_content_async.await_count == 1
+        assert get_ai_client_metrics()["coalescing"]["coalesced"] == 4
+
+    @pytest.mark.asyncio
+    @patch('app.client.ai_client.genai.GenerativeModel')
+    async def test_cancelled_probe_does_not_block_the_breaker(self, mock_model_class, monkeypatch):
+        """
+            Test a half-open probe cancelled by its caller does not leave the breaker rejecting every call
+        """
+        started = asyncio.Event()
+
+        async def hanging_call(*args, **kwargs):
+            started.set()
+            await asyncio.sleep(5)
+
+        monkeypatch.setattr(ai_client, "breaker", CircuitBreaker(failure_threshold=1, latency_threshold=1.0, reset_timeout=0))
+        ai_client.breaker.record_failure()
+        mock_model_class.return_value.generate_content_async = hanging_call
+
+        probe = asyncio.create_task(generate_from_ai_async("prompt"))
+        await started.wait()
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        mock_model_class.return_value.generate_content_async = AsyncMock(return_value=Mock(text="A riddle"))
+        assert await generate_from_ai_async("prompt") == "A riddle"
+        assert ai_client.breaker.state == CircuitBreaker.CLOSED
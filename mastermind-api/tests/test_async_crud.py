@@ -0,0 +1,254 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from httpx import ASGITransport, AsyncClient
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.auth import auth_utils
+from app.auth.auth_middleware import get_current_principal_async
+from app.auth.principal_cache import principal_cache
+from app.database import async_crud
+from app.database.crud import create_game_attempt
+from app.database.connection import async_database_url, create_async_database_engine, get_async_session, get_async_read_session
+from app.routes import game_router
+from app.main import app
+
+
+@pytest.fixture(autouse=True)
+def signing_key(monkeypatch):
+    """
+        Fixture that signs the tokens with a test key and starts with an empty principal cache
+    """
+    monkeypatch.setattr(auth_utils, "SECRET_KEY", "test-secret")
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+@pytest_asyncio.fixture
+async def engine(tmp_path):
+    """
+        Fixture with an async engine on a SQLite file database
+    """
+    engine = create_async_database_engine(f"sqlite:///{tmp_path / 'async.db'}", "production")
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def session(engine):
+    """
+        Fixture with an async session of the test database
+    """
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+
+
+class TestAsyncDatabaseUrl:
+    """
+        Tests for async_database_url
+    """
+
+    def test_drivers(self):
+        """
+            Test SQLite and PostgreSQL URLs get their async driver
+        """
+        assert async_database_url("sqlite:///./mastermind.db") == "sqlite+aiosqlite:///./mastermind.db"
+        assert async_database_url("postgresql+psycopg2://user:pass@db/mastermind") == "postgresql+asyncpg://user:pass@db/mastermind"
+
+    def test_unknown_backend(self):
+        """
+            Test a backend without async driver is rejected
+        """
+        with pytest.raises(ValueError):
+            async_database_url("mysql://user:pass@db/mastermind")
+
+
+class TestAsyncCrud:
+    """
+        Tests for the async CRUD functions
+    """
+
+    @pytest.mark.asyncio
+    async def test_create_and_authenticate_user(self, session):
+        """
+            Test a registered user gets a player and can authenticate
+        """
+        user = await async_crud.create_user(session, " Ana ", "ANA@example.com", "secret123")
+
+        assert user.username == "ana"
+        assert (await async_crud.get_user_by_email(session, "ana@example.com")).id == user.id
+        assert (await async_crud.get_player_by_user_id(session, user.id)) is not None
+        assert (await async_crud.authenticate_user(session, "ana", "secret123")).id == user.id
+        assert await async_crud.authenticate_user(session, "ana", "wrong") is None
+        assert await async_crud.authenticate_user(session, "bob", "secret123") is None
+
+    @pytest.mark.asyncio
+    async def test_game_session_and_attempts(self, session):
+        """
+            Test a game session is loaded with its player and its attempts are read in order
+        """
+        user = await async_crud.create_user(session, "ana", "ana@example.com", "secret123")
+        player = await async_crud.get_player_by_user_id(session, user.id)
+        created = await async_crud.create_game_session(session, player.id, "1234", 2, 8)
+        for guess in ("5678", "1243"):
+            await session.run_sync(create_game_attempt, created.id, guess, 0, 0)
+        session.expunge_all()
+
+        game_session = await async_crud.get_game_session(session, created.id, with_attempts=True)
+
+        assert game_session.player.id == player.id
+        assert [attempt.guessed_number for attempt in game_session.attempts] == ["5678", "1243"]
+        assert await async_crud.get_last_attempt_number(session, created.id) == 2
+        assert [attempt.attempt_number for attempt in await async_crud.get_game_attempts(session, created.id, 1)] == [2]
+        assert await async_crud.get_game_session(session, 999) is None
+
+
+class TestAsyncPrincipal:
+    """
+        Tests for the get_current_principal_async dependency
+    """
+
+    @pytest.mark.asyncio
+    async def test_principal_from_claims_and_from_database(self, session):
+        """
+            Test a token with claims needs no query, and an old token without them is resolved from the database
+        """
+        user = await async_crud.create_user(session, "ana", "ana@example.com", "secret123")
+        player = await async_crud.get_player_by_user_id(session, user.id)
+
+        token = auth_utils.create_access_token({"sub": "ana", "user_id": user.id, "player_id": player.id})
+        principal = await get_current_principal_async(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token), None)
+        assert (principal.user_id, principal.player_id) == (user.id, player.id)
+
+        principal_cache.clear()
+        token = auth_utils.create_access_token({"sub": "ana"})
+        principal = await get_current_principal_async(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token), session)
+        assert (principal.user_id, principal.player_id) == (user.id, player.id)
+
+
+class TestAsyncRoutes:
+    """
+        Tests for the async auth and game routes, played end to end on the test database
+    """
+
+    @pytest_asyncio.fixture
+    async def client(self, engine, monkeypatch):
+        """
+            Fixture with a client of the API using the test database, with a fixed secret number
+        """
+        async def _get_async_session():
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                yield session
+
+        monkeypatch.setattr(game_router, "draw_secret_number", lambda difficulty_level: (list("1234"), 8))
+        app.dependency_overrides[get_async_session] = _get_async_session
+        app.dependency_overrides[get_async_read_session] = _get_async_session
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+        app.dependency_overrides.clear()
+
+    @pytest.mark.asyncio
+    async def test_register_login_and_play(self, client):
+        """
+            Test a user registers, logs in, plays a game to the win and reads its history
+        """
+        response = await client.post("/api/v1/auth/register", json={"username": "ana", "email": "ana@example.com", "password": "secret123"})
+        assert response.status_code == 200
+        response = await client.post("/api/v1/auth/register", json={"username": "ana", "email": "other@example.com", "password": "secret123"})
+        assert response.status_code == 400
+
+        token = (await client.post("/api/v1/auth/login", json={"username": "ana", "password": "secret123"})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        assert (await client.get("/api/v1/auth/me", headers=headers)).json()["username"] == "ana"
+
+        session_id = (await client.post("/api/v1/game/start_game/?difficulty_level=2", headers=headers)).json()["session_id"]
+
+        response = await client.post("/api/v1/game/guess/", headers=headers, json={"session_id": session_id, "guessed_number": "1243"})
+        assert response.json()["result"] == {"correct_numbers": 4, "correct_positions": 2}
+
+        response = await client.post("/api/v1/game/remaining_candidates/", headers=headers, json=session_id)
+        assert response.json()["remaining_candidates"] > 0
+
+        response = await client.post("/api/v1/game/guess/", headers=headers, json={"session_id": session_id, "guessed_number": "1234"})
+        assert response.json()["result"] == "WIN"
+
+        response = await client.post("/api/v1/game/history/", headers=headers, json={"session_id": session_id})
+        assert [attempt["guessed_number"] for attempt in response.json()["history"]] == ["1243", "1234"]
+
+    @pytest.mark.asyncio
+    async def test_guess_batch(self, client):
+        """
+            Test a batch of guesses is validated, registered in order and stops at the win
+        """
+        await client.post("/api/v1/auth/register", json={"username": "ana", "email": "ana@example.com", "password": "secret123"})
+        token = (await client.post("/api/v1/auth/login", json={"username": "ana", "password": "secret123"})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        session_id = (await client.post("/api/v1/game/start_game/?difficulty_level=2", headers=headers)).json()["session_id"]
+
+        response = await client.post("/api/v1/game/guess_batch/", headers=headers, json={"session_id": session_id, "guessed_numbers": ["1243", "12a4"]})
+        assert response.status_code == 400
+
+        response = await client.post("/api/v1/game/guess_batch/", headers=headers, json={"session_id": session_id, "guessed_numbers": ["1243", "1234", "5555"]})
+        body = response.json()
+        assert body["result"] == "WIN"
+        assert body["ignored_guesses"] == 1
+        assert [(attempt["attempt_number"], attempt["correct_positions"]) for attempt in body["attempts"]] == [(1, 2), (2, 4)]
+
+        response = await client.post("/api/v1/game/guess_batch/", headers=headers, json={"session_id": session_id, "guessed_numbers": ["1234"]})
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_concurrent_guesses(self, client):
+        """
+            Test concurrent guesses of one session get a 200 or a 409, never a 500,
+            and the attempts left match the attempts registered
+        """
+        await client.post("/api/v1/auth/register", json={"username": "ana", "email": "ana@example.com", "password": "secret123"})
+        token = (await client.post("/api/v1/auth/login", json={"username": "ana", "password": "secret123"})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        session_id = (await client.post("/api/v1/game/start_game/?difficulty_level=2", headers=headers)).json()["session_id"]
+
+        responses = await asyncio.gather(*(
+            client.post("/api/v1/game/guess/", headers=headers, json={"session_id": session_id, "guessed_number": "5555"})
+            for _ in range(4)
+        ))
+
+        statuses = [response.status_code for response in responses]
+        assert set(statuses) <= {200, 409}
+        assert 200 in statuses
+        history = (await client.post("/api/v1/game/history/", headers=headers, json={"session_id": session_id})).json()["history"]
+        registered = [response.json() for response in responses if response.status_code == 200]
+        assert len(history) == len(registered)
+        assert sorted(outcome["attempt_number"] for outcome in registered) == list(range(1, len(registered) + 1))
+        assert min(outcome["attempts_left"] for outcome in registered) == 8 - len(registered)
+
+    @pytest.mark.asyncio
+    async def test_hint_holds_no_connection_during_the_ai_call(self, client, engine, monkeypatch):
+        """
+            Test the hint route returns its connection to the pool before awaiting the AI
+        """
+        checked_out = []
+        event.listen(engine.sync_engine, "checkout", lambda *args: checked_out.append(1))
+        event.listen(engine.sync_engine, "checkin", lambda *args: checked_out.pop())
+        held_during_call = []
+
+        async def _generate_hint(guessed_number, secret_number):
+            held_during_call.append(len(checked_out))
+            return "A hint"
+
+        monkeypatch.setattr(game_router, "generate_hint_async", _generate_hint)
+        await client.post("/api/v1/auth/register", json={"username": "ana", "email": "ana@example.com", "password": "secret123"})
+        token = (await client.post("/api/v1/auth/login", json={"username": "ana", "password": "secret123"})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        session_id = (await client.post("/api/v1/game/start_game/?difficulty_level=2", headers=headers)).json()["session_id"]
+        await client.post("/api/v1/game/guess/", headers=headers, json={"session_id": session_id, "guessed_number": "1243"})
+
+        response = await client.post("/api/v1/game/get_ai_hint/", headers=headers, json=session_id)
+
+        assert response.json()["hint"] == "A hint"
+        assert held_during_call == [0]
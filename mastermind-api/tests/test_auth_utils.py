@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import pytest
+import pytest_asyncio
+from passlib.context import CryptContext
+from sqlmodel import SQLModel
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.auth import auth_utils
+from app.auth.auth_utils import hash_password_async, verify_and_update_password_async
+from app.database.async_crud import create_user, authenticate_user
+
+
+@pytest.fixture(autouse=True)
+def fast_hashing(monkeypatch):
+    """
+        Fixture that uses the lowest bcrypt cost factor to keep the tests fast
+    """
+    monkeypatch.setattr(auth_utils, "pwd_context", CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=4))
+
+
+@pytest_asyncio.fixture
+async def test_session(tmp_path):
+    """
+        Fixture that creates a database and an async session for each test.
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'auth.db'}")
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+class TestAsyncHashing:
+    """
+        Tests for hash_password_async and verify_and_update_password_async
+    """
+
+    @pytest.mark.asyncio
+    async def test_hash_and_verify(self):
+        """
+            Test a password hashed in the executor can be verified
+        """
+        hashed = await hash_password_async("secret")
+
+        assert await verify_and_update_password_async("secret", hashed) == (True, None)
+        valid, _ = await verify_and_update_password_async("wrong", hashed)
+        assert not valid
+
+    @pytest.mark.asyncio
+    async def test_hashing_runs_in_dedicated_threads(self, monkeypatch):
+        """
+            Test the hash is computed in the hashing executor, not in the event loop thread
+        """
+        threads = []
+        monkeypatch.setattr(auth_utils, "hash_password", lambda password: threads.append(threading.current_thread().name) or "hash")
+
+        await asyncio.gather(*(hash_password_async("secret") for _ in range(3)))
+
+        assert all(name.startswith("password-hash") for name in threads)
+
+    @pytest.mark.asyncio
+    async def test_outdated_cost_factor_is_rehashed(self, monkeypatch):
+        """
+            Test a hash with an old cost factor gets a replacement hash
+        """
+        old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash("secret")
+
+        valid, new_hash = await verify_and_update_password_async("secret", old_hash)
+
+        assert valid
+        assert new_hash is not None and new_hash.startswith("$2b$04$")
+
+
+class TestAsyncUserAuthentication:
+    """
+        Tests for create_user and authenticate_user of the async crud
+    """
+
+    @pytest.mark.asyncio
+    async def test_register_and_login(self, test_session):
+        """
+            Test a registered user can authenticate with the right password only
+        """
+        await create_user(test_session, "Gabriela", "gaby@example.com", "secret")
+
+        assert (await authenticate_user(test_session, "gabriela", "secret")).username == "gabriela"
+        assert await authenticate_user(test_session, "gabriela", "wrong") is None
+        assert await authenticate_user(test_session, "nobody", "secret") is None
+
+    @pytest.mark.asyncio
+    async def test_login_upgrades_stored_hash(self, test_session):
+        """
+            Test logging in replaces a hash with an outdated cost factor
+        """
+        user = await create_user(test_session, "player", "player@example.com", "secret")
+        user.hashed_password = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash("secret")
+        test_session.add(user)
+        await test_session.commit()
+
+        user = await authenticate_user(test_session, "player", "secret")
+
+        assert user.hashed_password.startswith("$2b$04$")
@@ -0,0 +1,105 @@
+import random
+import pytest
+from app.services import feedback
+from app.services.feedback import (
+    all_codes,
+    code_to_index,
+    index_to_code,
+    get_feedback_table,
+    unpack_feedback
+)
+from app.services.game import evaluate_player_number, _evaluate_player_number_scalar
+
+
+@pytest.fixture
+def table_dir(tmp_path, monkeypatch):
+    """
+        Fixture that stores the feedback tables in a temporary directory
+        and starts every test without loaded tables
+    """
+    monkeypatch.setattr(feedback.settings, "feedback_table_dir", str(tmp_path))
+    monkeypatch.setattr(feedback, "_tables", {})
+    return tmp_path
+
+
+class TestCodeEncoding:
+    """
+        Tests for code_to_index and index_to_code
+    """
+
+    def test_round_trip(self):
+        """
+            Test that every code survives encoding and decoding
+        """
+        for base in (6, 8, 10):
+            for index in (0, 1, base**4 - 1, base**3 + 2):
+                assert code_to_index(index_to_code(index, base), base) == index
+
+    def test_all_codes_are_ordered_by_index(self):
+        """
+            Test that row i of the digit matrix is the code with index i
+        """
+        codes = all_codes(6)
+
+        assert codes.shape == (6**4, 4)
+        assert "".join(map(str, codes[code_to_index("5302", 6)])) == "5302"
+
+
+class TestFeedbackTable:
+    """
+        Tests for get_feedback_table
+    """
+
+    def test_table_matches_scalar_evaluation(self, table_dir):
+        """
+            Test that the table gives the same result as the reference implementation
+        """
+        table = get_feedback_table(6)
+        rng = random.Random(7)
+
+        for _ in range(2000):
+            guess = index_to_code(rng.randrange(6**4), 6)
+            secret = index_to_code(rng.randrange(6**4), 6)
+
+            expected = _evaluate_player_number_scalar(list(guess), list(secret))
+            assert unpack_feedback(table[code_to_index(guess, 6), code_to_index(secret, 6)]) == expected
+
+    def test_table_is_persisted_and_memory_mapped(self, table_dir, monkeypatch):
+        """
+            Test that a second load reuses the file on disk instead of rebuilding it
+        """
+        get_feedback_table(6)
+        assert (table_dir / "feedback_base6.npy").exists()
+
+        monkeypatch.setattr(feedback, "_tables", {})
+        monkeypatch.setattr(feedback, "_build_table_file", lambda base, path: pytest.fail("table rebuilt"))
+
+        table = get_feedback_table(6)
+        assert not table.flags.owndata
+        assert not table.flags.writeable
+
+
+class TestEvaluatePlayerNumberWithTable:
+    """
+        Tests for evaluate_player_number when the feedback tables are loaded
+    """
+
+    @pytest.mark.parametrize("player_number, secret_number, expected", [
+        ("2531", "2531", (4, 4)),
+        ("3513", "2222", (0, 0)),
+        ("2457", "7542", (4, 0)),
+        ("2346", "5236", (3, 1)),
+        ("2233", "3332", (3, 1)),
+        ("1435", "1335", (3, 3)),
+    ])
+    def test_uses_table(self, table_dir, player_number, secret_number, expected):
+        """
+            Test the wrapper returns plain ints that match the expected feedback
+        """
+        get_feedback_table(6)
+        get_feedback_table(8)
+
+        correct_numbers, correct_positions = evaluate_player_number(list(player_number), list(secret_number))
+
+        assert (correct_numbers, correct_positions) == expected
+        assert type(correct_numbers) is int and type(correct_positions) is int
@@ -1,5 +1,6 @@
 import pytest
-from app.services.game import evaluate_player_number
+import numpy as np
+from app.services.game import evaluate_player_number, evaluate_batch
 
 class TestEvaluatePlayerNumber:
     """
@@ -93,4 +94,42 @@ class TestEvaluatePlayerNumber:
         assert correct_numbers == 3
         assert correct_position == 1
 
-        
\ No newline at end of file
+        
+
+class TestEvaluateBatch:
+    """
+        Tests for the evaluate_batch function.
+    """
+
+    def test_matches_scalar_evaluation(self):
+        """
+            Test every pair gives the same result as evaluate_player_number
+        """
+        rng = np.random.default_rng(3)
+        guesses = rng.integers(0, 10, size=(500, 4))
+        secrets = rng.integers(0, 10, size=(500, 4))
+
+        correct_numbers, correct_positions = evaluate_batch(guesses, secrets)
+
+        for i in range(len(guesses)):
+            expected = evaluate_player_number([str(d) for d in guesses[i]], [str(d) for d in secrets[i]])
+            assert (correct_numbers[i], correct_positions[i]) == expected
+
+    def test_single_guess_against_many_secrets(self):
+        """
+            Test a single guess is broadcast against every secret
+        """
+        correct_numbers, correct_positions = evaluate_batch(
+            [2, 2, 3, 3],
+            [[3, 3, 3, 2], [2, 2, 3, 3], [1, 4, 5, 6]]
+        )
+
+        assert correct_numbers.tolist() == [3, 4, 0]
+        assert correct_positions.tolist() == [1, 4, 0]
+
+    def test_invalid_code_length(self):
+        """
+            Test codes that do not have 4 digits are rejected
+        """
+        with pytest.raises(ValueError):
+            evaluate_batch([[1, 2, 3]], [[1, 2, 3]])
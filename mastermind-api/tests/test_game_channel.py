@@ -0,0 +1,270 @@
+import time
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from fastapi.testclient import TestClient
+from app.auth import auth_utils
+from app.auth.principal_cache import principal_cache
+from app.database.connection import create_async_database_engine, get_async_session
+from app.models import User, Player, GameSession, GameAttempt
+from app.services import game_channel
+from app.services.game_channel import ChannelError, open_channel
+from app.services.guess_service import load_game_session, submit_guess
+from app.main import app
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """
+        Fixture with a SQLite file database holding a player (id 1), an active game of it
+        (id 1, secret 1234, 3 attempts) and a game of another player (id 2)
+    """
+    monkeypatch.setattr(game_channel, "_bound_sessions", set())
+    path = tmp_path / "channel.db"
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for username in ("ana", "luis"):
+            user = User(username=username, email=f"{username}@example.com", hashed_password="hash")
+            session.add(user)
+            session.flush()
+            session.add(Player(user_id=user.id))
+        session.flush()
+        session.add(GameSession(player_id=1, secret_number="1234", difficulty_level=1, attempts_left=3))
+        session.add(GameSession(player_id=2, secret_number="1234", difficulty_level=1, attempts_left=3))
+        session.commit()
+    yield path, engine
+    engine.dispose()
+
+
+def _open(engine, session_id: int = 1, player_id: int = 1):
+    session = Session(engine, expire_on_commit=False)
+    channel, history = open_channel(session, session_id, player_id, time.time() + 60)
+    return session, channel, history
+
+
+class TestOpenChannel:
+    """
+        Tests for open_channel, the binding of a channel to a game session
+    """
+
+    @pytest.mark.parametrize("session_id, player_id, status_code", [(3, 1, 404), (2, 1, 403), ("1", 1, 400)])
+    def test_binding_checks(self, database, session_id, player_id, status_code):
+        """
+            Test a channel is only bound to an existing game session of the player
+        """
+        _, engine = database
+        with Session(engine) as session, pytest.raises(ChannelError) as error:
+            open_channel(session, session_id, player_id, time.time() + 60)
+
+        assert error.value.status_code == status_code
+
+    def test_one_channel_per_game_session(self, database):
+        """
+            Test a second channel for the same game session is refused until the first one closes
+        """
+        _, engine = database
+        _, channel, _ = _open(engine)
+
+        with pytest.raises(ChannelError) as error:
+            _open(engine)
+        assert error.value.status_code == 409
+
+        channel.close()
+        _open(engine)
+
+    def test_bound_channel_gets_the_history(self, database):
+        """
+            Test a channel opened on a game with attempts resumes after the last one
+        """
+        _, engine = database
+        with Session(engine) as session:
+            submit_guess(session, load_game_session(session, 1), "5555")
+
+        _, channel, history = _open(engine)
+
+        assert [attempt["guessed_number"] for attempt in history] == ["5555"]
+        assert channel.state()["last_attempt_number"] == 1
+        assert channel.state()["attempts_left"] == 2
+
+
+class TestChannelGuess:
+    """
+        Tests for the guesses of a bound channel
+    """
+
+    def test_guesses_are_written_through_without_reads_of_the_session(self, database):
+        """
+            Test each guess is committed and only reads the score columns of the player
+        """
+        _, engine = database
+        session, channel, _ = _open(engine)
+        selects = []
+        event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: selects.append(statement) if statement.startswith("SELECT") else None)
+
+        first = channel.guess(session, "1325")
+        second = channel.guess(session, "5555")
+
+        assert (first["attempt_number"], second["attempt_number"]) == (1, 2)
+        assert second["score_this_attempt"] < 0 # Penalty for going backwards
+        assert len(selects) == 2 and all("FROM player" in statement for statement in selects)
+        with Session(engine) as check:
+            assert check.get(Player, 1).score == second["total_score"]
+            assert check.get(GameSession, 1).attempts_left == 1
+            assert len(check.exec(select(GameAttempt)).all()) == 2
+
+    def test_channel_scores_as_the_http_guesses(self, database):
+        """
+            Test the channel gives the same outcome as submit_guess for the same guesses
+        """
+        _, engine = database
+        session, channel, _ = _open(engine)
+        channel_outcome = [channel.guess(session, guess) for guess in ("1325", "5555", "1234")]
+
+        with Session(engine) as session:
+            http_outcome = [submit_guess(session, load_game_session(session, 2), guess) for guess in ("1325", "5555", "1234")]
+
+        for frame, outcome in zip(channel_outcome, http_outcome):
+            assert frame["score_this_attempt"] == outcome["score_this_attempt"]
+            assert frame["result"] == outcome["result"]
+        assert channel_outcome[-1]["result"] == "LOSE"
+
+    def test_invalid_guess_is_rejected(self, database):
+        """
+            Test a guess that is not of 4 digits is refused and nothing is written
+        """
+        _, engine = database
+        session, channel, _ = _open(engine)
+
+        for guess in ("12a4", "123", 1234):
+            with pytest.raises(ChannelError) as error:
+                channel.guess(session, guess)
+            assert error.value.status_code == 400
+
+        assert channel.state()["attempts_left"] == 3
+
+    def test_attempt_registered_elsewhere_reloads_the_state(self, database):
+        """
+            Test a guess that conflicts with an attempt sent outside the channel is refused
+            and the channel continues from the state in the database
+        """
+        _, engine = database
+        session, channel, _ = _open(engine)
+        with Session(engine) as other:
+            submit_guess(other, load_game_session(other, 1), "5555")
+
+        with pytest.raises(ChannelError) as error:
+            channel.guess(session, "1325")
+        assert error.value.status_code == 409
+        assert error.value.state["last_attempt_number"] == 1
+        assert error.value.state["attempts_left"] == 2
+
+        assert channel.guess(session, "1325")["attempt_number"] == 2
+
+
+class TestChannelEndpoint:
+    """
+        Tests for the /game/ws/ WebSocket endpoint
+    """
+
+    @pytest.fixture
+    def client(self, database, monkeypatch):
+        """
+            Fixture with a test client using the test database and a test signing key
+        """
+        path, _ = database
+        monkeypatch.setattr(auth_utils, "SECRET_KEY", "test-secret")
+        principal_cache.clear()
+
+        checked_out = []
+
+        async def _get_async_session():
+            engine = create_async_database_engine(f"sqlite:///{path}", "production")
+            event.listen(engine.sync_engine, "checkout", lambda *args: checked_out.append(1))
+            event.listen(engine.sync_engine, "checkin", lambda *args: checked_out.pop())
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                yield session
+            await engine.dispose()
+
+        app.dependency_overrides[get_async_session] = _get_async_session
+        client = TestClient(app)
+        client.checked_out = checked_out
+        yield client
+        app.dependency_overrides.clear()
+        principal_cache.clear()
+
+    def test_play_a_game_over_the_channel(self, client):
+        """
+            Test a client authenticates once, binds to its game and plays it to the win
+        """
+        token = auth_utils.create_access_token({"sub": "ana", "user_id": 1, "player_id": 1})
+
+        with client.websocket_connect("/api/v1/game/ws/") as websocket:
+            websocket.send_json({"token": token, "session_id": 1})
+            bound = websocket.receive_json()
+            assert (bound["type"], bound["attempts_left"], bound["history"]) == ("bound", 3, [])
+
+            websocket.send_json({"guessed_number": "12x4"})
+            assert websocket.receive_json()["status"] == 400
+
+            websocket.send_json({"guessed_number": "1243"})
+            feedback = websocket.receive_json()
+            assert (feedback["type"], feedback["correct_numbers"], feedback["correct_positions"], feedback["result"]) == ("feedback", 4, 2, None)
+
+            websocket.send_json({"guessed_number": "1234"})
+            assert websocket.receive_json()["result"] == "WIN"
+
+        assert game_channel._bound_sessions == set()
+
+    @pytest.mark.parametrize("first_frame, status_code", [
+        ({"token": "not-a-token", "session_id": 1}, 401),
+        ({"session_id": 1}, 401),
+        ("session", 400),
+    ])
+    def test_channel_refuses_bad_credentials(self, client, first_frame, status_code):
+        """
+            Test a channel is closed when its first frame does not authenticate
+        """
+        with client.websocket_connect("/api/v1/game/ws/") as websocket:
+            websocket.send_json(first_frame)
+            assert websocket.receive_json()["status"] == status_code
+
+    def test_channel_refuses_the_game_of_another_player(self, client):
+        """
+            Test a player cannot bind a channel to the game of another player
+        """
+        token = auth_utils.create_access_token({"sub": "ana", "user_id": 1, "player_id": 1})
+
+        with client.websocket_connect("/api/v1/game/ws/") as websocket:
+            websocket.send_json({"token": token, "session_id": 2})
+            assert websocket.receive_json()["status"] == 403
+
+    def test_idle_channel_holds_no_connection(self, client, database):
+        """
+            Test the channel returns its connection to the pool while it waits for the client,
+            after binding, after a guess and after a conflict with a guess made elsewhere
+        """
+        _, engine = database
+        token = auth_utils.create_access_token({"sub": "ana", "user_id": 1, "player_id": 1})
+
+        with client.websocket_connect("/api/v1/game/ws/") as websocket:
+            websocket.send_json({"token": token, "session_id": 1})
+            websocket.receive_json()
+            websocket.send_json({"guessed_number": "12x4"}) # Answered only once the previous frame is done
+            websocket.receive_json()
+            assert client.checked_out == []
+
+            websocket.send_json({"guessed_number": "5555"})
+            websocket.receive_json()
+            websocket.send_json({"guessed_number": "12x4"})
+            websocket.receive_json()
+            assert client.checked_out == []
+
+            with Session(engine) as other:
+                submit_guess(other, load_game_session(other, 1), "6666")
+            websocket.send_json({"guessed_number": "1325"})
+            assert websocket.receive_json()["status"] == 409
+            websocket.send_json({"guessed_number": "12x4"})
+            websocket.receive_json()
+            assert client.checked_out == []
@@ -0,0 +1,338 @@
+import threading
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlalchemy.pool import StaticPool
+from app.models import User, Player, GameSession, GameAttempt, ScoreEvent
+from app.services.guess_service import GuessConflictError, load_game_session, submit_guess, submit_guesses
+from app.database.crud import get_game_attempts, get_last_attempt_number
+
+
+def _create_engine():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass= StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(username="ana", email="ana@example.com", hashed_password="hash")
+        session.add(user)
+        session.commit()
+        player = Player(user_id=user.id)
+        session.add(player)
+        session.commit()
+        session.add(GameSession(player_id=player.id, secret_number="1234", difficulty_level=1, attempts_left=3))
+        session.commit()
+    return engine
+
+
+@pytest.fixture
+def engine():
+    """
+        Fixture that creates an in memory database with a player and an active game
+    """
+    return _create_engine()
+
+
+def _guess(engine, guessed_number: str, last_attempt_number: int = None) -> dict:
+    with Session(engine) as session:
+        return submit_guess(session, load_game_session(session, 1), guessed_number, last_attempt_number)
+
+
+def _guesses(engine, guessed_numbers: list, last_attempt_number: int = None) -> dict:
+    with Session(engine) as session:
+        return submit_guesses(session, load_game_session(session, 1), guessed_numbers, last_attempt_number)
+
+
+def _attempt_row(attempt: GameAttempt) -> tuple:
+    return attempt.attempt_number, attempt.guessed_number, attempt.correct_numbers, attempt.correct_positions
+
+
+class TestSubmitGuess:
+    """
+        Tests for the submit_guess unit of work
+    """
+
+    def test_guess_is_stored_in_one_commit(self, engine):
+        """
+            Test the score, the attempt and the session change are committed together
+        """
+        commits = []
+        event.listen(engine, "commit", lambda conn: commits.append(conn))
+
+        outcome = _guess(engine, "1325")
+
+        assert len(commits) == 1
+        assert outcome["result"] is None
+        assert outcome["correct_numbers"] == 3
+        assert outcome["correct_positions"] == 1
+        assert outcome["attempts_left"] == 2
+        assert outcome["history"] == [{"attempt_number": 1, "guessed_number": "1325", "correct_numbers": 3, "correct_positions": 1}]
+
+        with Session(engine) as session:
+            assert session.get(Player, 1).score == outcome["total_score"] == outcome["score_this_attempt"]
+            assert session.get(GameSession, 1).attempts_left == 2
+            assert len(session.exec(select(GameAttempt)).all()) == 1
+
+    def test_claim_is_the_only_write_of_the_session_row(self, engine):
+        """
+            Test a guess that does not end the game updates the game session row once,
+            with the conditional decrement of the claim
+        """
+        updates = []
+        event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: updates.append(statement) if statement.startswith("UPDATE game_session") else None)
+
+        _guess(engine, "1325")
+
+        assert len(updates) == 1 and "attempts_left - " in updates[0]
+
+    def test_win_ends_the_session(self, engine):
+        """
+            Test guessing the secret number ends the session with a WIN
+        """
+        outcome = _guess(engine, "1234")
+
+        assert outcome["result"] == "WIN"
+        with Session(engine) as session:
+            assert not session.get(GameSession, 1).is_active
+
+    def test_last_attempt_ends_the_session(self, engine):
+        """
+            Test running out of attempts ends the session with a LOSE and keeps the whole history
+        """
+        _guess(engine, "5555")
+        _guess(engine, "6666")
+        outcome = _guess(engine, "1243")
+
+        assert outcome["result"] == "LOSE"
+        assert [attempt["guessed_number"] for attempt in outcome["history"]] == ["5555", "6666", "1243"]
+        with Session(engine) as session:
+            assert not session.get(GameSession, 1).is_active
+
+    def test_nothing_is_written_when_the_commit_fails(self, engine, monkeypatch):
+        """
+            Test a failed commit leaves the player, the attempts and the session unchanged
+        """
+        with Session(engine) as session:
+            monkeypatch.setattr(session, "commit", lambda: (_ for _ in ()).throw(RuntimeError("disk full")))
+            with pytest.raises(RuntimeError):
+                submit_guess(session, load_game_session(session, 1), "1325")
+
+        with Session(engine) as session:
+            assert session.get(Player, 1).score == 0
+            assert session.get(GameSession, 1).attempts_left == 3
+            assert session.exec(select(GameAttempt)).all() == []
+
+
+class TestIncrementalHistory:
+    """
+        Tests for the attempt numbers and the history delta of submit_guess
+    """
+
+    def test_attempts_are_numbered_in_order(self, engine):
+        """
+            Test each attempt gets the next number of its game session
+        """
+        numbers = [_guess(engine, guess)["attempt_number"] for guess in ("5555", "6666")]
+
+        assert numbers == [1, 2]
+        with Session(engine) as session:
+            assert get_last_attempt_number(session, 1) == 2
+            assert [attempt.attempt_number for attempt in session.get(GameSession, 1).attempts] == [1, 2]
+
+    def test_up_to_date_client_only_gets_the_new_attempt(self, engine):
+        """
+            Test the history only holds the new attempt when the client has all the previous ones
+        """
+        _guess(engine, "5555")
+        outcome = _guess(engine, "6666", last_attempt_number=1)
+
+        assert [attempt["attempt_number"] for attempt in outcome["history"]] == [2]
+
+    def test_client_behind_gets_the_missing_attempts(self, engine):
+        """
+            Test the history holds every attempt after the last one the client has
+        """
+        _guess(engine, "5555")
+        _guess(engine, "6666")
+        outcome = _guess(engine, "1325", last_attempt_number=1)
+
+        assert [attempt["guessed_number"] for attempt in outcome["history"]] == ["6666", "1325"]
+
+    def test_get_game_attempts_after_a_number(self, engine):
+        """
+            Test get_game_attempts returns the attempts after the given number, in order
+        """
+        for guess in ("5555", "6666"):
+            _guess(engine, guess)
+
+        with Session(engine) as session:
+            assert [attempt.guessed_number for attempt in get_game_attempts(session, 1)] == ["5555", "6666"]
+            assert [attempt.guessed_number for attempt in get_game_attempts(session, 1, 1)] == ["6666"]
+            assert get_game_attempts(session, 1, 2) == []
+
+
+class TestSubmitGuesses:
+    """
+        Tests for the submit_guesses batch unit of work
+    """
+
+    def test_batch_scores_as_sequential_guesses(self, engine):
+        """
+            Test a batch leaves the same score, attempts and session as the guesses sent one by one
+        """
+        sequential = _create_engine()
+        for guess in ("1325", "5555"):
+            _guess(sequential, guess)
+
+        outcome = _guesses(engine, ["1325", "5555"])
+
+        assert outcome["result"] is None
+        assert [attempt["attempt_number"] for attempt in outcome["attempts"]] == [1, 2]
+        assert outcome["attempts"][1]["score_this_attempt"] < 0 # Penalty for going backwards
+        with Session(engine) as session, Session(sequential) as expected:
+            assert session.get(Player, 1).score == expected.get(Player, 1).score == outcome["total_score"]
+            assert session.get(Player, 1).last_attempt_score == expected.get(Player, 1).last_attempt_score
+            assert session.get(GameSession, 1).attempts_left == expected.get(GameSession, 1).attempts_left == 1
+            assert [_attempt_row(attempt) for attempt in session.exec(select(GameAttempt)).all()] == \
+                [_attempt_row(attempt) for attempt in expected.exec(select(GameAttempt)).all()]
+            assert sum(score_event.score for score_event in session.exec(select(ScoreEvent)).all()) == outcome["total_score"]
+
+    def test_guesses_after_a_win_are_ignored(self, engine):
+        """
+            Test the batch stops at the winning guess and does not store the rest
+        """
+        outcome = _guesses(engine, ["5555", "1234", "6666"])
+
+        assert outcome["result"] == "WIN"
+        assert outcome["ignored_guesses"] == 1
+        assert [attempt["guessed_number"] for attempt in outcome["history"]] == ["5555", "1234"]
+        with Session(engine) as session:
+            assert not session.get(GameSession, 1).is_active
+            assert len(session.exec(select(GameAttempt)).all()) == 2
+
+    def test_lose_takes_precedence_on_the_last_attempt(self, engine):
+        """
+            Test guessing the number with the last attempt is a LOSE, as with submit_guess
+        """
+        _guess(engine, "5555")
+
+        outcome = _guesses(engine, ["6666", "1234", "1234"], last_attempt_number=1)
+
+        assert outcome["result"] == "LOSE"
+        assert outcome["ignored_guesses"] == 1
+        assert [attempt["attempt_number"] for attempt in outcome["history"]] == [2, 3]
+
+    def test_batch_is_one_commit_and_one_insert(self, engine):
+        """
+            Test the attempts are written with a single INSERT statement, in a single commit
+        """
+        commits, inserts = [], []
+        event.listen(engine, "commit", lambda conn: commits.append(conn))
+        event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: inserts.append(statement) if statement.startswith("INSERT INTO game_attempt") else None)
+
+        _guesses(engine, ["5555", "6666"])
+
+        assert len(commits) == 1
+        assert len(inserts) == 1
+
+    def test_nothing_is_written_when_the_commit_fails(self, engine, monkeypatch):
+        """
+            Test a failed commit leaves the player, the attempts and the session unchanged
+        """
+        with Session(engine) as session:
+            monkeypatch.setattr(session, "commit", lambda: (_ for _ in ()).throw(RuntimeError("disk full")))
+            with pytest.raises(RuntimeError):
+                submit_guesses(session, load_game_session(session, 1), ["5555", "1325"])
+
+        with Session(engine) as session:
+            assert session.get(Player, 1).score == 0
+            assert session.get(GameSession, 1).attempts_left == 3
+            assert session.exec(select(GameAttempt)).all() == []
+
+
+class TestConcurrentGuesses:
+    """
+        Tests for guesses of the same game session registered at the same time
+    """
+
+    def test_concurrent_guesses_are_claimed_once(self, tmp_path):
+        """
+            Test guesses made on the same loaded state register one attempt and the
+            others fail with GuessConflictError, without losing an update
+        """
+        engine = create_engine(f"sqlite:///{tmp_path / 'concurrent.db'}", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            user = User(username="ana", email="ana@example.com", hashed_password="hash")
+            session.add(user)
+            session.flush()
+            session.add(Player(user_id=user.id))
+            session.flush()
+            session.add(GameSession(player_id=1, secret_number="1234", difficulty_level=1, attempts_left=10))
+            session.commit()
+
+        barrier = threading.Barrier(4)
+        outcomes = []
+
+        def guess():
+            with Session(engine) as session:
+                game_session = load_game_session(session, 1)
+                game_session.player
+                barrier.wait()
+                try:
+                    outcomes.append(submit_guess(session, game_session, "5555"))
+                except GuessConflictError as error:
+                    outcomes.append(error)
+
+        threads = [threading.Thread(target=guess) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        registered = [outcome for outcome in outcomes if isinstance(outcome, dict)]
+        assert len(registered) == 1
+        assert sum(isinstance(outcome, GuessConflictError) for outcome in outcomes) == 3
+        with Session(engine) as session:
+            assert session.get(GameSession, 1).attempts_left == 9
+            assert len(session.exec(select(GameAttempt)).all()) == 1
+            assert session.get(Player, 1).score == registered[0]["total_score"]
+        engine.dispose()
+
+    def test_guesses_on_other_games_of_the_player_keep_their_score(self, engine):
+        """
+            Test two games of the same player loaded at the same time both add their
+            score to the player, which then matches the score ledger
+        """
+        with Session(engine) as session:
+            session.add(GameSession(player_id=1, secret_number="1234", difficulty_level=1, attempts_left=3))
+            session.commit()
+
+        with Session(engine) as first, Session(engine) as second:
+            first_game = load_game_session(first, 1)
+            second_game = load_game_session(second, 2)
+            first_outcome = submit_guess(first, first_game, "1234")
+            second_outcome = submit_guess(second, second_game, "1234")
+
+        assert second_outcome["total_score"] == first_outcome["score_this_attempt"] + second_outcome["score_this_attempt"]
+        with Session(engine) as session:
+            assert session.get(Player, 1).score == second_outcome["total_score"]
+            assert sum(score_event.score for score_event in session.exec(select(ScoreEvent)).all()) == second_outcome["total_score"]
+
+    def test_stale_session_is_not_written(self, engine):
+        """
+            Test a guess on a copy of the session loaded before another guess is refused
+        """
+        with Session(engine) as session:
+            stale = load_game_session(session, 1)
+            stale.player
+            _guess(engine, "5555")
+
+            with pytest.raises(GuessConflictError):
+                submit_guess(session, stale, "6666")
+
+        with Session(engine) as session:
+            assert session.get(GameSession, 1).attempts_left == 2
+            assert [attempt.guessed_number for attempt in session.exec(select(GameAttempt)).all()] == ["5555"]
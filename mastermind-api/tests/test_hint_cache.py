@@ -0,0 +1,144 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+from sqlmodel import SQLModel, create_engine
+from sqlalchemy.pool import StaticPool
+from app.services import hint_cache as hint_cache_module
+from app.services.hint_cache import HintCache, hint_key
+from app.services.hints_service import generate_hint_async, prewarm_hint_cache
+
+
+@pytest.fixture
+def cache():
+    return HintCache()
+
+
+@pytest.fixture
+def memory_engine(monkeypatch):
+    """
+        Fixture that persists the riddles in an in memory database
+    """
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass= StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(hint_cache_module, "engine", engine)
+    monkeypatch.setattr(hint_cache_module.settings, "hint_cache_persist", True)
+    return engine
+
+
+class TestHintCache:
+    """
+        Tests for the HintCache class
+    """
+
+    def test_key_ignores_order_and_duplicates(self):
+        """
+            Test the key only depends on the set of digits
+        """
+        assert hint_key(['7', '0', '5', '0']) == hint_key(['5', '7', '0']) == "057"
+
+    def test_miss_then_hit(self, cache):
+        """
+            Test a stored riddle is served on the next request
+        """
+        assert cache.get("12") is None
+
+        cache.add("12", "A riddle")
+
+        assert cache.get("12") == "A riddle"
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_riddles_per_key_limit(self, cache, monkeypatch):
+        """
+            Test a key keeps a bounded number of distinct riddles
+        """
+        monkeypatch.setattr(hint_cache_module.settings, "hint_cache_riddles_per_key", 2)
+
+        for riddle in ["A", "A", "B", "C"]:
+            cache.add("3", riddle)
+
+        assert cache.riddle_count("3") == 2
+
+    def test_riddles_expire(self, cache, monkeypatch):
+        """
+            Test riddles older than the TTL are not served
+        """
+        monkeypatch.setattr(hint_cache_module.settings, "hint_cache_ttl", 60)
+
+        cache.add("4", "Old riddle", created_at=1.0)
+
+        assert cache.get("4") is None
+
+    def test_least_recently_used_key_is_evicted(self, cache, monkeypatch):
+        """
+            Test the cache keeps at most hint_cache_max_keys keys
+        """
+        monkeypatch.setattr(hint_cache_module.settings, "hint_cache_max_keys", 2)
+
+        cache.add("1", "One")
+        cache.add("2", "Two")
+        cache.get("1")
+        cache.add("3", "Three")
+
+        assert cache.riddle_count("1") == 1
+        assert cache.riddle_count("2") == 0
+
+    def test_keys_to_warm_follow_requests(self, cache, monkeypatch):
+        """
+            Test the most requested keys that are not full are warmed first
+        """
+        monkeypatch.setattr(hint_cache_module.settings, "hint_cache_riddles_per_key", 1)
+        for key in ["57", "57", "57", "01", "01", "9"]:
+            cache.get(key)
+        cache.add("01", "Full")
+
+        assert cache.keys_to_warm(2) == ["57", "9"]
+
+    def test_persisted_riddles_survive_restart(self, memory_engine):
+        """
+            Test riddles stored in the hint_riddle table are loaded by a new cache
+        """
+        HintCache().add("68", "Persisted riddle")
+
+        restarted = HintCache()
+        restarted.load()
+
+        assert restarted.get("68") == "Persisted riddle"
+
+
+class TestCachedHints:
+    """
+        Tests for the hint cache used by the hints service
+    """
+
+    @pytest.mark.asyncio
+    @patch('app.services.hints_service.generate_from_ai_async', new_callable=AsyncMock)
+    async def test_repeated_digit_set_does_not_call_ai(self, mock_ai):
+        """
+            Test only the first hint of a digit set reaches the AI client
+        """
+        mock_ai.return_value = "The number of continents on Earth. What number is it?"
+
+        for guessed_number in ["1234", "4321", "1243"]:
+            hint = await generate_hint_async(guessed_number, ['5','6','7','8'])
+            assert hint == "The number of continents on Earth. What number is it?"
+
+        mock_ai.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    @patch('app.services.hints_service.generate_from_ai_async', new_callable=AsyncMock)
+    async def test_prewarm_fills_requested_sets(self, mock_ai):
+        """
+            Test the pre-warmer generates riddles for the requested digit sets
+        """
+        mock_ai.return_value = "A warm riddle"
+        hint_cache_module.hint_cache.get("37")
+
+        added = await prewarm_hint_cache()
+
+        assert added == 1
+        assert hint_cache_module.hint_cache.get("37") == "A warm riddle"
+        assert "3, 7" in mock_ai.call_args[0][0]
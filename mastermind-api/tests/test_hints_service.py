@@ -1,8 +1,8 @@
 import pytest
-from unittest.mock import patch, Mock
+from unittest.mock import patch, AsyncMock
 from app.services.hints_service import(
     get_unguessed_digits,
-    generate_hint,
+    generate_hint_async,
     RINDDLE_HINTS
 )
 
@@ -101,66 +101,54 @@ class TestGetUnguessedDigits:
         assert set(unguessed) == {'2','3','4'}
 
 
-class TestGenerateHint:
+class TestGenerateHintAsync:
     """
-        Tests for the generate_hint function
+        Tests for the generate_hint_async function
     """
 
-    @patch('app.services.hints_service.generate_from_ai')
-    def test_generate_hint_ai_success(self, mock_ai):
+    @pytest.mark.asyncio
+    @patch('app.services.hints_service.generate_from_ai_async', new_callable=AsyncMock)
+    async def test_generate_hint_ai_success(self, mock_ai):
         """
             Test AI successfully generates hint.
         """
         mock_ai.return_value = "The number of continents on Earth. What number is it?"
-        guessed_number = "1234"
-        secret_number = ['5','6','7','8']
 
-        hint = generate_hint(guessed_number, secret_number)
+        hint = await generate_hint_async("1234", ['5','6','7','8'])
 
         assert hint == "The number of continents on Earth. What number is it?"
-        mock_ai.assert_called_once()
+        mock_ai.assert_awaited_once()
 
         #Verify the prompt contains unguessed digits
         call_args = mock_ai.call_args[0][0]
         for digit in ['5','6','7','8']:
-            assert digit in call_args 
+            assert digit in call_args
 
-    @patch('app.services.hints_service.generate_from_ai')
-    def test_generate_hint_ai_failure_fallback_to_dictionary(self, mock_ai):
+    @pytest.mark.asyncio
+    @patch('app.services.hints_service.generate_from_ai_async', new_callable=AsyncMock)
+    async def test_generate_hint_ai_failure_fallback_to_dictionary(self, mock_ai):
         """
-            Test when ai fails, fallback to dictionary riddles.
+            Test when ai fails or misses its deadline, fallback to dictionary riddles.
         """
+        mock_ai.return_value = None
 
-        mock_ai.return_value= None
-        guessed_number = "1234"
-        secret_number = ['7','8','9','0']
-
-        hint = generate_hint(guessed_number,secret_number)
-
-        mock_ai.assert_called_once()
+        hint = await generate_hint_async("1234", ['7','8','9','0'])
 
-        # Should fallback to dictionary riddle for one of unguessed digits
-        assert hint in [
-            RINDDLE_HINTS['7'],
-            RINDDLE_HINTS['8'],
-            RINDDLE_HINTS['9'],
-            RINDDLE_HINTS['0']
-        ]
+        assert hint in [RINDDLE_HINTS[digit] for digit in ['7','8','9','0']]
 
+    @pytest.mark.asyncio
     @patch('app.services.hints_service.random.choice')
-    @patch('app.services.hints_service.generate_from_ai')
-    def test_generate_hint_random_selection_fallback(self, mock_ai, mock_choice):
+    @patch('app.services.hints_service.generate_from_ai_async', new_callable=AsyncMock)
+    async def test_generate_hint_random_selection_fallback(self, mock_ai, mock_choice):
         """
             Test Fallback randomly selects from unguessed digits
         """
         mock_ai.return_value = None
         mock_choice.return_value = '5'
-        guessed_number = "1234"
-        secret_number = ['5','6','7','8']
 
-        hint = generate_hint(guessed_number,secret_number)
+        hint = await generate_hint_async("1234", ['5','6','7','8'])
 
         assert hint == RINDDLE_HINTS['5']
         mock_choice.assert_called_once()
         call_args = mock_choice.call_args[0][0]
-        assert set(call_args) == {'5','6','7','8'}
\ No newline at end of file
+        assert set(call_args) == {'5','6','7','8'}
@@ -0,0 +1,248 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy import text
+from sqlalchemy.pool import StaticPool
+from app.models import User, Player
+from app.services import leaderboard as leaderboard_module
+from app.database.connection import Settings, settings
+from app.services.leaderboard import Leaderboard, leaderboard, load_leaderboard, ranking_cache, run_leaderboard_refresher
+from app.main import app
+
+
+def _add(board: Leaderboard, player_id: int, score: int) -> None:
+    board.update(player_id, player_id, score, None, f"user{player_id}", f"user{player_id}@example.com")
+
+
+@pytest.fixture
+def board():
+    """
+        Fixture with five players: 5 (500), 4 (400), 2 (300), 3 (300), 1 (100)
+    """
+    board = Leaderboard()
+    for player_id, score in ((1, 100), (2, 300), (3, 300), (4, 400), (5, 500)):
+        _add(board, player_id, score)
+    return board
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """
+        Fixture that creates an in memory database with two players, used by load_leaderboard
+    """
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass= StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for number, score in ((1, 200), (2, 700)):
+            user = User(username=f"user{number}", email=f"user{number}@example.com", hashed_password="hash")
+            session.add(user)
+            session.flush()
+            session.add(Player(user_id=user.id, score=score))
+        session.commit()
+    monkeypatch.setattr(leaderboard_module, "read_engine", engine)
+    return engine
+
+
+class TestLeaderboard:
+    """
+        Tests for the Leaderboard class
+    """
+
+    def test_top_is_ordered_by_score_then_player_id(self, board):
+        """
+            Test the best players come first and ties are ordered by player id
+        """
+        top = board.top(4)
+
+        assert [(entry["id"], entry["rank"]) for entry in top] == [(5, 1), (4, 2), (2, 3), (3, 4)]
+        assert top[0]["user"]["username"] == "user5"
+        assert len(board.top(100)) == 5
+
+    def test_rank(self, board):
+        """
+            Test the rank of a player and of an unknown player
+        """
+        assert board.rank(5) == 1
+        assert board.rank(1) == 5
+        assert board.rank(99) is None
+
+    def test_around(self, board):
+        """
+            Test the players ranked around a player, cut at the ends of the leaderboard
+        """
+        assert [entry["id"] for entry in board.around(2, 1)] == [4, 2, 3]
+        assert [entry["id"] for entry in board.around(5, 2)] == [5, 4, 2]
+        assert board.around(99, 2) == []
+
+    def test_update_moves_the_player(self, board):
+        """
+            Test a new score moves the player to its new position
+        """
+        _add(board, 1, 1000)
+
+        assert board.rank(1) == 1
+        assert board.rank(5) == 2
+        assert len(board) == 5
+
+    def test_remove(self, board):
+        """
+            Test a removed player leaves the leaderboard
+        """
+        board.remove(4)
+
+        assert board.rank(4) is None
+        assert board.rank(2) == 2
+
+
+class TestLeaderboardSync:
+    """
+        Tests for load_leaderboard and the updates made when a score change is committed
+    """
+
+    def test_load_from_database(self, engine):
+        """
+            Test the leaderboard is rebuilt from the player table
+        """
+        load_leaderboard()
+
+        assert [(entry["user"]["username"], entry["score"]) for entry in leaderboard.top(10)] == [("user2", 700), ("user1", 200)]
+
+    def test_committed_score_change_is_applied(self, engine):
+        """
+            Test a committed score change updates the leaderboard without reloading it
+        """
+        load_leaderboard()
+        with Session(engine) as session:
+            player = session.get(Player, 1)
+            player.score = 900
+            session.add(player)
+            session.commit()
+
+        assert leaderboard.rank(1) == 1
+        assert leaderboard.player(1)["score"] == 900
+
+    def test_rolled_back_score_change_is_ignored(self, engine):
+        """
+            Test a score change that is flushed but rolled back does not reach the leaderboard
+        """
+        load_leaderboard()
+        with Session(engine) as session:
+            player = session.get(Player, 1)
+            player.score = 900
+            session.add(player)
+            session.flush()
+            session.rollback()
+
+        assert leaderboard.player(1)["score"] == 200
+
+    def test_new_player_is_added(self, engine):
+        """
+            Test a player created after the load shows up with its username
+        """
+        load_leaderboard()
+        with Session(engine) as session:
+            user = User(username="user3", email="user3@example.com", hashed_password="hash")
+            session.add(user)
+            session.commit()
+            session.add(Player(user_id=user.id))
+            session.commit()
+
+        assert leaderboard.rank(3) == 3
+        assert leaderboard.player(3)["user"]["username"] == "user3"
+
+    def test_refresher_is_enabled_by_default(self):
+        """
+            Test the leaderboard reload runs unless it is disabled, as several workers need it
+        """
+        assert Settings().leaderboard_refresh_interval > 0
+
+    @pytest.mark.asyncio
+    async def test_refresher_picks_up_changes_of_other_workers(self, engine, monkeypatch):
+        """
+            Test a score written by another process, which this leaderboard never saw,
+            shows up after the next reload
+        """
+        monkeypatch.setattr(settings, "leaderboard_refresh_interval", 0.01)
+        load_leaderboard()
+        with engine.begin() as connection:
+            connection.execute(text("UPDATE player SET score = 900 WHERE id = 1"))
+        assert leaderboard.player(1)["score"] == 200
+
+        refresher = asyncio.create_task(run_leaderboard_refresher())
+        try:
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if leaderboard.player(1)["score"] == 900:
+                    break
+        finally:
+            refresher.cancel()
+
+        assert leaderboard.rank(1) == 1
+
+
+class TestTopPlayersEndpoint:
+    """
+        Tests for the ETag and the response cache of /game/top_players/
+    """
+
+    @pytest.fixture
+    def client(self, engine):
+        """
+            Fixture with a client of the API and the leaderboard of the test database, without running
+            the startup. The all-time ranking is served from memory and never uses the database session
+        """
+        load_leaderboard()
+        return TestClient(app)
+
+    def test_matching_etag_gets_not_modified(self, client):
+        """
+            Test a request with the current ETag gets a 304 without body
+        """
+        response = client.get("/api/v1/game/top_players/")
+        etag = response.headers["etag"]
+
+        assert response.status_code == 200
+        assert [player["score"] for player in response.json()["top_players"]] == [700, 200]
+
+        response = client.get("/api/v1/game/top_players/", headers={"If-None-Match": f"W/{etag}"})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    def test_score_change_changes_the_etag(self, client, engine):
+        """
+            Test a committed score change invalidates the ETag and the cached body
+        """
+        etag = client.get("/api/v1/game/top_players/").headers["etag"]
+        with Session(engine) as session:
+            player = session.get(Player, 1)
+            player.score = 900
+            session.add(player)
+            session.commit()
+
+        response = client.get("/api/v1/game/top_players/", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["top_players"][0]["score"] == 900
+
+    def test_body_is_served_from_the_cache(self, client, monkeypatch):
+        """
+            Test the serialized body is built once per leaderboard version and query
+        """
+        calls = []
+        top = leaderboard.top
+        monkeypatch.setattr(leaderboard, "top", lambda limit: calls.append(limit) or top(limit))
+
+        first = client.get("/api/v1/game/top_players/?limit=2")
+        second = client.get("/api/v1/game/top_players/?limit=2")
+        client.get("/api/v1/game/top_players/?limit=1")
+
+        assert first.content == second.content
+        assert calls == [2, 1]
+        assert ranking_cache.hits == 1
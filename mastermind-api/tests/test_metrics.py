@@ -0,0 +1,160 @@
+import pytest
+import pytest_asyncio
+import requests
+from httpx import ASGITransport, AsyncClient
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.auth import auth_utils
+from app.auth.principal_cache import principal_cache
+from app.client import random_number
+from app.database.connection import create_async_database_engine, get_async_session, get_async_read_session
+from app.models import User, Player
+from app.routes import game_router
+from app.services.metrics import (
+    Histogram,
+    render_metrics,
+    reset_metrics,
+    request_statements,
+    request_db_time,
+    request_latency,
+    upstream_call,
+    upstream_latency
+)
+from app.main import app
+
+
+@pytest.fixture(autouse=True)
+def empty_metrics():
+    """
+        Fixture that starts every test with empty metrics
+    """
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+class TestHistogram:
+    """
+        Tests for the Prometheus rendering of a histogram
+    """
+
+    def test_render(self):
+        """
+            Test buckets are cumulative and the sum and count are rendered per label set
+        """
+        histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            histogram.observe(value, route='/a"b')
+
+        assert histogram.render() == [
+            "# HELP latency_seconds Latency",
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{route="/a\\"b",le="0.1"} 1',
+            'latency_seconds_bucket{route="/a\\"b",le="1"} 3',
+            'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 4',
+            'latency_seconds_sum{route="/a\\"b"} 4.25',
+            'latency_seconds_count{route="/a\\"b"} 4',
+        ]
+
+
+class TestUpstreamCalls:
+    """
+        Tests for the latency of the upstream calls
+    """
+
+    def test_outcomes(self):
+        """
+            Test a call is recorded as success, error or timeout
+        """
+        with upstream_call("gemini"):
+            pass
+        with pytest.raises(ValueError):
+            with upstream_call("gemini"):
+                raise ValueError()
+        with upstream_call("gemini") as call:
+            call["outcome"] = "timeout"
+
+        assert [upstream_latency.count(service="gemini", outcome=outcome) for outcome in ("success", "error", "timeout")] == [1, 1, 1]
+
+    def test_random_org_timeout(self, monkeypatch):
+        """
+            Test a random.org call that times out is recorded and still raises a requests exception
+        """
+        def _timeout(*args, **kwargs):
+            raise requests.Timeout("too slow")
+        monkeypatch.setattr(random_number.requests, "get", _timeout)
+
+        with pytest.raises(requests.RequestException):
+            random_number.fetch_secret_numbers(1, 1)
+
+        assert upstream_latency.count(service="random_org", outcome="timeout") == 1
+
+
+class TestMetricsMiddleware:
+    """
+        Tests for the request metrics and the /metrics endpoint
+    """
+
+    @pytest_asyncio.fixture
+    async def client(self, tmp_path, monkeypatch):
+        """
+            Fixture with a client of the API on a test database, and the token of a player
+        """
+        monkeypatch.setattr(auth_utils, "SECRET_KEY", "test-secret")
+        monkeypatch.setattr(game_router, "draw_secret_number", lambda difficulty_level: (list("1234"), 8))
+        principal_cache.clear()
+
+        engine = create_async_database_engine(f"sqlite:///{tmp_path / 'metrics.db'}", "production")
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+        async with AsyncSession(engine) as session:
+            user = User(username="ana", email="ana@example.com", hashed_password="hash")
+            session.add(user)
+            await session.flush()
+            session.add(Player(user_id=user.id))
+            await session.commit()
+
+        async def _get_async_session():
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                yield session
+
+        app.dependency_overrides[get_async_session] = _get_async_session
+        app.dependency_overrides[get_async_read_session] = _get_async_session
+        token = auth_utils.create_access_token({"sub": "ana", "user_id": 1, "player_id": 1})
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test", headers={"Authorization": f"Bearer {token}"}) as client:
+            yield client
+        app.dependency_overrides.clear()
+        principal_cache.clear()
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_statements_and_db_time_per_route(self, client):
+        """
+            Test the SQL statements of a guess, made through AsyncSession.run_sync, are counted for its route
+        """
+        session_id = (await client.post("/api/v1/game/start_game/?difficulty_level=2")).json()["session_id"]
+        await client.post("/api/v1/game/guess/", json={"session_id": session_id, "guessed_number": "5678"})
+
+        route = {"method": "POST", "route": "/api/v1/game/guess/"}
+        assert request_latency.count(status=200, **route) == 1
+        assert request_statements.count(**route) == 1
+        # The load of the game session plus the statements of submit_guess, run in run_sync
+        assert request_statements.sum(**route) >= 5
+        assert request_db_time.sum(**route) > 0
+
+    @pytest.mark.asyncio
+    async def test_prometheus_endpoint(self, client):
+        """
+            Test /metrics serves the text format, with unknown paths grouped under one label
+        """
+        await client.get("/api/v1/game/top_players/")
+        await client.get("/no/such/path")
+
+        response = await client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/v1/game/top_players/",status="200"} 1' in response.text
+        assert 'http_request_duration_seconds_count{method="GET",route="<unmatched>",status="404"} 1' in response.text
+        assert "# TYPE sql_statements_total counter" in render_metrics()
+
@@ -0,0 +1,153 @@
+import pytest
+from sqlalchemy import event, inspect, text
+from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy.pool import StaticPool
+from app.models import User, Player, GameSession, GameAttempt
+from app.database.migrations import SCHEMA_VERSION, get_schema_version, run_migrations
+from app.database.crud import (
+    get_user_by_username,
+    get_player_by_user_id,
+    get_last_attempt_number,
+    get_game_attempts,
+    get_top_players
+)
+from app.services.guess_service import load_game_session
+from app.services.score_ledger import get_top_players_in_window
+
+
+@pytest.fixture
+def engine():
+    """
+        Fixture that creates an empty in memory database
+    """
+    return create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass= StaticPool,
+    )
+
+
+def _index_names(engine, table: str) -> set:
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+
+def _create_old_schema(engine) -> None:
+    """
+        Creates the schema as it was before the migrations, with two games and their attempts
+    """
+    tables = [table for name, table in SQLModel.metadata.tables.items() if name != "game_attempt"]
+    SQLModel.metadata.create_all(engine, tables=tables)
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_player_score"))
+        connection.execute(text("DROP INDEX ix_game_session_player_active"))
+        connection.execute(text(
+            "CREATE TABLE game_attempt (id INTEGER PRIMARY KEY, guessed_number VARCHAR NOT NULL,"
+            " correct_numbers INTEGER NOT NULL, correct_positions INTEGER NOT NULL,"
+            " game_session_id INTEGER REFERENCES game_session (id))"
+        ))
+        connection.execute(text("INSERT INTO users (id, username, email, hashed_password, created_at) VALUES (1, 'ana', 'ana@example.com', 'hash', '2024-01-01')"))
+        connection.execute(text("INSERT INTO player (id, user_id, score) VALUES (1, 1, 0)"))
+        connection.execute(text("INSERT INTO game_session (id, secret_number, difficulty_level, attempts_left, is_active, player_id) VALUES (1, '1234', 1, 9, 1, 1), (2, '5678', 1, 11, 1, 1)"))
+        connection.execute(text(
+            "INSERT INTO game_attempt (id, guessed_number, correct_numbers, correct_positions, game_session_id) VALUES"
+            " (1, '0000', 0, 0, 1), (2, '1111', 1, 1, 1), (3, '5555', 1, 1, 2), (4, '2222', 1, 1, 1)"
+        ))
+
+
+class TestRunMigrations:
+    """
+        Tests for run_migrations
+    """
+
+    def test_old_database_is_upgraded(self, engine):
+        """
+            Test an existing database gets the new column, backfilled, and the new indexes
+        """
+        _create_old_schema(engine)
+
+        assert run_migrations(engine) == SCHEMA_VERSION
+
+        with Session(engine) as session:
+            assert [attempt.attempt_number for attempt in get_game_attempts(session, 1)] == [1, 2, 3]
+            assert [attempt.guessed_number for attempt in get_game_attempts(session, 1)] == ["0000", "1111", "2222"]
+            assert get_last_attempt_number(session, 2) == 1
+        assert "ix_game_attempt_session_number" in _index_names(engine, "game_attempt")
+        assert "ix_player_score" in _index_names(engine, "player")
+        assert "ix_game_session_player_active" in _index_names(engine, "game_session")
+
+    def test_new_database_only_records_the_version(self, engine):
+        """
+            Test a database created by create_all is already up to date
+        """
+        SQLModel.metadata.create_all(engine)
+
+        assert get_schema_version(engine) == 0
+        assert run_migrations(engine) == SCHEMA_VERSION
+        assert get_schema_version(engine) == SCHEMA_VERSION
+
+    def test_migrations_run_once(self, engine):
+        """
+            Test running the migrations again does nothing
+        """
+        _create_old_schema(engine)
+        run_migrations(engine)
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+        run_migrations(engine)
+
+        assert not any(statement.startswith(("ALTER", "UPDATE", "CREATE INDEX", "CREATE UNIQUE")) for statement in statements)
+
+
+class TestHotQueryPlans:
+    """
+        Tests that the queries made on every request use an index (EXPLAIN QUERY PLAN)
+    """
+
+    @pytest.fixture
+    def captured(self, engine):
+        """
+            Fixture that runs the hot queries on a small database and returns their statements
+        """
+        SQLModel.metadata.create_all(engine)
+        run_migrations(engine)
+        with Session(engine) as session:
+            for number in range(5):
+                user = User(username=f"user{number}", email=f"user{number}@example.com", hashed_password="hash")
+                session.add(user)
+                session.flush()
+                player = Player(user_id=user.id, score=number * 100)
+                session.add(player)
+                session.flush()
+                game_session = GameSession(player_id=player.id, secret_number="1234", difficulty_level=1, attempts_left=12)
+                session.add(game_session)
+                session.flush()
+                session.add(GameAttempt(game_session_id=game_session.id, attempt_number=1, guessed_number="0000", correct_numbers=0, correct_positions=0))
+            session.commit()
+
+        statements = []
+        capture = lambda conn, cursor, statement, parameters, *args: statements.append((statement, parameters))
+        event.listen(engine, "before_cursor_execute", capture)
+        with Session(engine) as session:
+            get_user_by_username(session, "user3")
+            get_player_by_user_id(session, 3)
+            get_top_players(session)
+            game_session = load_game_session(session, 3)
+            get_last_attempt_number(session, 3)
+            get_game_attempts(session, 3, 0)
+            game_session.player.game_sessions
+            get_top_players_in_window(session, "week", 1, 10)
+        event.remove(engine, "before_cursor_execute", capture)
+        return statements
+
+    def test_hot_queries_use_an_index(self, engine, captured):
+        """
+            Test no hot query scans a whole table or sorts in a temporary b-tree
+        """
+        assert len(captured) >= 8
+        with engine.connect() as connection:
+            for statement, parameters in captured:
+                plan = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+                for detail in plan:
+                    assert not (detail.startswith("SCAN") and "INDEX" not in detail), (statement, plan)
+                    assert "TEMP B-TREE" not in detail, (statement, plan)
@@ -0,0 +1,164 @@
+import time
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy.pool import StaticPool
+from app.auth import auth_utils
+from app.auth.auth_utils import create_access_token
+from app.auth.auth_middleware import get_current_principal
+from app.auth.principal_cache import Principal, PrincipalCache, principal_cache
+from app.models import User, Player
+
+
+@pytest.fixture(autouse=True)
+def signing_key(monkeypatch):
+    """
+        Fixture that signs the test tokens with a fixed key and starts with an empty cache
+    """
+    monkeypatch.setattr(auth_utils, "SECRET_KEY", "test-secret")
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+@pytest.fixture
+def engine():
+    """
+        Fixture that creates an in memory database with one user and its player
+    """
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass= StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(username="ana", email="ana@example.com", hashed_password="hash")
+        session.add(user)
+        session.commit()
+        session.add(Player(user_id=user.id))
+        session.commit()
+    return engine
+
+
+@pytest.fixture
+def statements(engine):
+    """
+        Fixture that records the SQL statements run on the test database
+    """
+    executed = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: executed.append(statement))
+    return executed
+
+
+def _credentials(data: dict) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token(data))
+
+
+class TestPrincipalCache:
+    """
+        Tests for the PrincipalCache class
+    """
+
+    def test_entry_expires_with_its_token(self):
+        """
+            Test an entry is not returned after the expiration of its token
+        """
+        cache = PrincipalCache(max_size=10)
+        cache.put(Principal(1, "ana", 1), time.time() + 60)
+        cache.put(Principal(2, "bob", 2), time.time() - 1)
+
+        assert cache.get("ana") == Principal(1, "ana", 1)
+        assert cache.get("bob") is None
+
+    def test_least_recently_used_is_evicted(self):
+        """
+            Test the least recently used principal is dropped when the cache is full
+        """
+        cache = PrincipalCache(max_size=2)
+        expires_at = time.time() + 60
+        cache.put(Principal(1, "ana", 1), expires_at)
+        cache.put(Principal(2, "bob", 2), expires_at)
+        cache.get("ana")
+        cache.put(Principal(3, "eva", 3), expires_at)
+
+        assert cache.get("bob") is None
+        assert cache.get("ana") is not None
+        assert cache.get("eva") is not None
+
+    def test_invalidation_distrusts_older_tokens(self):
+        """
+            Test invalidating a user drops its entry and only trusts tokens issued afterwards
+        """
+        cache = PrincipalCache(max_size=10)
+        issued_before = time.time()
+        cache.put(Principal(1, "ana", 1), time.time() + 60)
+
+        cache.invalidate_user(1)
+
+        assert cache.get("ana") is None
+        assert not cache.is_trusted(1, issued_before)
+        assert cache.is_trusted(1, time.time() + 1)
+        assert cache.is_trusted(2, issued_before)
+
+
+class TestGetCurrentPrincipal:
+    """
+        Tests for the get_current_principal dependency
+    """
+
+    def test_token_with_claims_needs_no_query(self, engine, statements):
+        """
+            Test a token carrying user_id and player_id is resolved without SQL statements
+        """
+        with Session(engine) as session:
+            principal = get_current_principal(_credentials({"sub": "ana", "user_id": 1, "player_id": 1}), session)
+
+        assert principal == Principal(user_id=1, username="ana", player_id=1)
+        assert statements == []
+
+    def test_token_without_claims_is_looked_up_once(self, engine, statements):
+        """
+            Test a token with only the subject is resolved from the database and then cached
+        """
+        credentials = _credentials({"sub": "ana"})
+        with Session(engine) as session:
+            first = get_current_principal(credentials, session)
+            queries = len(statements)
+            second = get_current_principal(credentials, session)
+
+        assert first == second == Principal(user_id=1, username="ana", player_id=1)
+        assert queries > 0
+        assert len(statements) == queries
+
+    def test_user_change_invalidates_claims(self, engine, statements):
+        """
+            Test claims of a token issued before the user changed are checked against the database
+        """
+        credentials = _credentials({"sub": "ana", "user_id": 1, "player_id": 1})
+        with Session(engine) as session:
+            get_current_principal(credentials, session)
+
+            user = session.get(User, 1)
+            user.username = "ana_renamed"
+            session.add(user)
+            session.commit()
+            statements.clear()
+
+            with pytest.raises(HTTPException) as exc_info:
+                get_current_principal(credentials, session)
+
+        assert exc_info.value.status_code == 401
+        assert statements
+
+    def test_invalid_token_is_rejected(self, engine):
+        """
+            Test a token that cannot be decoded raises 401
+        """
+        with Session(engine) as session:
+            with pytest.raises(HTTPException) as exc_info:
+                get_current_principal(HTTPAuthorizationCredentials(scheme="Bearer", credentials="not-a-token"), session)
+
+        assert exc_info.value.status_code == 401
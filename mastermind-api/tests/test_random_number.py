@@ -6,7 +6,15 @@
 import pytest
 from unittest.mock import patch, Mock
 import requests
-from app.client.random_number import get_secret_number
+from app.client.random_number import (
+    get_secret_number,
+    fetch_secret_numbers,
+    create_entropy_source,
+    RandomOrgSource,
+    LocalSource,
+    SeededSource
+)
+from stubs.random_org import start_random_org_stub
 
 class TestGetSecretNumber:
     """
@@ -152,4 +160,99 @@ class TestGetSecretNumber:
 
             # Verify that random.radint was called with correct max_digit for difficulty level 2
             for call in mock_randint.call_args_list:
-                assert call[0] == (0,7)
\ No newline at end of file
+                assert call[0] == (0,7)
+
+
+class TestFetchSecretNumbers:
+    """
+        Tests for the fetch_secret_numbers function.
+    """
+
+    def test_fetches_many_numbers_in_one_call(self):
+        """
+            Test several secret numbers are parsed from a single response
+        """
+        with patch('app.client.random_number.requests.get') as mock_get:
+            mock_response = Mock()
+            mock_response.text = "1\t2\t3\t4\n5\t0\t0\t1\n"
+            mock_response.raise_for_status.return_value = None
+            mock_get.return_value = mock_response
+
+            numbers = fetch_secret_numbers(1, 2)
+
+            assert numbers == [['1','2','3','4'], ['5','0','0','1']]
+            mock_get.assert_called_once()
+            assert "num=8" in mock_get.call_args[0][0]
+            assert mock_get.call_args[1]["timeout"] > 0
+
+    def test_incomplete_response(self):
+        """
+            Test a response with fewer numbers than requested is rejected
+        """
+        with patch('app.client.random_number.requests.get') as mock_get:
+            mock_response = Mock()
+            mock_response.text = "1\t2\t3\t4\n"
+            mock_response.raise_for_status.return_value = None
+            mock_get.return_value = mock_response
+
+            with pytest.raises(ValueError):
+                fetch_secret_numbers(1, 2)
+
+
+class TestEntropySources:
+    """
+        Tests for the secret number sources.
+    """
+
+    def test_seeded_source_is_deterministic(self):
+        """
+            Test two seeded sources with the same seed give the same numbers
+        """
+        first = SeededSource(42).fetch_secret_numbers(2, 5)
+        second = SeededSource(42).fetch_secret_numbers(2, 5)
+
+        assert first == second
+        assert all(int(digit) <= 7 for number in first for digit in number)
+
+    def test_local_source_respects_difficulty(self):
+        """
+            Test the local source only uses the digits of the difficulty level
+        """
+        numbers = LocalSource().fetch_secret_numbers(1, 50)
+
+        assert len(numbers) == 50
+        assert all(len(number) == 4 and int(digit) <= 5 for number in numbers for digit in number)
+
+    def test_unknown_source(self):
+        """
+            Test an unknown source name is rejected
+        """
+        with pytest.raises(ValueError):
+            create_entropy_source("dice")
+
+    def test_random_org_source_with_local_stand_in(self):
+        """
+            Test the random.org source against the local stand-in server
+        """
+        stub = start_random_org_stub(seed=1)
+        try:
+            with patch('app.client.random_number.settings.random_org_url', stub.url):
+                numbers = RandomOrgSource().fetch_secret_numbers(3, 10)
+        finally:
+            stub.shutdown()
+
+        assert len(numbers) == 10
+        assert all(len(number) == 4 for number in numbers)
+        assert stub.requests_served == 1
+
+    def test_stand_in_errors_are_raised(self):
+        """
+            Test an induced upstream error is reported as a request exception
+        """
+        stub = start_random_org_stub(error_rate=1.0)
+        try:
+            with patch('app.client.random_number.settings.random_org_url', stub.url):
+                with pytest.raises(requests.HTTPError):
+                    RandomOrgSource().fetch_secret_numbers(1, 1)
+        finally:
+            stub.shutdown()
@@ -0,0 +1,120 @@
+import pytest
+import numpy as np
+from types import SimpleNamespace
+from app.services import feedback, recommender, solver
+from app.services.game import evaluate_player_number
+from app.services.recommender import (
+    partition_counts,
+    search_best_guess,
+    build_opening_book,
+    save_opening_book,
+    recommend_next_guess
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_state(tmp_path, monkeypatch):
+    """
+        Fixture that isolates the tables, opening books and candidate sets of each test
+    """
+    monkeypatch.setattr(feedback.settings, "feedback_table_dir", str(tmp_path / "tables"))
+    monkeypatch.setattr(feedback.settings, "opening_book_dir", str(tmp_path / "books"))
+    monkeypatch.setattr(feedback, "_tables", {})
+    monkeypatch.setattr(recommender, "_books", {})
+    monkeypatch.setattr(solver, "_cache", solver.OrderedDict())
+
+
+def make_game_session(session_id, difficulty_level, secret_number, guesses):
+    """
+        Builds a game session whose attempts are the given guesses
+    """
+    attempts = []
+    for attempt_id, guess in enumerate(guesses, start=1):
+        correct_numbers, correct_positions = evaluate_player_number(list(guess), list(secret_number))
+        attempts.append(SimpleNamespace(
+            id=attempt_id,
+            guessed_number=guess,
+            correct_numbers=correct_numbers,
+            correct_positions=correct_positions
+        ))
+    return SimpleNamespace(id=session_id, difficulty_level=difficulty_level, attempts=attempts)
+
+
+class TestPartitionCounts:
+    """
+        Tests for the partition_counts function
+    """
+
+    def test_groups_cover_all_candidates(self):
+        """
+            Test that every candidate falls in exactly one group of each guess
+        """
+        candidates = np.arange(0, 6**4, 7)
+        counts = partition_counts(6, np.array([0, 5, 100]), candidates)
+
+        assert counts.shape[0] == 3
+        assert (counts.sum(axis=1) == len(candidates)).all()
+
+
+class TestSearchBestGuess:
+    """
+        Tests for the search_best_guess function
+    """
+
+    def test_knuth_first_guess(self):
+        """
+            Test the minimax first guess on 6 colors is the classic 1122 pattern
+        """
+        guess, complete = search_best_guess(6, np.arange(6**4), "minimax")
+
+        assert feedback.index_to_code(guess, 6) == "0011"
+        assert complete
+
+    def test_deadline_stops_search(self):
+        """
+            Test the search returns a partial answer when the time budget is over
+        """
+        guess, complete = search_best_guess(10, np.arange(10**4), "entropy", deadline=0)
+
+        assert not complete
+        assert 0 <= guess < 10**4
+
+
+class TestRecommendNextGuess:
+    """
+        Tests for the recommend_next_guess function
+    """
+
+    def test_uses_opening_book(self):
+        """
+            Test the first two guesses come from the opening book
+        """
+        book = build_opening_book(1, "minimax")
+        save_opening_book(book)
+
+        first = recommend_next_guess(make_game_session(1, 1, "5301", []))
+        assert first["source"] == "opening_book"
+        assert first["guess"] == book["first_guess"]
+
+        second = recommend_next_guess(make_game_session(2, 1, "5301", [book["first_guess"]]))
+        assert second["source"] == "opening_book"
+        assert second["guess"] in book["replies"].values()
+
+    def test_search_after_opening(self):
+        """
+            Test later guesses are searched and are consistent when few candidates remain
+        """
+        game_session = make_game_session(3, 2, "7310", ["0123", "4567", "7301"])
+
+        result = recommend_next_guess(game_session, "entropy", time_budget_ms=2000)
+
+        assert result["source"] == "search"
+        assert result["remaining_candidates"] >= 1
+        assert result["guess"] is not None
+
+    def test_unknown_strategy(self):
+        """
+            Test an unknown strategy is rejected
+        """
+        with pytest.raises(ValueError):
+            recommend_next_guess(make_game_session(4, 1, "1234", []), "random")
@@ -0,0 +1,149 @@
+import time
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.client.resilience import CircuitBreaker, SingleFlight
+
+
+class TestCircuitBreaker:
+    """
+        Tests for the CircuitBreaker class
+    """
+
+    def test_opens_after_consecutive_failures(self):
+        """
+            Test the breaker opens once the failure threshold is reached
+        """
+        breaker = CircuitBreaker(failure_threshold=3, latency_threshold=1.0, reset_timeout=30)
+
+        for _ in range(3):
+            assert breaker.allow_request()
+            breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow_request()
+
+    def test_slow_calls_count_as_failures(self):
+        """
+            Test successful calls slower than the latency threshold open the breaker
+        """
+        breaker = CircuitBreaker(failure_threshold=2, latency_threshold=0.5, reset_timeout=30)
+
+        breaker.record_success(2.0)
+        breaker.record_success(2.0)
+
+        assert breaker.state == CircuitBreaker.OPEN
+
+    def test_half_open_allows_a_single_probe(self):
+        """
+            Test after the reset timeout only one probe goes through, and its result decides
+        """
+        breaker = CircuitBreaker(failure_threshold=1, latency_threshold=1.0, reset_timeout=10)
+        breaker.record_failure()
+
+        with patch('app.client.resilience.time.monotonic', return_value=time.monotonic() + 11):
+            assert breaker.allow_request()
+            assert breaker.state == CircuitBreaker.HALF_OPEN
+            assert not breaker.allow_request()
+
+            breaker.record_success(0.1)
+
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow_request()
+
+    def test_failed_probe_opens_again(self):
+        """
+            Test a failing probe sends the breaker back to open
+        """
+        breaker = CircuitBreaker(failure_threshold=5, latency_threshold=1.0, reset_timeout=0)
+        for _ in range(5):
+            breaker.record_failure()
+
+        assert breaker.allow_request()
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.snapshot()["times_opened"] == 2
+
+    def test_cancelled_probe_is_released(self):
+        """
+            Test a probe that ends without a result lets the next call probe
+        """
+        breaker = CircuitBreaker(failure_threshold=1, latency_threshold=1.0, reset_timeout=0)
+        breaker.record_failure()
+
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+        breaker.release_probe()
+
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request()
+
+
+class TestSingleFlight:
+    """
+        Tests for the SingleFlight class
+    """
+
+    @pytest.mark.asyncio
+    async def test_coroutines_share_one_call(self):
+        """
+            Test concurrent coroutines with the same key run the function once
+        """
+        single_flight = SingleFlight()
+        calls = []
+
+        async def slow_function():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(single_flight.do_async("key", slow_function) for _ in range(4)))
+
+        assert results == ["result"] * 4
+        assert len(calls) == 1
+        assert single_flight.snapshot() == {"leaders": 1, "coalesced": 3, "in_flight": 0}
+
+    @pytest.mark.asyncio
+    async def test_errors_are_shared(self):
+        """
+            Test an error of the leader is raised to every caller and the key is released
+        """
+        single_flight = SingleFlight()
+
+        async def failing_function():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        async def next_function():
+            return "next"
+
+        results = await asyncio.gather(*(single_flight.do_async("key", failing_function) for _ in range(3)), return_exceptions=True)
+
+        assert all(isinstance(result, ValueError) for result in results)
+        assert await single_flight.do_async("key", next_function) == "next"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_leader_does_not_cancel_the_others(self):
+        """
+            Test the callers waiting for a cancelled leader are not cancelled: one of
+            them runs the call again and they all get its result
+        """
+        single_flight = SingleFlight()
+        calls = []
+
+        async def slow_function():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        leader = asyncio.create_task(single_flight.do_async("key", slow_function))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(single_flight.do_async("key", slow_function)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        assert await asyncio.gather(*followers) == ["result"] * 3
+        assert leader.cancelled()
+        assert len(calls) == 2
+        assert single_flight.snapshot() == {"leaders": 2, "coalesced": 3, "in_flight": 0}
@@ -0,0 +1,135 @@
+import pytest
+from datetime import datetime, timezone
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlalchemy.pool import StaticPool
+from app.models import User, Player, GameSession, ScoreEvent, ScoreBucket
+from app.services.score_ledger import bucket_starts, record_score_event, get_top_players_in_window
+from app.services.guess_service import load_game_session, submit_guess
+
+MONDAY = datetime(2024, 5, 13, 10, 0, tzinfo=timezone.utc)
+WEDNESDAY = datetime(2024, 5, 15, 23, 59, tzinfo=timezone.utc)
+NEXT_MONDAY = datetime(2024, 5, 20, 0, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def session():
+    """
+        Fixture with three players, each one with a game of difficulty 1 and one of difficulty 3
+    """
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass= StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for number in range(1, 4):
+            user = User(username=f"user{number}", email=f"user{number}@example.com", hashed_password="hash")
+            session.add(user)
+            session.flush()
+            player = Player(user_id=user.id)
+            session.add(player)
+            session.flush()
+            for difficulty_level in (1, 3):
+                session.add(GameSession(player_id=player.id, secret_number="1234", difficulty_level=difficulty_level, attempts_left=8))
+        session.commit()
+        yield session
+
+
+def _record(session: Session, player_id: int, difficulty_level: int, score: int, created_at: datetime) -> None:
+    game_session = session.exec(
+        select(GameSession).where(GameSession.player_id == player_id, GameSession.difficulty_level == difficulty_level)
+    ).one()
+    record_score_event(session, player_id, game_session, score, created_at)
+    session.commit()
+
+
+def _ranking(session: Session, window: str, difficulty_level=None, now=WEDNESDAY) -> list:
+    return [(entry["id"], entry["score"]) for entry in get_top_players_in_window(session, window, difficulty_level, 10, now)]
+
+
+class TestBucketStarts:
+    """
+        Tests for bucket_starts
+    """
+
+    def test_day_and_week(self):
+        """
+            Test a moment falls in the bucket of its UTC day and of the Monday of its week
+        """
+        assert bucket_starts(WEDNESDAY) == {"day": "2024-05-15", "week": "2024-05-13", "all": ""}
+        assert bucket_starts(NEXT_MONDAY)["week"] == "2024-05-20"
+
+
+class TestScoreLedger:
+    """
+        Tests for record_score_event and get_top_players_in_window
+    """
+
+    def test_event_is_stored_in_the_ledger(self, session):
+        """
+            Test each scored attempt adds one ledger row
+        """
+        _record(session, 1, 1, 600, MONDAY)
+
+        event = session.exec(select(ScoreEvent)).one()
+        assert (event.player_id, event.difficulty_level, event.score) == (1, 1, 600)
+
+    def test_scores_are_aggregated_per_window(self, session):
+        """
+            Test the day, week and difficulty rankings only count their own events
+        """
+        _record(session, 1, 1, 600, MONDAY)
+        _record(session, 1, 3, 1200, WEDNESDAY)
+        _record(session, 2, 1, 1000, WEDNESDAY)
+        _record(session, 3, 3, 5000, NEXT_MONDAY)
+
+        assert _ranking(session, "day") == [(1, 1200), (2, 1000)]
+        assert _ranking(session, "week") == [(1, 1800), (2, 1000)]
+        assert _ranking(session, "week", 1) == [(2, 1000), (1, 600)]
+        assert _ranking(session, "all", 3) == [(3, 5000), (1, 1200)]
+        assert _ranking(session, "week", now=NEXT_MONDAY) == [(3, 5000)]
+
+    def test_each_event_upserts_only_its_buckets(self, session):
+        """
+            Test an event touches five buckets: day and week (any and its difficulty), all (its difficulty)
+        """
+        _record(session, 1, 1, 600, MONDAY)
+        _record(session, 1, 1, 600, MONDAY)
+
+        buckets = session.exec(select(ScoreBucket)).all()
+        assert len(buckets) == 5
+        assert {bucket.score for bucket in buckets} == {1200}
+
+    def test_ranking_entries(self, session):
+        """
+            Test the ranking entries have the rank and the user data
+        """
+        _record(session, 2, 1, 1000, WEDNESDAY)
+
+        assert get_top_players_in_window(session, "day", None, 10, WEDNESDAY) == [{
+            "id": 2,
+            "user_id": 2,
+            "score": 1000,
+            "rank": 1,
+            "user": {"id": 2, "username": "user2", "email": "user2@example.com"}
+        }]
+
+    def test_invalid_windows(self, session):
+        """
+            Test unknown windows and the all-time ranking of every difficulty are rejected
+        """
+        with pytest.raises(ValueError):
+            get_top_players_in_window(session, "month", None, 10)
+        with pytest.raises(ValueError):
+            get_top_players_in_window(session, "all", None, 10)
+
+    def test_submit_guess_records_the_score(self, session):
+        """
+            Test a guess adds its score to the ledger in the same transaction
+        """
+        outcome = submit_guess(session, load_game_session(session, 1), "1325")
+
+        event = session.exec(select(ScoreEvent)).one()
+        assert event.score == outcome["score_this_attempt"]
+        assert _ranking(session, "day", now=datetime.now(timezone.utc)) == [(1, outcome["score_this_attempt"])]
@@ -0,0 +1,154 @@
+"""
+    Tests for the secret number pool, found in the secret_pool.py file.
+"""
+
+import os
+import json
+import pytest
+import requests
+from unittest.mock import patch
+from app.client import secret_pool
+from app.client.secret_pool import SecretPool, draw_secret_number, load_secret_pools, save_secret_pools
+
+
+@pytest.fixture(autouse=True)
+def pool_settings(tmp_path, monkeypatch):
+    """
+        Fixture that stores the pools in a temporary file and starts with empty pools
+    """
+    monkeypatch.setattr(secret_pool.settings, "secret_pool_file", str(tmp_path / "pool.json"))
+    monkeypatch.setattr(secret_pool.settings, "secret_pool_batch_size", 3)
+    monkeypatch.setattr(secret_pool.settings, "secret_pool_low_water", 2)
+    monkeypatch.setattr(secret_pool, "_pools", {level: SecretPool(level) for level in (1, 2, 3)})
+    monkeypatch.setattr(secret_pool, "_source", None)
+
+
+class TestSecretPool:
+    """
+        Tests for the SecretPool class
+    """
+
+    def test_draw_from_pool(self):
+        """
+            Test numbers are served from the pool in order
+        """
+        pool = SecretPool(1, ["1234", "5432", "0011"])
+
+        with patch.object(SecretPool, "refill_if_low"):
+            assert pool.draw() == "1234"
+            assert pool.draw() == "5432"
+
+    def test_empty_pool_uses_local_fallback(self):
+        """
+            Test an empty pool generates the number locally with the secrets module
+        """
+        pool = SecretPool(1)
+
+        with patch.object(SecretPool, "refill_if_low"), \
+            patch('app.client.secret_pool.secrets.randbelow', return_value=3) as mock_randbelow:
+            number = pool.draw()
+
+        assert number == "3333"
+        for call in mock_randbelow.call_args_list:
+            assert call[0] == (6,) # For difficulty level 1 max_digit must be 5
+
+    @pytest.mark.parametrize("difficulty_level, max_digit, attempts", [(1, 5, 12), (2, 7, 10)])
+    def test_empty_pool_keeps_its_difficulty(self, difficulty_level, max_digit, attempts):
+        """
+            Test draw_secret_number generates the digits of an empty low level pool,
+            not the 0-9 digits of the level 3 pool
+        """
+        secret_pool._pools[3] = SecretPool(3, ["9999"])
+
+        with patch.object(SecretPool, "refill_if_low"), \
+            patch('app.client.secret_pool.secrets.randbelow', return_value=max_digit) as mock_randbelow:
+            number, drawn_attempts = draw_secret_number(difficulty_level)
+
+        assert (number, drawn_attempts) == ([str(max_digit)] * 4, attempts)
+        assert all(call[0] == (max_digit + 1,) for call in mock_randbelow.call_args_list)
+        assert secret_pool._pools[3].snapshot() == ["9999"]
+
+    def test_refill_fetches_a_batch(self):
+        """
+            Test a refill adds a whole batch, without writing the numbers it keeps handing out
+        """
+        pool = secret_pool._pools[2]
+
+        with patch('app.client.random_number.fetch_secret_numbers', return_value=[list("0123"), list("4567"), list("7777")]) as mock_fetch:
+            pool.refill()
+
+        mock_fetch.assert_called_once_with(2, 3)
+        assert pool.snapshot() == ["0123", "4567", "7777"]
+        assert not os.path.exists(secret_pool.settings.secret_pool_file)
+
+    def test_refill_failure_keeps_pool(self):
+        """
+            Test a failing random.org call leaves the pool as it was
+        """
+        pool = SecretPool(3, ["9876"])
+
+        with patch('app.client.random_number.fetch_secret_numbers', side_effect=requests.RequestException("down")):
+            pool.refill()
+
+        assert pool.snapshot() == ["9876"]
+
+    def test_low_pool_starts_background_refill(self):
+        """
+            Test drawing below the low-water mark starts a refill thread
+        """
+        pool = SecretPool(1, ["1234", "5432"])
+
+        with patch('app.client.secret_pool.threading.Thread') as mock_thread:
+            pool.draw()
+
+        mock_thread.assert_called_once()
+        mock_thread.return_value.start.assert_called_once()
+
+
+class TestPoolPersistence:
+    """
+        Tests for load_secret_pools and save_secret_pools
+    """
+
+    def test_unused_numbers_survive_restart(self):
+        """
+            Test saved numbers are loaded back and served by draw_secret_number
+        """
+        secret_pool._pools[3] = SecretPool(3, ["9012", "3456", "7890"])
+        save_secret_pools()
+
+        with patch.object(SecretPool, "refill_if_low"):
+            load_secret_pools()
+            number, attempts = draw_secret_number(3)
+
+        assert number == ['9', '0', '1', '2']
+        assert attempts == 8
+
+    def test_saved_numbers_are_claimed_once(self):
+        """
+            Test a second load (another worker) does not get the same numbers
+        """
+        secret_pool._pools[1] = SecretPool(1, ["1234", "5432"])
+        save_secret_pools()
+
+        with patch.object(SecretPool, "refill_if_low"):
+            load_secret_pools()
+            assert secret_pool._pools[1].snapshot() == ["1234", "5432"]
+
+            load_secret_pools()
+            assert secret_pool._pools[1].snapshot() == []
+
+    def test_saved_numbers_are_not_handed_out_again(self):
+        """
+            Test the saved numbers leave the pools, so a worker reading the file cannot
+            get a number this one still hands out
+        """
+        secret_pool._pools[2] = SecretPool(2, ["1234", "5432"])
+        save_secret_pools()
+
+        with open(secret_pool.settings.secret_pool_file) as file:
+            assert json.load(file)["2"] == ["1234", "5432"]
+        assert secret_pool._pools[2].snapshot() == []
+        with patch.object(SecretPool, "refill_if_low"), \
+            patch('app.client.secret_pool.secrets.randbelow', return_value=0):
+            assert draw_secret_number(2)[0] == list("0000")
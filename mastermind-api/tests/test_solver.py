@@ -0,0 +1,100 @@
+import pytest
+from types import SimpleNamespace
+from app.services import feedback, solver
+from app.services.feedback import get_feedback_table
+from app.services.game import evaluate_player_number
+from app.services.solver import CandidateSet, get_candidate_set
+
+
+@pytest.fixture(autouse=True)
+def clean_state(tmp_path, monkeypatch):
+    """
+        Fixture that isolates the feedback tables and the candidate set cache of each test
+    """
+    monkeypatch.setattr(feedback.settings, "feedback_table_dir", str(tmp_path))
+    monkeypatch.setattr(feedback, "_tables", {})
+    monkeypatch.setattr(solver, "_cache", solver.OrderedDict())
+
+
+def make_attempt(attempt_id, guessed_number, secret_number):
+    """
+        Builds an attempt with the feedback the guess gets against the secret
+    """
+    correct_numbers, correct_positions = evaluate_player_number(list(guessed_number), list(secret_number))
+    return SimpleNamespace(
+        id=attempt_id,
+        guessed_number=guessed_number,
+        correct_numbers=correct_numbers,
+        correct_positions=correct_positions
+    )
+
+
+class TestCandidateSet:
+    """
+        Tests for the CandidateSet class
+    """
+
+    def test_starts_with_every_code(self):
+        """
+            Test that a new set contains all the codes of the difficulty
+        """
+        assert CandidateSet(1).count() == 6**4
+        assert CandidateSet(2).count() == 8**4
+        assert CandidateSet(3).count() == 10**4
+
+    @pytest.mark.parametrize("use_table", [False, True])
+    def test_candidates_stay_consistent(self, use_table):
+        """
+            Test that every remaining candidate gives the same feedback as the secret
+        """
+        if use_table:
+            get_feedback_table(10)
+
+        secret = "3141"
+        guesses = ["0123", "4567", "3311"]
+        candidates = CandidateSet(3)
+
+        for guess in guesses:
+            candidates.apply(guess, *evaluate_player_number(list(guess), list(secret)))
+
+        remaining = candidates.codes(limit=10**4)
+        assert secret in remaining
+        for code in remaining:
+            for guess in guesses:
+                assert evaluate_player_number(list(guess), list(code)) == evaluate_player_number(list(guess), list(secret))
+
+    def test_guess_with_digits_outside_difficulty(self):
+        """
+            Test that guesses with digits the difficulty does not use are handled
+        """
+        candidates = CandidateSet(1)
+
+        candidates.apply("9999", 0, 0)
+
+        assert candidates.count() == 6**4
+
+
+class TestGetCandidateSet:
+    """
+        Tests for the get_candidate_set function
+    """
+
+    def test_applies_only_new_attempts(self, monkeypatch):
+        """
+            Test that the cached set is updated incrementally
+        """
+        game_session = SimpleNamespace(id=1, difficulty_level=2, attempts=[make_attempt(1, "0123", "7310")])
+
+        first_count = get_candidate_set(game_session).count()
+
+        applied = []
+        original_apply = CandidateSet.apply
+        monkeypatch.setattr(CandidateSet, "apply", lambda self, *args: applied.append(args) or original_apply(self, *args))
+
+        game_session.attempts.append(make_attempt(2, "4567", "7310"))
+        candidates = get_candidate_set(game_session)
+
+        assert len(applied) == 1
+        assert candidates.applied_attempts == 2
+        assert candidates.count() < first_count
+        assert "7310" in candidates.codes(limit=8**4)
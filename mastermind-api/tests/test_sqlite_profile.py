@@ -0,0 +1,163 @@
+import asyncio
+import threading
+import pytest
+import pytest_asyncio
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models import User
+from app.database.connection import create_database_engine
+from app.database.sqlite_profile import AsyncSerializedWriter, configure_sqlite_production
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """
+        Fixture with a production profile engine on a SQLite file database
+    """
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'production.db'}", "production")
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+class TestProductionProfile:
+    """
+        Tests for the production profile of the SQLite engine
+    """
+
+    def test_pragmas(self, engine):
+        """
+            Test every connection uses WAL and the tuned pragmas, without echo
+        """
+        with engine.connect() as connection:
+            assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert connection.execute(text("PRAGMA synchronous")).scalar() == 1
+            assert connection.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+            assert connection.execute(text("PRAGMA cache_size")).scalar() == -64 * 1024
+        assert not engine.echo
+
+    def test_development_profile_is_unchanged(self, tmp_path):
+        """
+            Test the development profile keeps echo and the default journal mode
+        """
+        engine = create_database_engine(f"sqlite:///{tmp_path / 'development.db'}", "development")
+        with engine.connect() as connection:
+            assert connection.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+        assert engine.echo
+
+    def test_writer_is_released_on_commit_and_rollback(self, tmp_path):
+        """
+            Test the serialized writer is held from the first write until the transaction ends
+        """
+        engine = create_engine(f"sqlite:///{tmp_path / 'writer.db'}", connect_args={"check_same_thread": False})
+        writer = configure_sqlite_production(engine, mmap_size=0, cache_size_kib=2000, busy_timeout_ms=1000)
+        SQLModel.metadata.create_all(engine)
+
+        with Session(engine) as session:
+            session.add(User(username="ana", email="ana@example.com", hashed_password="hash"))
+            session.flush()
+            assert writer._lock.locked()
+            session.commit()
+        assert not writer._lock.locked()
+
+        with Session(engine) as session:
+            session.add(User(username="bob", email="bob@example.com", hashed_password="hash"))
+            session.flush()
+            session.rollback()
+        assert not writer._lock.locked()
+
+        with Session(engine) as session:
+            session.get(User, 1)
+            assert not writer._lock.locked()
+
+    def test_concurrent_writers_do_not_fail(self, engine):
+        """
+            Test many threads writing at the same time never get "database is locked"
+        """
+        errors = []
+
+        def register(number: int):
+            try:
+                for attempt in range(10):
+                    with Session(engine) as session:
+                        session.add(User(username=f"user{number}_{attempt}", email=f"user{number}_{attempt}@example.com", hashed_password="hash"))
+                        session.commit()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=register, args=(number,)) for number in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT COUNT(*) FROM users")).scalar() == 160
+
+
+@pytest_asyncio.fixture
+async def async_writer(tmp_path):
+    """
+        Fixture with an async engine on a SQLite file database and its serialized writer
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}")
+    writer = configure_sqlite_production(engine.sync_engine, mmap_size=0, cache_size_kib=2000, busy_timeout_ms=1000)
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    yield engine, writer
+    await engine.dispose()
+
+
+class TestAsyncSerializedWriter:
+    """
+        Tests for the serialized writer of the async engine
+    """
+
+    @pytest.mark.asyncio
+    async def test_writer_is_released_on_commit_and_rollback(self, async_writer):
+        """
+            Test the asyncio lock is held from the first write until the transaction ends
+        """
+        engine, writer = async_writer
+        assert isinstance(writer, AsyncSerializedWriter)
+
+        async with AsyncSession(engine) as session:
+            await session.exec(text("SELECT 1"))
+            assert writer._lock is None or not writer._lock.locked()
+            session.add(User(username="ana", email="ana@example.com", hashed_password="hash"))
+            await session.flush()
+            assert writer._lock.locked()
+            await session.commit()
+            assert not writer._lock.locked()
+
+            session.add(User(username="luis", email="luis@example.com", hashed_password="hash"))
+            await session.flush()
+            assert writer._lock.locked()
+            await session.rollback()
+        assert not writer._lock.locked()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_writers_wait_for_each_other(self, async_writer):
+        """
+            Test concurrent transactions of one event loop write one at a time, without errors
+        """
+        engine, writer = async_writer
+
+        async def register(number: int):
+            for attempt in range(5):
+                async with AsyncSession(engine) as session:
+                    session.add(User(username=f"user{number}_{attempt}", email=f"user{number}_{attempt}@example.com", hashed_password="hash"))
+                    await session.flush()
+                    # Keep the transaction open while the other coroutines try to write
+                    await asyncio.sleep(0.001)
+                    await session.commit()
+
+        await asyncio.gather(*(register(number) for number in range(8)))
+
+        assert writer.waits > 0
+        assert writer.timeouts == 0
+        async with engine.connect() as connection:
+            assert (await connection.execute(text("SELECT COUNT(*) FROM users"))).scalar() == 40